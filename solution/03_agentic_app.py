@@ -2,37 +2,14 @@ from pathlib import Path
 import os
 import shutil
 
-from langgraph.graph import StateGraph
 from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.sqlite import SqliteSaver
 
-from agentic.agents.states import AgentState
-from agentic.agents import (
-    OrchestratorAgent,
-    TicketClassifierAgent,
-    TicketFetcherAgent,
-    ReservationFetcherAgent,
-    ArticlesFetcherAgent,
-    ResolutionAgent,
-    EscalationAgent,
-    MemoryUpdaterAgent,
-)
-from agentic.agents.agent_names import (
-    ORCHESTRATOR_AGENT_NAME,
-    TICKET_CLASSIFIER_AGENT_NAME,
-    TICKET_FETCHER_AGENT_NAME,
-    RESERVATION_FETCHER_AGENT_NAME,
-    ARTICLE_FETCHER_AGENT_NAME,
-    RESOLUTION_AGENT_NAME,
-    ESCALATION_AGENT_NAME,
-    MEMORY_UPDATER_AGENT_NAME,
-)
+from agentic.agents import OrchestratorAgent
+from agentic.graph import build_workflow
 
 
 if __name__ == "__main__":
-    # Start off by creating the state graph, and then populating it with agents 
-    workflow = StateGraph(AgentState)
-
     # The orchestrator agent
     path_to_cache = Path(__file__).parent / "cache"
     if os.path.exists(path_to_cache):
@@ -40,42 +17,16 @@ if __name__ == "__main__":
         print(f"Re-created empty directory: {path_to_cache}")
     os.makedirs(path_to_cache)
 
-    orchestrator_agent = OrchestratorAgent(path_to_cache)
-    workflow.add_node(ORCHESTRATOR_AGENT_NAME, orchestrator_agent)
-    workflow.set_entry_point(ORCHESTRATOR_AGENT_NAME)
+    orchestrator_agent = OrchestratorAgent(cache_directory=path_to_cache)
 
-    # The following LLM will be used in the following agents
+    # The following LLM will be used in all the other agents
     llm = ChatOpenAI(
         model_name="gpt-4o-mini",
         temperature=0.0,
     )
 
-    # The ticket classifier agent
-    ticket_classifier_agent = TicketClassifierAgent(llm)
-    workflow.add_node(TICKET_CLASSIFIER_AGENT_NAME, ticket_classifier_agent)
-
-    # The previous tickets fetcher agent
-    ticket_fetcher_agent = TicketFetcherAgent(llm)
-    workflow.add_node(TICKET_FETCHER_AGENT_NAME, ticket_fetcher_agent)
-
-    # The reservations fetcher agent
-    reservation_fetcher_agent = ReservationFetcherAgent(llm)
-    workflow.add_node(RESERVATION_FETCHER_AGENT_NAME, reservation_fetcher_agent)
-
-    # The articles fetcher agent
-    articles_fetcher_agent = ArticlesFetcherAgent(llm)
-    workflow.add_node(ARTICLE_FETCHER_AGENT_NAME, articles_fetcher_agent)
-
-    # The resolution agent
-    resolution_agent = ResolutionAgent(llm)
-    workflow.add_node(RESOLUTION_AGENT_NAME, resolution_agent)
-
-    # The escalation agent
-    escalation_agent = EscalationAgent(llm)
-    workflow.add_node(ESCALATION_AGENT_NAME, escalation_agent)
-
-    memory_updater_agent = MemoryUpdaterAgent(llm)
-    workflow.add_node(MEMORY_UPDATER_AGENT_NAME, memory_updater_agent)
+    # Create the state graph, populated with the orchestrator and the agents it delegates to
+    workflow = build_workflow(llm, orchestrator_agent)
 
     # Compile and run the graph with an example input
     with SqliteSaver.from_conn_string((path_to_cache / "graph_checkpoints.db").resolve().as_posix()) as checkpointer:
@@ -103,7 +54,6 @@ if __name__ == "__main__":
 
         response_for_example_input = graph.invoke(example_input, {'configurable': {'thread_id': example_input['user_id']}})
         print(f'Final response 1: {response_for_example_input}')
-        orchestrator_agent.reset()
 
         example_input = {
             "ticket_text": (
@@ -121,7 +71,6 @@ if __name__ == "__main__":
 
         response_for_example_input = graph.invoke(example_input, {'configurable': {'thread_id': example_input['user_id']}})
         print(f'Final response 2: {response_for_example_input}')
-        orchestrator_agent.reset()
 
         example_input = {
             "ticket_text": (
@@ -139,7 +88,6 @@ if __name__ == "__main__":
 
         response_for_example_input = graph.invoke(example_input, {'configurable': {'thread_id': example_input['user_id']}})
         print(f'Final response 3: {response_for_example_input}')
-        orchestrator_agent.reset()
 
         example_input = {
             "ticket_text": (
@@ -157,4 +105,3 @@ if __name__ == "__main__":
 
         response_for_example_input = graph.invoke(example_input, {'configurable': {'thread_id': example_input['user_id']}})
         print(f'Final response 4: {response_for_example_input}')
-        orchestrator_agent.reset()
@@ -7,6 +7,7 @@ from .articles_fetcher import ArticlesFetcherAgent
 from .resolver import ResolutionAgent
 from .escalator import EscalationAgent
 from .memory_updater import MemoryUpdaterAgent
+from .fast_resolver import FastResolutionAgent
 
 # Define __all__ to control what is exported when someone uses "from agentic.agents import *"
 __all__ = [
@@ -18,4 +19,5 @@ __all__ = [
     "ResolutionAgent",
     "EscalationAgent",
     "MemoryUpdaterAgent",
+    "FastResolutionAgent",
 ]
@@ -10,6 +10,8 @@ TICKET_CLASSIFIER_AGENT_NAME = "ticket_classifier_agent"
 TICKET_FETCHER_AGENT_NAME = "ticket_fetcher_agent"
 RESERVATION_FETCHER_AGENT_NAME = "reservation_fetcher_agent"
 ARTICLE_FETCHER_AGENT_NAME = "articles_fetcher_agent"
+SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME = "speculative_articles_fetcher_agent"
 RESOLUTION_AGENT_NAME = "resolution_agent"
 ESCALATION_AGENT_NAME = "escalation_agent"
 MEMORY_UPDATER_AGENT_NAME = "memory_updater_agent"
+FAST_RESOLUTION_AGENT_NAME = "fast_resolution_agent"
@@ -4,21 +4,65 @@ from langgraph.types import Command
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.prebuilt import create_react_agent
 
-from agentic.agents.states import AgentState, ArticleFetcherResult
+from agentic.agents.states import AgentState, ArticleFetcherResult, _Article
 from agentic.agents.agent_names import ORCHESTRATOR_AGENT_NAME
-from agentic.tools.tools import fetch_articles
+from agentic.agents.reranker import Reranker
+from agentic.tools.tools import fetch_articles, search_articles, semantic_search_articles
+
+
+def _article_tags(article: dict) -> set[str]:
+    return {tag.strip().lower() for tag in (article.get("tags") or "").split(",") if tag.strip()}
+
+
+def _to_result(articles: list[dict]) -> ArticleFetcherResult:
+    return ArticleFetcherResult(relevant_articles=[
+        _Article(
+            article_id=article.get("article_id"),
+            title=article["title"],
+            content=article["content"],
+            tags=article["tags"] or "",
+        )
+        for article in articles
+    ])
 
 
 class ArticlesFetcherAgent:
-    def __init__(self, llm):
+    """
+    Fetches the knowledge articles for the ticket's tags.
+
+    By default an LLM drives `fetch_articles` in a ReAct loop. With `direct=True`, the tool is called with the
+    tags from the state and its rows are used as-is (no LLM calls), optionally followed by a single re-ranking
+    pass (`rerank=True`). When no article matches the tags, the top `search_k` matches for the ticket text
+    are used instead, and the re-ranking pass (if enabled) keeps the single best one. That search is either
+    full-text (BM25) or, with `search="semantic"`, a nearest-neighbour lookup in the articles' vector index.
+
+    `speculate` runs that search for the top `speculative_k` articles before the ticket is classified (as its own
+    node, alongside the classifier). Once the tags are in, the candidates sharing at least one of them are used,
+    ordered by shared tags then search rank, without querying the database or running the ReAct loop again.
+    The speculation is only thrown away when none of the candidates shares a tag with the ticket.
+    """
+    def __init__(
+            self,
+            llm,
+            direct: bool = False,
+            rerank: bool = False,
+            search: Literal["fulltext", "semantic"] = "fulltext",
+            search_k: int = 5,
+            speculative_k: int = 20,
+    ):
         self.llm = llm
+        self.direct = direct
+        self.search_tool = semantic_search_articles if search == "semantic" else search_articles
+        self.search_k = search_k
+        self.speculative_k = speculative_k
+        self.reranker = Reranker(llm) if rerank else None
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", (
                 "You are an agent for Account: account_id={account_id} that needs to extract articles from a knowledge base (FAQ)."
 
                 "Based on the provided tags, fetch the most relevant articles from the knowledge base that can help resolve the user's issue."
 
-                "However, if no articles were found OR if the tags are an empty list, go through all the articles and find exactly one that best matches the ticket raised by the user."
+                "However, if no articles were found OR if the tags are an empty list, use the {search_tool} tool with the ticket text as the query, and pick exactly one article that best matches the ticket raised by the user."
 
                 "As output, provide a list of Python dictionaries with relevant articles with keys: \"title\", \"content\", and \"tags\". And that's it, nothing more."
             )),
@@ -26,25 +70,106 @@ class ArticlesFetcherAgent:
         ])
         self.agent = create_react_agent(
             model=self.llm,
-            tools=[fetch_articles],
+            tools=[fetch_articles, self.search_tool],
             response_format=ArticleFetcherResult,
         )
 
     def __call__(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
-        result = self.agent.invoke({
+        if (speculated := self._from_speculation(state)) is not None:
+            articles, top_k = speculated
+            result = _to_result(articles)
+            if self.reranker is not None:
+                result.relevant_articles = self.reranker(state["ticket_text"], result.relevant_articles, top_k)
+            return self._command(result)
+
+        if self.direct:
+            return self._command(self._fetch_directly(state))
+
+        result = self.agent.invoke(self._inputs(state))
+        return self._command(result["structured_response"])
+
+    async def acall(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        if (speculated := self._from_speculation(state)) is not None:
+            articles, top_k = speculated
+            result = _to_result(articles)
+            if self.reranker is not None:
+                result.relevant_articles = await self.reranker.acall(state["ticket_text"], result.relevant_articles, top_k)
+            return self._command(result)
+
+        if self.direct:
+            return self._command(await self._afetch_directly(state))
+
+        result = await self.agent.ainvoke(self._inputs(state))
+        return self._command(result["structured_response"])
+
+    def speculate(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        articles = self.search_tool.func(state["account_id"], state["ticket_text"], self.speculative_k)
+        return Command(goto=ORCHESTRATOR_AGENT_NAME, update={"speculative_articles": articles})
+
+    async def aspeculate(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        articles = await self.search_tool.coroutine(state["account_id"], state["ticket_text"], self.speculative_k)
+        return Command(goto=ORCHESTRATOR_AGENT_NAME, update={"speculative_articles": articles})
+
+    def _from_speculation(self, state: AgentState) -> tuple[list[dict], int | None] | None:
+        """
+        The speculative candidates narrowed down to the ticket's tags (and the re-ranker's top_k),
+        None when there are none to use.
+        """
+        candidates = state.get("speculative_articles")
+        if not candidates:
+            return None
+        tags = {tag.lower() for tag in state.get("tags") or []}
+        if not tags:
+            # What the tag-less fallback would have searched for anyway
+            return candidates[:self.search_k], 1
+
+        shared = [(len(tags & _article_tags(article)), position) for position, article in enumerate(candidates)]
+        ranked = sorted(((count, position) for count, position in shared if count), key=lambda x: (-x[0], x[1]))
+        if not ranked:
+            return None
+        return [candidates[position] for _, position in ranked], None
+
+    def _fetch_directly(self, state: AgentState) -> ArticleFetcherResult:
+        top_k = None
+        articles = fetch_articles.func(state["account_id"], state.get("tags")) if state.get("tags") else []
+        if not articles:
+            articles = self.search_tool.func(state["account_id"], state["ticket_text"], self.search_k)
+            top_k = 1
+
+        result = _to_result(articles)
+        if self.reranker is not None:
+            result.relevant_articles = self.reranker(state["ticket_text"], result.relevant_articles, top_k)
+        return result
+
+    async def _afetch_directly(self, state: AgentState) -> ArticleFetcherResult:
+        top_k = None
+        articles = await fetch_articles.coroutine(state["account_id"], state.get("tags")) if state.get("tags") else []
+        if not articles:
+            articles = await self.search_tool.coroutine(state["account_id"], state["ticket_text"], self.search_k)
+            top_k = 1
+
+        result = _to_result(articles)
+        if self.reranker is not None:
+            result.relevant_articles = await self.reranker.acall(state["ticket_text"], result.relevant_articles, top_k)
+        return result
+
+    def _inputs(self, state: AgentState) -> dict:
+        return {
             "messages": self.prompt.invoke({
                 "account_id": state['account_id'],
                 "tags": state['tags'],
                 "ticket_text": state["ticket_text"],
+                "search_tool": self.search_tool.name,
             }).messages,
-        })
-        structured_response = result["structured_response"]
+        }
 
+    def _command(self, structured_response: ArticleFetcherResult) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         return Command(
             goto=ORCHESTRATOR_AGENT_NAME,
             update={
                 "relevant_articles": [
                     {
+                        'article_id': article.article_id,
                         'title': article.title,
                         'content': article.content,
                         'tags': article.tags,
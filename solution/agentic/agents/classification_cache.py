@@ -0,0 +1,170 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from diskcache import Cache
+
+from agentic.tools.vector_index import Embedder, HashingEmbedder
+from agentic.instrumentation import record_cache_lookup
+
+
+def normalize_ticket_text(text: str) -> str:
+    """Lower-cases the text and drops punctuation and extra whitespace, so trivially different tickets share a key."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+# The only metadata the key depends on: the rest (e.g. the submission date) differs between otherwise identical tickets
+KEY_METADATA_FIELDS = ("channel",)
+# The in-memory embeddings are pruned of the entries evicted from disk once they outnumber the disk entries by this much
+PRUNE_RATIO = 1.25
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ClassificationCache:
+    """
+    Caches the ticket classifier's results on disk, in a size-bounded `diskcache` with LRU eviction.
+
+    Results are keyed by account, by the account's tag set (a new tag invalidates everything classified before it),
+    by the ticket's channel and by its normalized text. With a `similarity_threshold`, a ticket missing the exact key
+    can still reuse the result of the most similar previous ticket whose text embedding has at least that cosine
+    similarity and is still on disk.
+    """
+    def __init__(
+            self,
+            directory: Path,
+            size_limit: int = 2 ** 26,
+            similarity_threshold: float | None = None,
+            embedder: Embedder | None = None,
+    ):
+        self.cache = Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self.similarity_threshold = similarity_threshold
+        self.embedder = embedder or HashingEmbedder()
+        self._lock = threading.Lock()
+        # group -> (keys, embeddings) of the cached tickets, for the similarity tier
+        self._groups: dict[str, tuple[list[str], np.ndarray]] = {}
+        self._counters = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "lookup_seconds": 0.0, "miss_seconds": 0.0}
+
+    @staticmethod
+    def _group(account_id: str, tags: tuple[str, ...], ticket_metadata: dict) -> str:
+        metadata = {field: (ticket_metadata or {}).get(field) for field in KEY_METADATA_FIELDS}
+        return _digest(account_id, tags, metadata)
+
+    def lookup(self, account_id: str, tags: tuple[str, ...], ticket_text: str, ticket_metadata: dict) -> dict | None:
+        """
+        Returns the cached classification of the ticket (or of a similar enough one), None on a miss.
+        """
+        start = time.perf_counter()
+        group = self._group(account_id, tags, ticket_metadata)
+        text = normalize_ticket_text(ticket_text)
+
+        tier = "exact_hits"
+        entry = self.cache.get(("classification", group, text))
+        if entry is None and self.similarity_threshold is not None:
+            tier = "similar_hits"
+            entry = self._lookup_similar(group, text)
+
+        with self._lock:
+            self._counters["misses" if entry is None else tier] += 1
+            self._counters["lookup_seconds"] += time.perf_counter() - start
+        record_cache_lookup(entry is not None)
+        return None if entry is None else entry["result"]
+
+    def _lookup_similar(self, group: str, text: str) -> dict | None:
+        keys, embeddings = self._load_group(group)
+        if not keys:
+            return None
+        scores = embeddings @ self.embedder([text])[0]
+        for best in np.argsort(-scores):
+            if scores[best] < self.similarity_threshold:
+                break
+            entry = self.cache.get(("classification", group, keys[best]))
+            if entry is not None:
+                return entry
+            # Evicted from the disk cache since, the next best match may still be there
+            self._forget(group, keys[best])
+        return None
+
+    def _forget(self, group: str, text: str):
+        with self._lock:
+            keys, embeddings = self._groups.get(group, ([], None))
+            if text in keys:
+                index = keys.index(text)
+                self._groups[group] = (keys[:index] + keys[index + 1:], np.delete(embeddings, index, axis=0))
+
+    def _prune(self):
+        """Drops the embeddings of the entries evicted from disk (called with the lock held)."""
+        for group, (keys, embeddings) in list(self._groups.items()):
+            kept = [index for index, text in enumerate(keys) if ("classification", group, text) in self.cache]
+            self._groups[group] = ([keys[index] for index in kept], embeddings[kept])
+
+    def _load_group(self, group: str) -> tuple[list[str], np.ndarray]:
+        with self._lock:
+            if group not in self._groups:
+                # Rebuilt from the disk cache once per process, then kept up to date by `store`
+                keys, embeddings = [], []
+                for key in self.cache.iterkeys():
+                    if isinstance(key, tuple) and key[:2] == ("classification", group):
+                        entry = self.cache.get(key)
+                        # Entries stored without the similarity tier have no embedding
+                        if entry is not None and entry["embedding"] is not None:
+                            keys.append(key[2])
+                            embeddings.append(entry["embedding"])
+                self._groups[group] = (keys, np.asarray(embeddings, dtype=np.float32))
+            return self._groups[group]
+
+    def store(
+            self,
+            account_id: str,
+            tags: tuple[str, ...],
+            ticket_text: str,
+            ticket_metadata: dict,
+            result: dict,
+            llm_seconds: float = 0.0,
+    ):
+        """
+        Caches the classification of the ticket, `llm_seconds` being how long the LLM took to produce it.
+        """
+        group = self._group(account_id, tags, ticket_metadata)
+        text = normalize_ticket_text(ticket_text)
+        embedding = self.embedder([text])[0] if self.similarity_threshold is not None else None
+
+        self.cache.set(("classification", group, text), {
+            "result": result,
+            "embedding": None if embedding is None else embedding.tolist(),
+        })
+        with self._lock:
+            self._counters["miss_seconds"] += llm_seconds
+            if embedding is not None and group in self._groups:
+                keys, embeddings = self._groups[group]
+                if text not in keys:
+                    embeddings = np.vstack([embeddings, embedding]) if keys else embedding[np.newaxis]
+                    self._groups[group] = (keys + [text], embeddings)
+            if sum(len(keys) for keys, _ in self._groups.values()) > PRUNE_RATIO * len(self.cache):
+                self._prune()
+
+    def stats(self) -> dict[str, float]:
+        """
+        Hit rates, mean latencies and the LLM time saved so far (estimated from the mean latency of the misses).
+        """
+        with self._lock:
+            counters = dict(self._counters)
+        hits = counters["exact_hits"] + counters["similar_hits"]
+        lookups = hits + counters["misses"]
+        mean_miss_seconds = counters["miss_seconds"] / counters["misses"] if counters["misses"] else 0.0
+        return {
+            "lookups": lookups,
+            "exact_hits": counters["exact_hits"],
+            "similar_hits": counters["similar_hits"],
+            "misses": counters["misses"],
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "mean_lookup_ms": 1000 * counters["lookup_seconds"] / lookups if lookups else 0.0,
+            "mean_miss_ms": 1000 * mean_miss_seconds,
+            "saved_seconds": hits * mean_miss_seconds,
+        }
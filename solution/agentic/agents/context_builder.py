@@ -0,0 +1,124 @@
+import re
+from typing import Callable
+
+from agentic.agents.states import AgentState
+
+
+def estimate_tokens(text: str) -> int:
+    # About 4 characters per token for English text with the OpenAI tokenizers, close enough for budgeting
+    return (len(text) + 3) // 4
+
+
+def _words(text: str) -> set[str]:
+    return set(re.findall(r"\w{3,}", text.lower()))
+
+
+def _one_line(text) -> str:
+    return " ".join(str(text or "").split())
+
+
+def _created_at(item: dict) -> str | None:
+    # The fetchers keep the timestamps either as a field or inside their "other" summary
+    if item.get("created_at"):
+        return str(item["created_at"])
+    match = re.search(r"created_at=([^,\s]+)", str(item.get("other") or ""))
+    return match.group(1) if match and match.group(1) != "None" else None
+
+
+def _render_article(article: dict) -> str:
+    return f"- {_one_line(article.get('title'))} [{_one_line(article.get('tags'))}]: {_one_line(article.get('content'))}"
+
+
+def _render_reservation(reservation: dict) -> str:
+    return f"- [{reservation.get('status')}] {_one_line(reservation.get('content'))} ({_one_line(reservation.get('other'))})"
+
+
+def _render_ticket(ticket: dict) -> str:
+    content = " / ".join(_one_line(line) for line in str(ticket.get("content") or "").splitlines() if line.strip())
+    return f"- ({_one_line(ticket.get('other'))}) [{_one_line(ticket.get('tags'))}] {content}"
+
+
+# section -> (renderer, whether its items are ranked by recency, placeholder when empty)
+SECTIONS = {
+    "relevant_articles": (_render_article, False, "No relevant articles found."),
+    "previous_tickets": (_render_ticket, True, "No previous tickets found."),
+    "reservations": (_render_reservation, True, "No reservations found."),
+}
+
+
+class ContextBuilder:
+    """
+    Turns the records fetched into the state into compact prompt sections that fit a token budget.
+
+    Each section gets a share of `max_tokens` (what a short section leaves unused goes to the others), items are
+    rendered on one line, truncated to `max_item_tokens` and deduplicated. They are then ranked by their word overlap
+    with the ticket, plus their recency (tickets, reservations) or retrieval rank (articles), and the lowest ranked
+    ones are dropped once the budget is spent.
+    """
+    def __init__(
+            self,
+            max_tokens: int = 1500,
+            max_item_tokens: int = 300,
+            shares: dict[str, float] | None = None,
+            count_tokens: Callable[[str], int] = estimate_tokens,
+    ):
+        self.max_tokens = max_tokens
+        self.max_item_tokens = max_item_tokens
+        self.shares = shares or {"relevant_articles": 0.5, "previous_tickets": 0.3, "reservations": 0.2}
+        self.count_tokens = count_tokens
+
+    def __call__(self, state: AgentState) -> dict[str, str]:
+        ticket_words = _words(state.get("ticket_text") or "")
+        lines = {name: self._rank(name, state.get(name) or [], ticket_words) for name in self.shares}
+        costs = {name: [self.count_tokens(line) for line in section] for name, section in lines.items()}
+
+        budgets = {name: int(self.max_tokens * share) for name, share in self.shares.items()}
+        spare = sum(max(budgets[name] - sum(costs[name]), 0) for name in budgets)
+        for name in budgets:
+            extra = min(max(sum(costs[name]) - budgets[name], 0), spare)
+            budgets[name] += extra
+            spare -= extra
+
+        return {
+            name: self._fill(lines[name], costs[name], budgets[name]) or SECTIONS[name][2]
+            for name in self.shares
+        }
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        while (tokens := self.count_tokens(text)) > max_tokens:
+            text = text[:max(int(len(text) * max_tokens / tokens) - 1, 0)].rstrip() + "…"
+        return text
+
+    def _rank(self, name: str, items: list[dict], ticket_words: set[str]) -> list[str]:
+        render, by_recency, _ = SECTIONS[name]
+
+        unique = {}
+        for position, item in enumerate(items):
+            line = self._truncate(render(item), self.max_item_tokens)
+            unique.setdefault(line.lower(), (position, item, line))
+        candidates = list(unique.values())
+
+        # 1 for the newest (or first retrieved) item, down to 0 for the oldest (or last)
+        if by_recency:
+            order = sorted(candidates, key=lambda c: (_created_at(c[1]) is not None, _created_at(c[1]) or ""), reverse=True)
+        else:
+            order = candidates
+        rank = {id(candidate): 1 - idx / len(order) for idx, candidate in enumerate(order)}
+
+        def score(candidate) -> float:
+            overlap = len(ticket_words & _words(candidate[2])) / len(ticket_words) if ticket_words else 0.0
+            return overlap + 0.5 * rank[id(candidate)]
+
+        return [line for _, _, line in sorted(candidates, key=score, reverse=True)]
+
+    def _fill(self, lines: list[str], costs: list[int], budget: int) -> str:
+        kept = []
+        for line, cost in zip(lines, costs):
+            if cost > budget:
+                # Keep a truncated version of the item that no longer fits, unless it would be too short to help
+                if budget >= 32:
+                    kept.append(self._truncate(line, budget))
+                break
+            kept.append(line)
+            budget -= cost
+        return "\n".join(kept)
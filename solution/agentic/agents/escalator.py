@@ -3,13 +3,16 @@ from typing import Literal
 from langgraph.types import Command
 from langchain_core.prompts import ChatPromptTemplate
 
+from agentic.agents.context_builder import ContextBuilder
 from agentic.agents.states import AgentState, EscalationResult
 from agentic.agents.agent_names import ORCHESTRATOR_AGENT_NAME
 
 
 class EscalationAgent:
-    def __init__(self, llm):
+    def __init__(self, llm, context_builder: ContextBuilder | None = None):
         self.llm = llm
+        # Only the articles make it into this prompt, so they get the whole budget
+        self.context_builder = context_builder or ContextBuilder(shares={"relevant_articles": 1.0})
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", (
                 "You are an expert handling tickets for which no proper resolution was found by upstream agents / experts."
@@ -35,14 +38,23 @@ class EscalationAgent:
     def __call__(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         # Logic to escalate the ticket based on the gathered information
         chain = self.prompt | self.llm.with_structured_output(EscalationResult)
+        result = chain.invoke(self._inputs(state))
+        return self._command(result)
 
-        result = chain.invoke({
+    async def acall(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        chain = self.prompt | self.llm.with_structured_output(EscalationResult)
+        result = await chain.ainvoke(self._inputs(state))
+        return self._command(result)
+
+    def _inputs(self, state: AgentState) -> dict:
+        return {
             "ticket_text": state["ticket_text"],
             "ticket_metadata": state["ticket_metadata"],
-            "relevant_articles": state["relevant_articles"],
-            "user_preference": state["user_preference"]
-        })
+            "user_preference": state["user_preference"],
+            **self.context_builder(state),
+        }
 
+    def _command(self, result: EscalationResult) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         return Command(
             goto=ORCHESTRATOR_AGENT_NAME,
             update={
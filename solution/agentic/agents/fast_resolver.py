@@ -0,0 +1,91 @@
+from typing import Literal
+
+from langgraph.types import Command
+from langchain_core.prompts import ChatPromptTemplate
+
+from agentic.agents.context_builder import ContextBuilder
+from agentic.agents.states import AgentState, create_fast_resolution_state
+from agentic.agents.agent_names import ORCHESTRATOR_AGENT_NAME
+from agentic.tools.tools import search_articles, semantic_search_articles
+
+
+class FastResolutionAgent:
+    """
+    Handles a simple ticket in a single LLM call: candidate articles are retrieved by searching the ticket text
+    (no LLM involved), then one structured output holds the classification, the resolution and the memory update.
+
+    The orchestrator decides from the returned scores whether that is good enough, or whether the ticket goes
+    through the full multi-agent path.
+    """
+    def __init__(
+            self,
+            llm,
+            search: Literal["fulltext", "semantic"] = "fulltext",
+            search_k: int = 5,
+            context_builder: ContextBuilder | None = None,
+    ):
+        self.llm = llm
+        self.search_tool = semantic_search_articles if search == "semantic" else search_articles
+        self.search_k = search_k
+        self.context_builder = context_builder or ContextBuilder(shares={"relevant_articles": 1.0})
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", (
+                "You are a support expert for Account: {account_id}, handling a ticket raised by a user from start to end."
+
+                "First, assign tags to the ticket based on the tags provided in the output schema (it may need several),"
+                " and assess whether answering it requires the user's previous tickets or their reservations / event bookings,"
+                " which you are NOT given. Make a self-assessment on whether you managed to classify the ticket clearly."
+
+                "Then, using the knowledge (FAQ) articles below, write a clear and concise resolution that directly addresses"
+                " the user's concerns, tailored to the user preference if available. Score from 0 to 100 how well it resolves"
+                " the issue. IMPORTANT: if the articles do not cover the ticket, or it needs the user's previous tickets or"
+                " reservations, make that clear by returning a score that is low (below 30)."
+
+                "Finally, decide whether the ticket reveals a user preference worth remembering for future visits"
+                " (e.g. tone, technical level)."
+            )),
+            ("user", (
+                "Ticket:\n\n{ticket_text}\n\nwith the following metadata:\n\n{ticket_metadata}\n\n"
+                "Knowledge articles:\n\n{relevant_articles}\n\n"
+                "User preference (if any):\n{user_preference}"
+            )),
+        ])
+
+    def __call__(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        articles = self.search_tool.func(state["account_id"], state["ticket_text"], self.search_k)
+        result = self._chain(state).invoke(self._inputs(state, articles))
+        return self._command(result, articles)
+
+    async def acall(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        articles = await self.search_tool.coroutine(state["account_id"], state["ticket_text"], self.search_k)
+        result = await self._chain(state).ainvoke(self._inputs(state, articles))
+        return self._command(result, articles)
+
+    def _chain(self, state: AgentState):
+        FastResolutionState = create_fast_resolution_state(state["account_id"])
+        return self.prompt | self.llm.with_structured_output(FastResolutionState)
+
+    def _inputs(self, state: AgentState, articles: list[dict]) -> dict:
+        return {
+            "account_id": state["account_id"],
+            "ticket_text": state["ticket_text"],
+            "ticket_metadata": state["ticket_metadata"],
+            "user_preference": state.get("user_preference"),
+            **self.context_builder({"ticket_text": state["ticket_text"], "relevant_articles": articles}),
+        }
+
+    def _command(self, result, articles: list[dict]) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        return Command(
+            goto=ORCHESTRATOR_AGENT_NAME,
+            update={
+                "is_ticket_classified_score": result.is_ticket_classified_score,
+                "needs_info_about_previous_user_tickets_score": result.needs_info_about_previous_user_tickets_score,
+                "needs_info_about_reservations_score": result.needs_info_about_reservations_score,
+                "tags": result.tags,
+                "relevant_articles": articles,
+                "resolution_text": result.resolution_text,
+                "is_resolved_score": result.is_resolved_score,
+                "should_update_preference": result.should_update_preference,
+                "new_preference": result.new_preference,
+            },
+        )
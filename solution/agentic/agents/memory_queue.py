@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import Callable
+
+from diskcache import Deque
+from langchain_core.prompts import ChatPromptTemplate
+
+from agentic.agents.states import AgentState, MemoryUpdate, MemoryUpdateBatch
+
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryQueue:
+    """
+    A persistent FIFO of completed tickets waiting for their memory update, shared by processes using the same
+    `directory`. The orchestrator appends to it instead of running the memory updater before the graph ends.
+    """
+    def __init__(self, directory: Path):
+        self.deque = Deque(directory=str(directory))
+
+    def put(self, state: AgentState):
+        self.deque.append({
+            "user_id": state["user_id"],
+            "ticket_text": state["ticket_text"],
+            "resolution_text": state.get("resolution_text"),
+            "escalation_reason": state.get("escalation_reason"),
+        })
+
+    def take(self, max_items: int) -> list[dict]:
+        items = []
+        while len(items) < max_items:
+            try:
+                items.append(self.deque.popleft())
+            except IndexError:
+                break
+        return items
+
+    def give_back(self, items: list[dict]):
+        # Back to the front, in their original order, so they are retried first
+        for item in reversed(items):
+            self.deque.appendleft(item)
+
+    def __len__(self) -> int:
+        return len(self.deque)
+
+
+class MemoryBatchWorker:
+    """
+    Drains a MemoryQueue `batch_size` tickets at a time, with a single LLM call per batch, and hands each ticket's
+    memory update to `remember(user_id, update)`, usually the orchestrator's `remember` (which stores it where the
+    memory updater would). A batch whose LLM call fails (or is cancelled) is put back in the queue, but delivery is
+    at-most-once: a worker process that dies between `take()` and the last write loses the batch it held.
+    """
+    def __init__(self, llm, queue: MemoryQueue, remember: Callable[[str, MemoryUpdate], None], batch_size: int = 8):
+        self.llm = llm
+        self.queue = queue
+        self.remember = remember
+        self.batch_size = batch_size
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", (
+                "You are a Long-Term Memory Manager. Your job is to analyze support interactions"
+                " and decide, for each of them, if there is information worth saving for future visits."
+
+                "Focus on:"
+                "1. User preferences (e.g., tone, technical level)."
+                "2. Recurring issues."
+                "3. Successful resolutions for complex problems."
+
+                "Return exactly one update per ticket, with the ticket's index."
+            )),
+            ("user", "{tickets}")
+        ])
+
+    def run_batch(self) -> int:
+        """Processes the next batch, returning how many tickets it held (0 once the queue is empty)."""
+        if not (batch := self.queue.take(self.batch_size)):
+            return 0
+        try:
+            result = self._chain().invoke(self._inputs(batch))
+        except BaseException:
+            # Including KeyboardInterrupt, the batch is not lost when the worker is stopped mid-call
+            self.queue.give_back(batch)
+            raise
+        self._store(batch, result)
+        return len(batch)
+
+    async def arun_batch(self) -> int:
+        if not (batch := self.queue.take(self.batch_size)):
+            return 0
+        try:
+            result = await self._chain().ainvoke(self._inputs(batch))
+        except BaseException:
+            # Including the CancelledError of a service shutting down, the batch is not lost mid-call
+            self.queue.give_back(batch)
+            raise
+        self._store(batch, result)
+        return len(batch)
+
+    def drain(self) -> int:
+        processed = 0
+        while count := self.run_batch():
+            processed += count
+        return processed
+
+    async def adrain(self) -> int:
+        processed = 0
+        while count := await self.arun_batch():
+            processed += count
+        return processed
+
+    async def serve(self, interval: float = 1.0):
+        """Drains the queue every `interval` seconds until cancelled, e.g. as a background task of a service."""
+        while True:
+            try:
+                await self.adrain()
+            except Exception:
+                # The failed batch is back in the queue, the next round retries it
+                logger.exception("Memory batch failed")
+            await asyncio.sleep(interval)
+
+    def _chain(self):
+        return self.prompt | self.llm.with_structured_output(MemoryUpdateBatch)
+
+    def _inputs(self, batch: list[dict]) -> dict:
+        return {
+            "tickets": "\n\n".join(
+                f"Ticket {index}:\n{item['ticket_text']}\n\nResolution:\n{item['resolution_text']}"
+                f"\n\nEscalation message (if any):\n{item['escalation_reason'] or ''}"
+                for index, item in enumerate(batch)
+            ),
+        }
+
+    def _store(self, batch: list[dict], result: MemoryUpdateBatch):
+        # In ticket order, so that the latest ticket of a user has the last word
+        for update in sorted(result.updates, key=lambda update: update.ticket_index):
+            if 0 <= update.ticket_index < len(batch):
+                self.remember(batch[update.ticket_index]["user_id"], update)
@@ -26,17 +26,28 @@ class MemoryUpdaterAgent:
 
     def __call__(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         chain = self.prompt | self.llm.with_structured_output(MemoryUpdate)
+        result = chain.invoke(self._inputs(state))
+        return self._command(result)
 
-        result = chain.invoke({
+    async def acall(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        chain = self.prompt | self.llm.with_structured_output(MemoryUpdate)
+        result = await chain.ainvoke(self._inputs(state))
+        return self._command(result)
+
+    def _inputs(self, state: AgentState) -> dict:
+        return {
             "ticket_text": state["ticket_text"],
             "resolution_text": state["resolution_text"],
             "escalation_reason": state.get("escalation_reason", "")
-        })
+        }
 
+    def _command(self, result: MemoryUpdate) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         return Command(
             goto=ORCHESTRATOR_AGENT_NAME,
             update={
                 "should_update_preference": result.should_update_preference,
                 "new_preference": result.new_preference,
+                "resolution_summary": result.resolution_summary,
+                "recurring_issue": result.recurring_issue,
             }
         )
@@ -1,25 +1,106 @@
+import hashlib
+import json
 from typing import Literal
 from pathlib import Path
 
 from diskcache import Cache
 
+from langgraph.runtime import get_runtime
 from langgraph.types import Command
 from langgraph.graph import END
 
-from agentic.agents.states import AgentState
+from agentic.agents.memory_queue import MemoryQueue
+from agentic.agents.preference_store import PreferenceStore, memory_items, render_memory
+from agentic.agents.states import AgentState, MemoryUpdate
 from agentic.agents.agent_names import (
     ORCHESTRATOR_AGENT_NAME,
     TICKET_CLASSIFIER_AGENT_NAME,
     TICKET_FETCHER_AGENT_NAME,
     RESERVATION_FETCHER_AGENT_NAME,
     ARTICLE_FETCHER_AGENT_NAME,
+    SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME,
     RESOLUTION_AGENT_NAME,
     ESCALATION_AGENT_NAME,
     MEMORY_UPDATER_AGENT_NAME,
+    FAST_RESOLUTION_AGENT_NAME,
 )
 
 
+OFF_TOPIC_RESPONSE = (
+    "Thanks for reaching out! This doesn't look like something our support team can help with. "
+    "If you have a question about your account, subscription or reservations, please open a new ticket with the details."
+)
+
+DEFAULT_AGENT_LIST = [END, MEMORY_UPDATER_AGENT_NAME, RESOLUTION_AGENT_NAME, ARTICLE_FETCHER_AGENT_NAME, TICKET_CLASSIFIER_AGENT_NAME]
+
+# What the agents write about a ticket, and the values a new ticket on the same thread starts from
+# (None clears the lists of fetched records, see `merge_records`)
+TICKET_STATE_DEFAULTS = {
+    "tags": [],
+    "is_ticket_classified_score": -1.0,
+    "needs_info_about_previous_user_tickets_score": -1.0,
+    "needs_info_about_reservations_score": -1.0,
+    "previous_tickets": None,
+    "reservations": None,
+    "relevant_articles": None,
+    "speculative_articles": None,
+    "resolution_text": None,
+    "is_resolved_score": -1.0,
+    "escalation_reason": None,
+    "urgency_level": None,
+    "should_update_preference": False,
+    "new_preference": None,
+    "resolution_summary": None,
+    "recurring_issue": None,
+}
+
+
+def ticket_key(state: AgentState) -> str:
+    """
+    Identifies the ticket a routing plan belongs to: the run id, when the caller passes one in the config
+    (`{"run_id": uuid.uuid4(), ...}`, so that even a retried ticket starts over), or else a hash of the ticket.
+    """
+    try:
+        run_id = get_runtime().execution_info.run_id
+    except (RuntimeError, AttributeError):
+        # Called outside of a graph run, or by a LangGraph version without execution info
+        run_id = None
+    if run_id is not None:
+        return f"run:{run_id}"
+    ticket = [state.get(field) for field in ("ticket_text", "ticket_metadata", "account_id", "user_id")]
+    return hashlib.sha256(json.dumps(ticket, sort_keys=True, default=str).encode()).hexdigest()
+
+
 class OrchestratorAgent:
+    """
+    Routes a ticket through the agents.
+
+    The routing plan (a stack of agent names, popped from the end) lives in the AgentState rather than on
+    this object, so a single compiled graph can process many tickets at once (e.g. with `graph.batch`).
+    It is stored along with its `ticket_key`, so that the next ticket on a thread starts from a fresh plan (and a
+    fresh ticket state) even when the previous run failed midway.
+
+    With `parallel_fetchers=True`, every fetcher whose score passes its threshold runs in the same superstep
+    as the articles fetcher, and their results are merged by the reducers defined on the AgentState.
+
+    With `speculative_articles=True`, a tag-free article search runs in the same superstep as the classifier,
+    and the articles fetcher then narrows its candidates down to the tags instead of fetching from scratch.
+
+    With an `off_topic_threshold`, a ticket classified below it (or without any tag) skips the rest of the plan:
+    it gets `off_topic_response` without any further LLM call, or with `off_topic_action="escalate"`, goes
+    straight to the escalation agent.
+
+    With a `fast_path_threshold`, every ticket first goes to the fast resolution agent (a single LLM call).
+    Its answer is final when both its classification and resolution scores reach the threshold and it did not
+    need the user's previous tickets or reservations. Otherwise the ticket takes the full path, skipping the
+    classifier when the fast path's classification already passes `is_ticket_classified_score_threshold`.
+
+    With a `memory_queue`, the memory updater is taken out of the plan: resolved or escalated tickets are queued
+    for a MemoryBatchWorker and the graph ends right away.
+
+    User memory is kept as one preference string per user in the `cache_directory` diskcache, or with a
+    `preference_store`, as a bounded list of typed items (preferences, recurring issues, resolution summaries).
+    """
     def __init__(
             self,
             is_ticket_classified_score_threshold: float = 70.0,
@@ -27,57 +108,189 @@ class OrchestratorAgent:
             needs_info_about_reservations_threshold: float = 70.0,
             is_resolved_score_threshold: float = 70.0,
             cache_directory: Path = Path("cache_directory"),
+            parallel_fetchers: bool = False,
+            speculative_articles: bool = False,
+            off_topic_threshold: float | None = None,
+            off_topic_action: Literal["respond", "escalate"] = "respond",
+            off_topic_response: str = OFF_TOPIC_RESPONSE,
+            fast_path_threshold: float | None = None,
+            memory_queue: MemoryQueue | None = None,
+            preference_store: PreferenceStore | None = None,
     ):
         self.is_ticket_classified_score_threshold = is_ticket_classified_score_threshold
         self.needs_info_about_previous_user_tickets_threshold = needs_info_about_previous_user_tickets_threshold
         self.needs_info_about_reservations_threshold = needs_info_about_reservations_threshold
         self.is_resolved_score_threshold = is_resolved_score_threshold
         self.cache = Cache(cache_directory)
-        self.agent_list = [END, MEMORY_UPDATER_AGENT_NAME, RESOLUTION_AGENT_NAME, ARTICLE_FETCHER_AGENT_NAME, TICKET_CLASSIFIER_AGENT_NAME]
-
+        self.parallel_fetchers = parallel_fetchers
+        self.speculative_articles = speculative_articles
+        self.off_topic_threshold = off_topic_threshold
+        self.off_topic_action = off_topic_action
+        self.off_topic_response = off_topic_response
+        self.fast_path_threshold = fast_path_threshold
+        self.memory_queue = memory_queue
+        self.preference_store = preference_store
 
     def __call__(self, state: AgentState) -> Command[Literal[TICKET_CLASSIFIER_AGENT_NAME, TICKET_FETCHER_AGENT_NAME,
                                                              RESERVATION_FETCHER_AGENT_NAME, ARTICLE_FETCHER_AGENT_NAME,
-                                                             RESOLUTION_AGENT_NAME, ESCALATION_AGENT_NAME,
-                                                             MEMORY_UPDATER_AGENT_NAME, END]]:
+                                                             SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME, RESOLUTION_AGENT_NAME,
+                                                             ESCALATION_AGENT_NAME, MEMORY_UPDATER_AGENT_NAME,
+                                                             FAST_RESOLUTION_AGENT_NAME, END]]:
+        update = {}
+        agent_list = list(state.get("agent_list") or [])
+        key = ticket_key(state)
 
-        # Start off by extracting user preferences
-        if user_id := state["user_id"]:     
-            state["user_preference"] = self.cache.get(user_id)
-        else:
-            state["user_preference"] = None
+        if not agent_list or state.get("ticket_key") != key:
+            # A new ticket, or one whose previous run failed midway: start over by extracting user preferences
+            agent_list = list(DEFAULT_AGENT_LIST)
+            if self.memory_queue is not None:
+                agent_list.remove(MEMORY_UPDATER_AGENT_NAME)
+            most_recent_agent = ORCHESTRATOR_AGENT_NAME
+            user_id = state.get("user_id")
+            update["user_preference"] = self.recall(user_id) if user_id else None
+            update["ticket_key"] = key
+            # Clear whatever was fetched, answered and learnt for a previous ticket on the same thread
+            update.update(TICKET_STATE_DEFAULTS)
+
+            if self.fast_path_threshold is not None:
+                # The full plan is kept aside, in case the fast path's answer is not good enough
+                print(f"Orchestrator delegating to: {FAST_RESOLUTION_AGENT_NAME}")
+                update["agent_list"] = agent_list
+                update["most_recent_agent"] = FAST_RESOLUTION_AGENT_NAME
+                return Command(goto=FAST_RESOLUTION_AGENT_NAME, update=update)
 
-        most_recent_agent = ORCHESTRATOR_AGENT_NAME
-        while self.agent_list:
-            next_step = self.agent_list.pop()
-            print(f"Orchestrator delegating to: {next_step}")
+            if self.speculative_articles and ARTICLE_FETCHER_AGENT_NAME in agent_list:
+                # Fan out: the article search starts right away, while the classifier works on the tags
+                next_step = agent_list.pop()
+                print(f"Orchestrator delegating to: {next_step}, {SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME}")
+
+                update["agent_list"] = agent_list
+                update["most_recent_agent"] = next_step
+                return Command(goto=[next_step, SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME], update=update)
+        else:
+            most_recent_agent = state.get("most_recent_agent")
 
-            # Handle output from the ticket classifier agent
-            if most_recent_agent == TICKET_CLASSIFIER_AGENT_NAME:
+        # Handle output from the fast resolution agent
+        if most_recent_agent == FAST_RESOLUTION_AGENT_NAME:
+            if self._is_fast_resolved(state):
+                print("Orchestrator accepting the fast resolution")
+                self._remember(state)
+                agent_list = [END]
+            else:
+                # The fast path's search candidates would otherwise end up ahead of what the articles fetcher finds
+                update["relevant_articles"] = None
                 if state['is_ticket_classified_score'] >= self.is_ticket_classified_score_threshold:
-                    if state['needs_info_about_previous_user_tickets_score'] >= self.needs_info_about_previous_user_tickets_threshold:
-                        self.agent_list.append(TICKET_FETCHER_AGENT_NAME)
-                    elif state['needs_info_about_reservations_score'] >= self.needs_info_about_reservations_threshold:
-                        self.agent_list.append(RESERVATION_FETCHER_AGENT_NAME)
+                    # The classification holds, so the full path carries on as if the classifier had just run
+                    agent_list.remove(TICKET_CLASSIFIER_AGENT_NAME)
+                    most_recent_agent = TICKET_CLASSIFIER_AGENT_NAME
+
+        # Short-circuit off-topic tickets, nothing fetched or resolved for them and no preference to learn
+        if most_recent_agent == TICKET_CLASSIFIER_AGENT_NAME and self._is_off_topic(state):
+            print("\t! Orchestrator short-circuiting an off-topic ticket !")
+            update["is_resolved_score"] = 0.0
+            if self.off_topic_action == "escalate":
+                agent_list = [END, ESCALATION_AGENT_NAME]
+                update["resolution_text"] = None
+            else:
+                agent_list = [END]
+                update["resolution_text"] = self.off_topic_response
+                update["escalation_reason"] = None
+                update["urgency_level"] = None
+
+        # Handle output from the ticket classifier agent
+        elif most_recent_agent == TICKET_CLASSIFIER_AGENT_NAME:
+            fetchers = self._select_fetchers(state)
+            if self.parallel_fetchers and ARTICLE_FETCHER_AGENT_NAME in agent_list:
+                # Fan out: the selected fetchers and the articles fetcher all run in the next superstep
+                agent_list.remove(ARTICLE_FETCHER_AGENT_NAME)
+                next_steps = fetchers + [ARTICLE_FETCHER_AGENT_NAME]
+                print(f"Orchestrator delegating to: {', '.join(next_steps)}")
+
+                update["agent_list"] = agent_list
+                update["most_recent_agent"] = ARTICLE_FETCHER_AGENT_NAME
+                return Command(goto=next_steps, update=update)
+
+            agent_list.extend(fetchers)
+
+        # Handle output from the resolution agent
+        if most_recent_agent == RESOLUTION_AGENT_NAME:
+            if state['is_resolved_score'] < self.is_resolved_score_threshold:
+                print("\t! Orchestrator deciding to escalate the ticket !")
+                agent_list.append(ESCALATION_AGENT_NAME)
+
+        # Handle output from the memory updater agent
+        if most_recent_agent == MEMORY_UPDATER_AGENT_NAME:
+            self._remember(state)
+
+        next_step = agent_list.pop()
+        print(f"Orchestrator delegating to: {next_step}")
+
+        if self.memory_queue is not None and next_step == END \
+                and most_recent_agent in (RESOLUTION_AGENT_NAME, ESCALATION_AGENT_NAME):
+            self.memory_queue.put(state)
+
+        # Remember the remaining plan and which node we are going to, the next call picks up from there
+        update["agent_list"] = agent_list
+        update["most_recent_agent"] = next_step
+
+        return Command(goto=next_step, update=update)
+
+    async def acall(self, state: AgentState) -> Command[Literal[TICKET_CLASSIFIER_AGENT_NAME, TICKET_FETCHER_AGENT_NAME,
+                                                                   RESERVATION_FETCHER_AGENT_NAME,
+                                                                   ARTICLE_FETCHER_AGENT_NAME, RESOLUTION_AGENT_NAME,
+                                                                   SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME,
+                                                                   ESCALATION_AGENT_NAME, MEMORY_UPDATER_AGENT_NAME,
+                                                                   FAST_RESOLUTION_AGENT_NAME, END]]:
+        # Routing only reads / writes the local diskcache, so there is nothing worth awaiting here
+        return self(state)
 
-            # Handle output from the resolution agent
-            if most_recent_agent == RESOLUTION_AGENT_NAME:
-                if state['is_resolved_score'] < self.is_resolved_score_threshold:
-                    print("\t! Orchestrator deciding to escalate the ticket !")
-                    self.agent_list.append(ESCALATION_AGENT_NAME)
+    def recall(self, user_id: str) -> str | None:
+        if self.preference_store is not None:
+            return render_memory(self.preference_store.get(user_id))
+        return self.cache.get(user_id)
 
-            # Handle output from the memory updater agent
-            if most_recent_agent == MEMORY_UPDATER_AGENT_NAME:
-                if state["should_update_preference"]:
-                    if user_id := state["user_id"]:
-                        self.cache.set(user_id, state["new_preference"])
+    def remember(self, user_id: str | None, update: MemoryUpdate):
+        """
+        Stores what was learnt about the user from a ticket (by the memory updater, the fast path or a batch worker).
+        """
+        if not user_id:
+            return
+        if self.preference_store is not None:
+            self.preference_store.add(user_id, memory_items(update))
+        elif update.should_update_preference:
+            self.cache.set(user_id, update.new_preference)
 
-            # Remember which node we just came from
-            most_recent_agent = next_step
+    def _remember(self, state: AgentState):
+        self.remember(state["user_id"], MemoryUpdate(
+            new_preference=state.get("new_preference"),
+            resolution_summary=state.get("resolution_summary"),
+            recurring_issue=state.get("recurring_issue"),
+            should_update_preference=state["should_update_preference"],
+        ))
 
-            return Command(goto=next_step)
+    def _is_fast_resolved(self, state: AgentState) -> bool:
+        return (
+            state['is_ticket_classified_score'] >= self.fast_path_threshold
+            and state['is_resolved_score'] >= self.fast_path_threshold
+            and state['needs_info_about_previous_user_tickets_score'] < self.needs_info_about_previous_user_tickets_threshold
+            and state['needs_info_about_reservations_score'] < self.needs_info_about_reservations_threshold
+        )
 
-        raise ValueError("Orchestrator has no more agents to delegate to, the final one should have been END.")
+    def _is_off_topic(self, state: AgentState) -> bool:
+        if self.off_topic_threshold is None:
+            return False
+        return state['is_ticket_classified_score'] < self.off_topic_threshold or not state.get('tags')
 
-    def reset(self):
-        self.agent_list = [END, MEMORY_UPDATER_AGENT_NAME, RESOLUTION_AGENT_NAME, ARTICLE_FETCHER_AGENT_NAME, TICKET_CLASSIFIER_AGENT_NAME]
+    def _select_fetchers(self, state: AgentState) -> list[str]:
+        """
+        Picks the fetchers needed for a classified ticket. Sequentially, only one of the two is used
+        (previous tickets take precedence), while in the parallel mode every fetcher over its threshold is.
+        """
+        fetchers = []
+        if state['is_ticket_classified_score'] >= self.is_ticket_classified_score_threshold:
+            if state['needs_info_about_previous_user_tickets_score'] >= self.needs_info_about_previous_user_tickets_threshold:
+                fetchers.append(TICKET_FETCHER_AGENT_NAME)
+            if state['needs_info_about_reservations_score'] >= self.needs_info_about_reservations_threshold:
+                if self.parallel_fetchers or not fetchers:
+                    fetchers.append(RESERVATION_FETCHER_AGENT_NAME)
+        return fetchers
@@ -0,0 +1,190 @@
+import json
+from abc import ABC, abstractmethod
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Literal
+
+from diskcache import Cache
+from pydantic import BaseModel
+from sqlalchemy import Column, Float, MetaData, String, Table, Text, delete, select
+from sqlalchemy.dialects.sqlite import insert
+
+from agentic.agents.classification_cache import normalize_ticket_text
+from agentic.agents.states import MemoryUpdate
+from data.database import get_engine
+
+
+MemoryKind = Literal["preference", "recurring_issue", "resolution_summary"]
+
+# How each kind of memory item is introduced in the prompts
+_HEADINGS: dict[str, str] = {
+    "preference": "Preferences",
+    "recurring_issue": "Recurring issues",
+    "resolution_summary": "Previously resolved",
+}
+
+
+class MemoryItem(BaseModel):
+    """A single thing remembered about a user."""
+    kind: MemoryKind
+    text: str
+    updated_at: float
+
+
+def memory_items(update: MemoryUpdate, now: float | None = None) -> list[MemoryItem]:
+    """The items worth keeping from a memory update (the preference only when the updater asked to save it)."""
+    now = time.time() if now is None else now
+    texts = {
+        "preference": update.new_preference if update.should_update_preference else None,
+        "recurring_issue": update.recurring_issue,
+        "resolution_summary": update.resolution_summary,
+    }
+    return [
+        MemoryItem(kind=kind, text=text.strip(), updated_at=now)
+        for kind, text in texts.items() if text and text.strip()
+    ]
+
+
+def render_memory(items: list[MemoryItem]) -> str | None:
+    """Formats a user's items for the prompts' "user preference" slot, None when there is nothing to tell."""
+    lines = []
+    for kind, heading in _HEADINGS.items():
+        texts = [item.text for item in items if item.kind == kind]
+        if texts:
+            lines.append(f"{heading}: {'; '.join(texts)}")
+    return "\n".join(lines) or None
+
+
+class PreferenceStore(ABC):
+    """
+    Keeps a bounded list of typed memory items per user, stored as a single record so that a lookup is one keyed read.
+
+    Adding an item that is already known (same kind and normalized text) only refreshes it. Each kind keeps its
+    `max_items_per_kind` most recent items, and items older than `ttl_seconds` are dropped (never, when None).
+    Subclasses provide the storage: `_read_many`, `_write` and `clear`.
+    """
+    def __init__(self, max_items_per_kind: int = 5, ttl_seconds: float | None = 90 * 24 * 3600):
+        self.max_items_per_kind = max_items_per_kind
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> list[MemoryItem]:
+        return self.get_many([user_id])[user_id]
+
+    def get_many(self, user_ids: Iterable[str]) -> dict[str, list[MemoryItem]]:
+        """Prefetches the items of many users at once (users without any get an empty list)."""
+        user_ids = list(dict.fromkeys(user_ids))
+        records = self._read_many(user_ids)
+        return {user_id: self._live(records.get(user_id) or []) for user_id in user_ids}
+
+    def add(self, user_id: str, items: list[MemoryItem]):
+        if not items:
+            return
+        with self._lock:
+            merged = self._merge(self.get(user_id), items)
+            self._write(user_id, [item.model_dump() for item in merged], self._expires_at(merged))
+
+    def _live(self, records: list[dict]) -> list[MemoryItem]:
+        items = [MemoryItem.model_validate(record) for record in records]
+        if self.ttl_seconds is None:
+            return items
+        oldest = time.time() - self.ttl_seconds
+        return [item for item in items if item.updated_at >= oldest]
+
+    def _merge(self, existing: list[MemoryItem], new: list[MemoryItem]) -> list[MemoryItem]:
+        latest: dict[tuple[str, str], MemoryItem] = {}
+        for item in existing + new:
+            key = (item.kind, normalize_ticket_text(item.text))
+            if key not in latest or item.updated_at >= latest[key].updated_at:
+                latest[key] = item
+
+        kept = []
+        for kind in _HEADINGS:
+            items = sorted((item for item in latest.values() if item.kind == kind), key=lambda item: -item.updated_at)
+            kept.extend(items[:self.max_items_per_kind])
+        return kept
+
+    def _expires_at(self, items: list[MemoryItem]) -> float | None:
+        # The whole record can go once its newest item has expired
+        if self.ttl_seconds is None:
+            return None
+        return max(item.updated_at for item in items) + self.ttl_seconds
+
+    @abstractmethod
+    def _read_many(self, user_ids: list[str]) -> dict[str, list[dict]]:
+        ...
+
+    @abstractmethod
+    def _write(self, user_id: str, records: list[dict], expires_at: float | None):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class DiskCachePreferenceStore(PreferenceStore):
+    """A PreferenceStore in a size-bounded `diskcache` (LRU eviction), the expired records are evicted by diskcache."""
+    def __init__(self, directory: Path, size_limit: int = 2 ** 30, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+
+    def _read_many(self, user_ids: list[str]) -> dict[str, list[dict]]:
+        return {user_id: self.cache.get(("memory", user_id)) for user_id in user_ids}
+
+    def _write(self, user_id: str, records: list[dict], expires_at: float | None):
+        expire = None if expires_at is None else max(expires_at - time.time(), 0)
+        self.cache.set(("memory", user_id), records, expire=expire)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class SQLitePreferenceStore(PreferenceStore):
+    """
+    A PreferenceStore in a SQLite table with one row per user (keyed by user_id), for stores too big to keep in a cache
+    or shared between hosts through a file. Expired rows are deleted by `purge_expired`.
+    """
+    # SQLite limits the number of bound parameters per statement
+    CHUNK_SIZE = 500
+
+    def __init__(self, db_path: Path, **kwargs):
+        super().__init__(**kwargs)
+        self.engine = get_engine(str(db_path))
+        self.table = Table(
+            "user_memory",
+            MetaData(),
+            Column("user_id", String, primary_key=True),
+            Column("memory_items", Text, nullable=False),
+            Column("expires_at", Float, index=True),
+        )
+        self.table.create(self.engine, checkfirst=True)
+
+    def _read_many(self, user_ids: list[str]) -> dict[str, list[dict]]:
+        records = {}
+        with self.engine.connect() as connection:
+            for start in range(0, len(user_ids), self.CHUNK_SIZE):
+                query = (
+                    select(self.table.c.user_id, self.table.c.memory_items)
+                    .where(self.table.c.user_id.in_(user_ids[start:start + self.CHUNK_SIZE]))
+                )
+                records.update({user_id: json.loads(items) for user_id, items in connection.execute(query)})
+        return records
+
+    def _write(self, user_id: str, records: list[dict], expires_at: float | None):
+        statement = insert(self.table).values(user_id=user_id, memory_items=json.dumps(records), expires_at=expires_at)
+        statement = statement.on_conflict_do_update(
+            index_elements=[self.table.c.user_id],
+            set_={"memory_items": statement.excluded.memory_items, "expires_at": statement.excluded.expires_at},
+        )
+        with self.engine.begin() as connection:
+            connection.execute(statement)
+
+    def purge_expired(self) -> int:
+        with self.engine.begin() as connection:
+            return connection.execute(delete(self.table).where(self.table.c.expires_at < time.time())).rowcount
+
+    def clear(self):
+        with self.engine.begin() as connection:
+            connection.execute(delete(self.table))
@@ -0,0 +1,50 @@
+from pydantic import BaseModel
+from langchain_core.prompts import ChatPromptTemplate
+
+from agentic.agents.states import RerankResult
+
+
+class Reranker:
+    """
+    A single LLM pass that picks (and orders) the records relevant to a ticket, used by the fetchers
+    in their "direct" mode, where the records come straight from the database rather than from a ReAct loop.
+    """
+    def __init__(self, llm):
+        self.llm = llm
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", (
+                "You are helping a support agent resolve a ticket raised by a user."
+
+                "You will be given the ticket and a numbered list of records (e.g. knowledge articles, reservations or previous tickets)."
+
+                "Return the indices of the records that are relevant to the ticket, the most relevant first. Skip the irrelevant ones."
+                "{limit_instruction}"
+            )),
+            ("user", "Ticket text:\n\n{ticket_text}\n\nRecords:\n\n{records}"),
+        ])
+
+    def __call__(self, ticket_text: str, items: list[BaseModel], top_k: int | None = None) -> list[BaseModel]:
+        if not items:
+            return items
+        chain = self.prompt | self.llm.with_structured_output(RerankResult)
+        result = chain.invoke(self._inputs(ticket_text, items, top_k))
+        return self._select(items, result, top_k)
+
+    async def acall(self, ticket_text: str, items: list[BaseModel], top_k: int | None = None) -> list[BaseModel]:
+        if not items:
+            return items
+        chain = self.prompt | self.llm.with_structured_output(RerankResult)
+        result = await chain.ainvoke(self._inputs(ticket_text, items, top_k))
+        return self._select(items, result, top_k)
+
+    def _inputs(self, ticket_text: str, items: list[BaseModel], top_k: int | None) -> dict:
+        return {
+            "ticket_text": ticket_text,
+            "records": "\n".join(f"[{idx}] {item.model_dump()}" for idx, item in enumerate(items)),
+            "limit_instruction": f" Return at most {top_k} indices." if top_k else "",
+        }
+
+    def _select(self, items: list[BaseModel], result: RerankResult, top_k: int | None) -> list[BaseModel]:
+        # Ignore hallucinated or repeated indices
+        indices = list(dict.fromkeys(idx for idx in result.relevant_indices if 0 <= idx < len(items)))
+        return [items[idx] for idx in indices[:top_k]]
@@ -4,14 +4,46 @@ from langgraph.types import Command
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.prebuilt import create_react_agent
 
-from agentic.agents.states import AgentState, ReservationFetcherResult
+from agentic.agents.states import AgentState, ReservationFetcherResult, _Reservation
 from agentic.agents.agent_names import ORCHESTRATOR_AGENT_NAME
+from agentic.agents.reranker import Reranker
 from agentic.tools.tools import fetch_reservations
 
 
+def _to_result(reservations: list[dict]) -> ReservationFetcherResult:
+    return ReservationFetcherResult(reservations=[
+        _Reservation(reservation_details=_details(res), reservation_status=res["status"], reservation_other=_other(res))
+        for res in reservations
+    ])
+
+
+def _details(res: dict) -> str:
+    # `fetch_reservations` leaves the experience fields out when the reservation has no experience
+    if "experience_title" not in res:
+        return "Unknown experience"
+    return (
+        f"{res['experience_title']} in {res['experience_location']} on {res['experience_when']}: "
+        f"{res['experience_description']}"
+    )
+
+
+def _other(res: dict) -> str:
+    other = f"reservation_id={res['reservation_id']}, created_at={res['created_at']}"
+    if "experience_title" in res:
+        other += f", is_premium={res['experience_is_premium']}, slots_available={res['experience_slots_available']}"
+    return other
+
+
 class ReservationFetcherAgent:
-    def __init__(self, llm):
+    """
+    Fetches the user's reservations, either through an LLM driving `fetch_reservations` in a ReAct loop,
+    or (with `direct=True`) by calling the tool with the user_id from the state, optionally followed by
+    a single LLM re-ranking pass (`rerank=True`).
+    """
+    def __init__(self, llm, direct: bool = False, rerank: bool = False):
         self.llm = llm
+        self.direct = direct
+        self.reranker = Reranker(llm) if rerank else None
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", (
                 "You are an agent for Account: account_id={account_id} that needs to extract reservations from the database."
@@ -28,13 +60,34 @@ class ReservationFetcherAgent:
 
     def __call__(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         # Logic to fetch reservations based on the user_id
-        result = self.agent.invoke({
+        if self.direct:
+            result = _to_result(fetch_reservations.func(state["user_id"]))
+            if self.reranker is not None:
+                result.reservations = self.reranker(state["ticket_text"], result.reservations)
+            return self._command(result)
+
+        result = self.agent.invoke(self._inputs(state))
+        return self._command(result["structured_response"])
+
+    async def acall(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        if self.direct:
+            result = _to_result(await fetch_reservations.coroutine(state["user_id"]))
+            if self.reranker is not None:
+                result.reservations = await self.reranker.acall(state["ticket_text"], result.reservations)
+            return self._command(result)
+
+        result = await self.agent.ainvoke(self._inputs(state))
+        return self._command(result["structured_response"])
+
+    def _inputs(self, state: AgentState) -> dict:
+        return {
             "messages": self.prompt.invoke({
+                "account_id": state['account_id'],
                 "user_id": state['user_id'],
             }).messages,
-        })
-        structured_response = result["structured_response"]
+        }
 
+    def _command(self, structured_response: ReservationFetcherResult) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         return Command(
             goto=ORCHESTRATOR_AGENT_NAME,
             update={
@@ -48,4 +101,3 @@ class ReservationFetcherAgent:
                 ]
             }
         )
-
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from diskcache import Cache
+from sqlalchemy import Engine, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import data.models.udahub as udahub
+from agentic.agents.classification_cache import normalize_ticket_text
+from agentic.agents.states import AgentState
+from agentic.instrumentation import record_cache_lookup
+from agentic.tools.tools import UDAHUB_ASYNC_ENGINE, UDAHUB_ENGINE
+
+
+def _versions_query(article_ids: list[str]):
+    return (
+        select(
+            udahub.Knowledge.article_id,
+            udahub.Knowledge.updated_at,
+            udahub.Knowledge.title,
+            udahub.Knowledge.content,
+            udahub.Knowledge.tags,
+        )
+        .where(udahub.Knowledge.article_id.in_(article_ids))
+        .order_by(udahub.Knowledge.article_id)
+    )
+
+
+def _versions(rows) -> list[tuple[str, str, str]]:
+    # updated_at has a one-second resolution, so the content is hashed as well to catch quicker edits
+    return [
+        (article_id, str(updated_at), hashlib.sha256(f"{title}\n{content}\n{tags}".encode()).hexdigest())
+        for article_id, updated_at, title, content, tags in rows
+    ]
+
+
+class ResolutionCache:
+    """
+    Caches the resolver's drafts on disk (size-bounded, LRU eviction), so FAQ-style tickets answered by the same articles
+    are resolved without calling the LLM again.
+
+    Drafts are keyed by account, sorted tags, user preference and the referenced articles *as they are in the database
+    right now* (id, `updated_at` and a hash of their content). Changing or deleting an article changes the key, so stale
+    drafts are never served. Tickets relying on the user's own reservations or previous tickets are never cached.
+    """
+    def __init__(
+            self,
+            directory: Path,
+            size_limit: int = 2 ** 26,
+            engine: Engine = UDAHUB_ENGINE,
+            async_engine: AsyncEngine = UDAHUB_ASYNC_ENGINE,
+    ):
+        self.cache = Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self.engine = engine
+        self.async_engine = async_engine
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "uncacheable": 0}
+
+    @staticmethod
+    def _article_ids(state: AgentState) -> list[str] | None:
+        if state.get("reservations") or state.get("previous_tickets"):
+            return None
+        articles = state.get("relevant_articles") or []
+        article_ids = sorted({article.get("article_id") for article in articles})
+        # Articles written by the LLM without their id can't be tracked
+        if not article_ids or None in article_ids:
+            return None
+        return article_ids
+
+    @staticmethod
+    def _key(state: AgentState, versions: list[tuple[str, str, str]]) -> str:
+        preference = normalize_ticket_text(state.get("user_preference") or "")
+        return hashlib.sha256(json.dumps(
+            [state["account_id"], sorted(state.get("tags") or []), preference, versions]
+        ).encode()).hexdigest()
+
+    def key(self, state: AgentState) -> str | None:
+        """
+        The key of the draft for this state, None when the state should not be cached.
+        """
+        if (article_ids := self._article_ids(state)) is None:
+            self._count("uncacheable")
+            return None
+        with self.engine.connect() as connection:
+            versions = _versions(connection.execute(_versions_query(article_ids)))
+        return self._key(state, versions)
+
+    async def akey(self, state: AgentState) -> str | None:
+        if (article_ids := self._article_ids(state)) is None:
+            self._count("uncacheable")
+            return None
+        async with self.async_engine.connect() as connection:
+            versions = _versions(await connection.execute(_versions_query(article_ids)))
+        return self._key(state, versions)
+
+    def get(self, key: str) -> dict | None:
+        draft = self.cache.get(("resolution", key))
+        self._count("misses" if draft is None else "hits")
+        record_cache_lookup(draft is not None)
+        return draft
+
+    def set(self, key: str, draft: dict):
+        self.cache.set(("resolution", key), draft)
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {**counters, "hit_rate": counters["hits"] / lookups if lookups else 0.0}
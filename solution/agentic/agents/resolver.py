@@ -1,57 +1,128 @@
 from typing import Literal
 
+from langgraph.constants import TAG_NOSTREAM
 from langgraph.types import Command
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
-from agentic.agents.states import AgentState, ResolutionResult
+from agentic.agents.context_builder import ContextBuilder
+from agentic.agents.resolution_cache import ResolutionCache
+from agentic.agents.states import AgentState, ResolutionResult, ResolutionScore
 from agentic.agents.agent_names import ORCHESTRATOR_AGENT_NAME
 
 
 class ResolutionAgent:
-    def __init__(self, llm):
+    def __init__(
+            self,
+            llm,
+            cache: ResolutionCache | None = None,
+            context_builder: ContextBuilder | None = None,
+            stream: bool = False,
+    ):
         self.llm = llm
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", (
-                "You are an expert formulting a final resolution to a ticket raised by a user."
-                
-                "Using all the information gathered so far, including previous tickets and reservations, provide a comprehensive resolution to the user's issue."
-                "Make sure the resolution is clear, concise, and directly addresses the user's concerns."
+        # Keeps the fetched records in the prompt within a token budget
+        self.context_builder = context_builder or ContextBuilder()
+        # Opt-in: tickets answered by the same (unchanged) articles reuse an earlier draft
+        self.cache = cache
+        # Opt-in: the resolution is written as plain text (so its tokens can be streamed), then scored in a second call
+        self.stream = stream
+        system = (
+            "You are an expert formulting a final resolution to a ticket raised by a user."
+            
+            "Using all the information gathered so far, including previous tickets and reservations, provide a comprehensive resolution to the user's issue."
+            "Make sure the resolution is clear, concise, and directly addresses the user's concerns."
 
-                "You will also be given the original ticket text and metadata to ensure your resolution is relevant."
-                "Also, consider any relevant articles that might assist in resolving the issue."
+            "You will also be given the original ticket text and metadata to ensure your resolution is relevant."
+            "Also, consider any relevant articles that might assist in resolving the issue."
 
-                "You will also be given a user preference, if available, to tailor your response accordingly."
-                "\n\nBased on all this information, provide a final resolution."
-            )),
-            ("user", (
-                "Resolve this ticket:\n\n{ticket_text}\n\nwith the following metadata:\n\n{ticket_metadata}"
-
-                "Also, consider any relevant articles that might assist in resolving the issue:\n\n{relevant_articles}."
+            "You will also be given a user preference, if available, to tailor your response accordingly."
+            "\n\nBased on all this information, provide a final resolution."
+        )
+        context = (
+            "Resolve this ticket:\n\n{ticket_text}\n\nwith the following metadata:\n\n{ticket_metadata}"
 
-                "Assigned tags: {tags}\n\n"
-                "User preference (if any):\n{user_preference}\n\n"
-                "User reservations (if any):\n{reservations}\n\n"
-                "User previous tickets (if any):\n{previous_tickets}\n\n"
+            "Also, consider any relevant articles that might assist in resolving the issue:\n\n{relevant_articles}."
 
-                "Return a final resolution and a score from 0 to 100 indicating how well the resolution addresses the user's issue."
-                " IMPORTANT: if the ticket has nothing to do with the user's previous tickets, or reservations, or knowledge articles (in which case they will be missing), make that clear by"
-                " returning a score that is low (below 30)."
+            "Assigned tags: {tags}\n\n"
+            "User preference (if any):\n{user_preference}\n\n"
+            "User reservations (if any):\n{reservations}\n\n"
+            "User previous tickets (if any):\n{previous_tickets}\n\n"
+        )
+        score_instructions = (
+            " IMPORTANT: if the ticket has nothing to do with the user's previous tickets, or reservations, or knowledge articles (in which case they will be missing), make that clear by"
+            " returning a score that is low (below 30)."
+        )
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", system),
+            ("user", (
+                context +
+                "Return a final resolution and a score from 0 to 100 indicating how well the resolution addresses the user's issue." +
+                score_instructions
+            )),
+        ])
+        self.text_prompt = ChatPromptTemplate.from_messages([
+            ("system", system),
+            ("user", context + "Reply with the resolution only, written to the user."),
+        ])
+        self.score_prompt = ChatPromptTemplate.from_messages([
+            ("system", "You are an expert reviewing the resolution written for a ticket raised by a user."),
+            ("user", (
+                context +
+                "Resolution:\n\n{resolution_text}\n\n"
+                "Return a score from 0 to 100 indicating how well the resolution addresses the user's issue." +
+                score_instructions
             )),
         ])
 
     def __call__(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         # Logic to provide the final resolution based on the gathered information
-        chain = self.prompt | self.llm.with_structured_output(ResolutionResult)
-        result = chain.invoke({
+        key = self.cache.key(state) if self.cache is not None else None
+        if key is not None and (draft := self.cache.get(key)) is not None:
+            return self._command(ResolutionResult.model_validate(draft))
+
+        result = self._resolve(self._inputs(state))
+        if key is not None:
+            self.cache.set(key, result.model_dump())
+        return self._command(result)
+
+    async def acall(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        key = await self.cache.akey(state) if self.cache is not None else None
+        if key is not None and (draft := self.cache.get(key)) is not None:
+            return self._command(ResolutionResult.model_validate(draft))
+
+        result = await self._aresolve(self._inputs(state))
+        if key is not None:
+            self.cache.set(key, result.model_dump())
+        return self._command(result)
+
+    def _resolve(self, inputs: dict) -> ResolutionResult:
+        if not self.stream:
+            return (self.prompt | self.llm.with_structured_output(ResolutionResult)).invoke(inputs)
+        resolution_text = (self.text_prompt | self.llm | StrOutputParser()).invoke(inputs)
+        score = self._score_chain().invoke({**inputs, "resolution_text": resolution_text})
+        return ResolutionResult(resolution_text=resolution_text, is_resolved_score=score.is_resolved_score)
+
+    async def _aresolve(self, inputs: dict) -> ResolutionResult:
+        if not self.stream:
+            return await (self.prompt | self.llm.with_structured_output(ResolutionResult)).ainvoke(inputs)
+        resolution_text = await (self.text_prompt | self.llm | StrOutputParser()).ainvoke(inputs)
+        score = await self._score_chain().ainvoke({**inputs, "resolution_text": resolution_text})
+        return ResolutionResult(resolution_text=resolution_text, is_resolved_score=score.is_resolved_score)
+
+    def _score_chain(self):
+        # Kept out of stream_mode="messages", so callers only receive the tokens of the resolution itself
+        return (self.score_prompt | self.llm.with_structured_output(ResolutionScore)).with_config(tags=[TAG_NOSTREAM])
+
+    def _inputs(self, state: AgentState) -> dict:
+        return {
             "ticket_text": state["ticket_text"],
             "ticket_metadata": state["ticket_metadata"],
-            "relevant_articles": state["relevant_articles"],
             "tags": state["tags"],
             "user_preference": state["user_preference"],
-            "reservations": state.get("reservations", "No reservations found."),
-            "previous_tickets": state.get("previous_tickets", "No previous tickets found."),
-        })
+            **self.context_builder(state),
+        }
 
+    def _command(self, result: ResolutionResult) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         return Command(
             goto=ORCHESTRATOR_AGENT_NAME,
             update={
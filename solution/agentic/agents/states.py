@@ -1,10 +1,28 @@
-from functools import cache
-from typing import Literal, Type
+from functools import lru_cache
+from typing import Annotated, Literal, Type
 
 from langgraph.graph.message import MessagesState
 from pydantic import BaseModel, Field, create_model
 
-from utils import get_available_tags
+from agentic.tag_registry import TAG_REGISTRY
+
+
+# How many tag sets keep their output schemas around (one per account, give or take the accounts editing their tags)
+SCHEMA_CACHE_SIZE = 256
+
+
+def merge_records(existing: list[dict] | None, new: list[dict] | None) -> list[dict]:
+    """
+    Reducer for the lists of fetched records, so that fetchers running in the same superstep can all write to the state.
+    New records are appended (skipping duplicates), while `None` clears the list (used when a new ticket starts).
+    """
+    if new is None:
+        return []
+    merged = list(existing or [])
+    for record in new:
+        if record not in merged:
+            merged.append(record)
+    return merged
 
 
 class AgentState(MessagesState):
@@ -21,13 +39,15 @@ class AgentState(MessagesState):
     needs_info_about_reservations_score: float = -1.0
 
     # Previous tickets attributes
-    previous_tickets: list[dict[str, str]] = []
+    previous_tickets: Annotated[list[dict[str, str]], merge_records] = []
     
     # Reservations attributes
-    reservations: list[dict[str, str]] = []
+    reservations: Annotated[list[dict[str, str]], merge_records] = []
 
     # Articles attributes
-    relevant_articles: list[dict[str, str]] = []
+    relevant_articles: Annotated[list[dict[str, str]], merge_records] = []
+    # Candidates retrieved from the ticket text while the classifier runs (None when there was no speculation)
+    speculative_articles: list[dict[str, str]] | None = None
 
     # Resolution attributes
     resolution_text: str | None = None
@@ -40,17 +60,30 @@ class AgentState(MessagesState):
     # Summary attributes
     should_update_preference: bool = False
     new_preference: str | None = None
+    resolution_summary: str | None = None
+    recurring_issue: str | None = None
+
+    # Routing attributes (owned by the orchestrator, so that they live per invocation / thread)
+    agent_list: list[str] = []
+    most_recent_agent: str | None = None
+    # Which ticket the plan above belongs to (see `orchestrator.ticket_key`)
+    ticket_key: str | None = None
 
 
-@cache
 def create_dynamic_classifier_state(account_id: str) -> Type[BaseModel]:
+    """
+    Returns the classifier's output schema for the account, rebuilt only when its tag set changes.
+    """
+    return _classifier_state_for_tags(TAG_REGISTRY.tags(account_id))
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _classifier_state_for_tags(current_tags: tuple[str, ...]) -> Type[BaseModel]:
     """
     Creates a Pydantic model on-the-fly using the available tags.
     """
-    current_tags: list[str] = get_available_tags(account_id)
-    
-    # We create a Literal type from the list
-    TagLiteral = Literal[tuple(current_tags)]
+    # We create a Literal type from the list (an account without any tag yet can still be classified)
+    TagLiteral = Literal[current_tags] if current_tags else str
     
     # Define the fields for our dynamic model
     fields = {
@@ -76,8 +109,34 @@ def create_dynamic_classifier_state(account_id: str) -> Type[BaseModel]:
     return create_model("DynamicClassifierState", **fields)
 
 
+def create_fast_resolution_state(account_id: str) -> Type[BaseModel]:
+    """
+    Returns the fast path's output schema for the account: the classifier's, plus the resolution and memory update.
+    """
+    return _fast_resolution_state_for_tags(TAG_REGISTRY.tags(account_id))
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _fast_resolution_state_for_tags(current_tags: tuple[str, ...]) -> Type[BaseModel]:
+    return create_model(
+        "FastResolutionState",
+        __base__=_classifier_state_for_tags(current_tags),
+        resolution_text=(str, Field(description="A response resolving the issue.")),
+        is_resolved_score=(
+            float,
+            Field(description="A score between 0 and 100 indicating how well the issue was resolved.")
+        ),
+        should_update_preference=(bool, Field(description="Whether there is a user preference worth saving.")),
+        new_preference=(
+            str | None,
+            Field(description="A specific user preference found (e.g. 'Prefers short emails')")
+        ),
+    )
+
+
 class _Article(BaseModel):
     """Represents a single knowledge base article."""
+    article_id: str | None = Field(description="The identifier of the article, as returned by the tool.")
     title: str = Field(description="The title of the article.")
     content: str = Field(description="The full body content or summary of the article.")
     tags: str = Field(description="Comma-separated tags or a single string describing the article category.")
@@ -110,6 +169,11 @@ class ResolutionResult(BaseModel):
     is_resolved_score: float = Field(description="A score between 0 and 100 indicating how well the issue was resolved.")
 
 
+class ResolutionScore(BaseModel):
+    """Schema for scoring a resolution that was written beforehand."""
+    is_resolved_score: float = Field(description="A score between 0 and 100 indicating how well the issue was resolved.")
+
+
 class EscalationResult(BaseModel):
     """Schema for escalation results."""
     escalation_reason: str = Field(description="A brief explanation of why the ticket is being escalated.")
@@ -120,9 +184,20 @@ class MemoryUpdate(BaseModel):
     """Schema for extracting long-term memory."""
     new_preference: str | None = Field(description="A specific user preference found (e.g. 'Prefers short emails')")
     resolution_summary: str | None = Field(description="A 1-sentence summary of the resolved issue.")
+    recurring_issue: str | None = Field(description="An issue the user keeps running into, if this ticket shows one.")
     should_update_preference: bool = Field(description="Whether there is actually anything worth saving.")
 
 
+class _TicketMemoryUpdate(MemoryUpdate):
+    """The memory update for one of the tickets of a batch."""
+    ticket_index: int = Field(description="The index of the ticket, as given in the batch.")
+
+
+class MemoryUpdateBatch(BaseModel):
+    """Schema for extracting long-term memory from several tickets at once."""
+    updates: list[_TicketMemoryUpdate] = Field(description="One memory update per ticket of the batch.")
+
+
 class _Ticket(BaseModel):
     """Represents a single previous ticket raised by the user."""
     ticket_content: str = Field(description="The full text content of the ticket.")
@@ -135,3 +210,10 @@ class TicketFetcherResult(BaseModel):
     previous_tickets: list[_Ticket] = Field(
         description="A list of previous tickets raised by the user."
     )
+
+
+class RerankResult(BaseModel):
+    """Schema for re-ranking records fetched from the database against the ticket."""
+    relevant_indices: list[int] = Field(
+        description="Indices of the records that help resolving the ticket, the most relevant first."
+    )
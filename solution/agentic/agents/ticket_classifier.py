@@ -1,15 +1,20 @@
+import time
 from typing import Literal
 
 from langgraph.types import Command
 from langchain_core.prompts import ChatPromptTemplate
 
+from agentic.agents.classification_cache import ClassificationCache
 from agentic.agents.states import AgentState, create_dynamic_classifier_state
 from agentic.agents.agent_names import ORCHESTRATOR_AGENT_NAME
+from agentic.tag_registry import TAG_REGISTRY
 
 
 class TicketClassifierAgent:
-    def __init__(self, llm):
+    def __init__(self, llm, cache: ClassificationCache | None = None):
         self.llm = llm
+        # Tickets already classified (or similar enough to one) are then answered without calling the LLM
+        self.cache = cache
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", (
                 "You are a support classifier for Account: {account_id}."
@@ -37,18 +42,47 @@ class TicketClassifierAgent:
         """
         Classifies the ticket and updates the state with classification results.
         """
+        if (result := self._cached(state)) is None:
+            start = time.perf_counter()
+            result = self._chain(state).invoke(self._inputs(state))
+            self._store(state, result, time.perf_counter() - start)
+        return self._command(result)
+
+    async def acall(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        """
+        The async counterpart of `__call__`, used when the graph is run with `ainvoke` / `astream`.
+        """
+        if (result := self._cached(state)) is None:
+            start = time.perf_counter()
+            result = await self._chain(state).ainvoke(self._inputs(state))
+            self._store(state, result, time.perf_counter() - start)
+        return self._command(result)
+
+    def _cache_args(self, state: AgentState) -> tuple:
         account_id = state["account_id"]
-        
-        DynamicClassifierState = create_dynamic_classifier_state(account_id)
+        return account_id, TAG_REGISTRY.tags(account_id), state["ticket_text"], state["ticket_metadata"]
 
-        chain = self.prompt | self.llm.with_structured_output(DynamicClassifierState)
-        
-        result = chain.invoke({
+    def _cached(self, state: AgentState):
+        if self.cache is None or (cached := self.cache.lookup(*self._cache_args(state))) is None:
+            return None
+        return create_dynamic_classifier_state(state["account_id"]).model_validate(cached)
+
+    def _store(self, state: AgentState, result, llm_seconds: float):
+        if self.cache is not None:
+            self.cache.store(*self._cache_args(state), result.model_dump(), llm_seconds)
+
+    def _chain(self, state: AgentState):
+        DynamicClassifierState = create_dynamic_classifier_state(state["account_id"])
+        return self.prompt | self.llm.with_structured_output(DynamicClassifierState)
+
+    def _inputs(self, state: AgentState) -> dict:
+        return {
             "ticket_text": state["ticket_text"],
             "ticket_metadata": state["ticket_metadata"],
-            "account_id": account_id
-        }) 
-        
+            "account_id": state["account_id"],
+        }
+
+    def _command(self, result) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         return Command(
             goto=ORCHESTRATOR_AGENT_NAME,
             update={
@@ -4,19 +4,45 @@ from langgraph.types import Command
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.prebuilt import create_react_agent
 
-from agentic.agents.states import AgentState, TicketFetcherResult
+from agentic.agents.states import AgentState, TicketFetcherResult, _Ticket
 from agentic.agents.agent_names import ORCHESTRATOR_AGENT_NAME
+from agentic.agents.reranker import Reranker
 from agentic.tools.tools import fetch_tickets
 
 
+def _to_result(tickets: list[dict]) -> TicketFetcherResult:
+    previous_tickets = []
+    for ticket in tickets:
+        metadata = ticket["metadata"] or {}
+        previous_tickets.append(_Ticket(
+            ticket_content="\n".join(f"{msg['role']}: {msg['content']}" for msg in ticket["messages"]),
+            ticket_tags=metadata.get("tags") or "",
+            ticket_other=(
+                f"channel={ticket['channel']}, created_at={ticket['created_at']}, "
+                f"status={metadata.get('status')}, issue_type={metadata.get('issue_type')}"
+            ),
+        ))
+    return TicketFetcherResult(previous_tickets=previous_tickets)
+
+
 class TicketFetcherAgent:
-    def __init__(self, llm):
+    """
+    Fetches the user's previous tickets, either through an LLM driving `fetch_tickets` in a ReAct loop,
+    or (with `direct=True`) by calling the tool with the user_id from the state, optionally followed by
+    a single LLM re-ranking pass (`rerank=True`).
+    """
+    def __init__(self, llm, direct: bool = False, rerank: bool = False):
         self.llm = llm
+        self.direct = direct
+        self.reranker = Reranker(llm) if rerank else None
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", (
                 "You are an agent for Account: account_id={account_id} that needs to extract previous tickets from the database."
 
                 "Based on the user_id and ticket_text, fetch the most relevant previous tickets from the database that can help resolve the user's issue."
+
+                " The tickets come newest first, one page at a time: only if older tickets are needed, fetch the next page"
+                " by passing the `cursor` of the last ticket as `before`."
             )),
             ("user", "Ticket text:\n\n{ticket_text}\n\nuser_id:\n\n{user_id}\n\naccount_id:\n\n{account_id}"),
         ])
@@ -28,15 +54,35 @@ class TicketFetcherAgent:
 
     def __call__(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         # Logic to fetch tickets based on the user_id
-        result = self.agent.invoke({
+        if self.direct:
+            result = _to_result(fetch_tickets.func(state["user_id"]))
+            if self.reranker is not None:
+                result.previous_tickets = self.reranker(state["ticket_text"], result.previous_tickets)
+            return self._command(result)
+
+        result = self.agent.invoke(self._inputs(state))
+        return self._command(result["structured_response"])
+
+    async def acall(self, state: AgentState) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
+        if self.direct:
+            result = _to_result(await fetch_tickets.coroutine(state["user_id"]))
+            if self.reranker is not None:
+                result.previous_tickets = await self.reranker.acall(state["ticket_text"], result.previous_tickets)
+            return self._command(result)
+
+        result = await self.agent.ainvoke(self._inputs(state))
+        return self._command(result["structured_response"])
+
+    def _inputs(self, state: AgentState) -> dict:
+        return {
             "messages": self.prompt.invoke({
                 "user_id": state['user_id'],
                 "ticket_text": state["ticket_text"],
                 "account_id": state['account_id'],
             }).messages,
-        })
-        structured_response = result["structured_response"]
+        }
 
+    def _command(self, structured_response: TicketFetcherResult) -> Command[Literal[ORCHESTRATOR_AGENT_NAME]]:
         return Command(
             goto=ORCHESTRATOR_AGENT_NAME,
             update={
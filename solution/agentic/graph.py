@@ -0,0 +1,116 @@
+from typing import Literal
+
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, END
+
+from agentic.agents.classification_cache import ClassificationCache
+from agentic.agents.resolution_cache import ResolutionCache
+from agentic.agents.states import AgentState
+from agentic.instrumentation import Instrumentation
+from agentic.agents import (
+    OrchestratorAgent,
+    TicketClassifierAgent,
+    TicketFetcherAgent,
+    ReservationFetcherAgent,
+    ArticlesFetcherAgent,
+    ResolutionAgent,
+    EscalationAgent,
+    MemoryUpdaterAgent,
+    FastResolutionAgent,
+)
+from agentic.agents.agent_names import (
+    ORCHESTRATOR_AGENT_NAME,
+    TICKET_CLASSIFIER_AGENT_NAME,
+    TICKET_FETCHER_AGENT_NAME,
+    RESERVATION_FETCHER_AGENT_NAME,
+    ARTICLE_FETCHER_AGENT_NAME,
+    SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME,
+    RESOLUTION_AGENT_NAME,
+    ESCALATION_AGENT_NAME,
+    MEMORY_UPDATER_AGENT_NAME,
+    FAST_RESOLUTION_AGENT_NAME,
+)
+
+
+def as_node(agent, node: str | None = None, instrumentation: Instrumentation | None = None) -> RunnableLambda:
+    """
+    Wraps an agent so that the graph calls `agent(state)` when run with `invoke` / `stream`,
+    and awaits `agent.acall(state)` when run with `ainvoke` / `astream`.
+    With `instrumentation`, each run is recorded under the `node` name.
+    """
+    return _as_node(agent, agent.acall, type(agent).__name__, node, instrumentation)
+
+
+def _as_node(func, afunc, name: str, node: str | None, instrumentation: Instrumentation | None) -> RunnableLambda:
+    if instrumentation is not None:
+        func, afunc = instrumentation.wrap(node or name, func), instrumentation.awrap(node or name, afunc)
+    return RunnableLambda(func, afunc=afunc, name=name)
+
+
+def build_workflow(
+        llm,
+        orchestrator_agent: OrchestratorAgent,
+        direct_fetchers: bool = False,
+        rerank_fetched: bool = False,
+        article_search: Literal["fulltext", "semantic"] = "fulltext",
+        classification_cache: ClassificationCache | None = None,
+        resolution_cache: ResolutionCache | None = None,
+        stream_resolution: bool = False,
+        instrumentation: Instrumentation | None = None,
+) -> StateGraph:
+    """
+    Creates the state graph with the orchestrator as the entry point and all the other agents
+    (sharing the same LLM) reporting back to it. Compile the result with a checkpointer of choice.
+
+    With `direct_fetchers=True` the fetchers query the database without a ReAct loop,
+    and `rerank_fetched=True` adds a single LLM re-ranking pass over what they fetched.
+    `article_search` picks how articles are searched for when the tags find none.
+    A `classification_cache` lets the classifier skip the LLM for tickets it has already seen,
+    and a `resolution_cache` lets the resolver reuse the drafts of tickets answered by the same articles.
+    With `stream_resolution=True` the resolver writes its answer as plain text before scoring it, so the tokens
+    of `resolution_text` reach callers streaming with `stream_mode="messages"` as they are generated.
+    The speculative articles search and the fast resolution agent are only added when the orchestrator uses them.
+    With `instrumentation`, every node run records its latency, LLM usage, tool calls, SQL queries and cache lookups.
+    """
+    workflow = StateGraph(AgentState)
+
+    articles_fetcher = ArticlesFetcherAgent(llm, direct=direct_fetchers, rerank=rerank_fetched, search=article_search)
+    agents = {
+        TICKET_CLASSIFIER_AGENT_NAME: TicketClassifierAgent(llm, cache=classification_cache),
+        TICKET_FETCHER_AGENT_NAME: TicketFetcherAgent(llm, direct=direct_fetchers, rerank=rerank_fetched),
+        RESERVATION_FETCHER_AGENT_NAME: ReservationFetcherAgent(llm, direct=direct_fetchers, rerank=rerank_fetched),
+        ARTICLE_FETCHER_AGENT_NAME: articles_fetcher,
+        RESOLUTION_AGENT_NAME: ResolutionAgent(llm, cache=resolution_cache, stream=stream_resolution),
+        ESCALATION_AGENT_NAME: EscalationAgent(llm),
+        MEMORY_UPDATER_AGENT_NAME: MemoryUpdaterAgent(llm),
+    }
+    if orchestrator_agent.fast_path_threshold is not None:
+        agents[FAST_RESOLUTION_AGENT_NAME] = FastResolutionAgent(llm, search=article_search)
+
+    # The orchestrator may delegate to any of the agents, while they all go back to the orchestrator
+    speculative = (SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME,) if orchestrator_agent.speculative_articles else ()
+    workflow.add_node(
+        ORCHESTRATOR_AGENT_NAME,
+        as_node(orchestrator_agent, ORCHESTRATOR_AGENT_NAME, instrumentation),
+        destinations=(*agents, *speculative, END),
+    )
+    workflow.set_entry_point(ORCHESTRATOR_AGENT_NAME)
+
+    for name, agent in agents.items():
+        workflow.add_node(name, as_node(agent, name, instrumentation), destinations=(ORCHESTRATOR_AGENT_NAME,))
+
+    if speculative:
+        # The tag-free article search the orchestrator starts alongside the classifier
+        workflow.add_node(
+            SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME,
+            _as_node(
+                articles_fetcher.speculate,
+                articles_fetcher.aspeculate,
+                "SpeculativeArticlesFetcher",
+                SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME,
+                instrumentation,
+            ),
+            destinations=(ORCHESTRATOR_AGENT_NAME,),
+        )
+
+    return workflow
@@ -0,0 +1,270 @@
+"""
+Per-node instrumentation of the workflow: wall time, LLM calls / tokens / cost, tool calls, SQL queries and cache lookups.
+
+    instrumentation = Instrumentation()
+    workflow = build_workflow(llm, orchestrator_agent, instrumentation=instrumentation)
+    ...
+    print(instrumentation.registry.to_prometheus())
+
+Every node run is also logged as one JSON line on the `agentic.instrumentation` logger.
+"""
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+from sqlalchemy import Engine, event
+
+
+logger = logging.getLogger("agentic.instrumentation")
+
+# USD per million (prompt, completion) tokens, matched against the start of the model name
+DEFAULT_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    A minimal in-process registry of counters and histograms with labels, exported in the Prometheus text format.
+    """
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        # name -> labels -> (bucket counts, sum, count)
+        self._histograms: dict[str, dict[tuple, tuple[list[int], float, int]]] = {}
+        self._help: dict[str, str] = {}
+
+    def inc(self, name: str, value: float = 1.0, help: str = "", **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help)
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, help: str = "", **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help)
+            series = self._histograms.setdefault(name, {})
+            counts, total, count = series.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts = [c + (value <= bound) for c, bound in zip(counts, self.buckets)]
+            series[key] = (counts, total + value, count + 1)
+
+    def value(self, name: str, **labels) -> float:
+        """The current value of a counter (or the count of a histogram), 0 when never recorded."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            if name in self._histograms:
+                return self._histograms[name].get(key, ([], 0.0, 0))[2]
+            return self._counters.get(name, {}).get(key, 0.0)
+
+    def to_prometheus(self) -> str:
+        def labels_text(labels: tuple, **extra) -> str:
+            pairs = [*labels, *extra.items()]
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines += [f"# HELP {name} {self._help[name]}", f"# TYPE {name} counter"]
+                lines += [f"{name}{labels_text(labels)} {value:g}" for labels, value in sorted(series.items())]
+            for name, series in sorted(self._histograms.items()):
+                lines += [f"# HELP {name} {self._help[name]}", f"# TYPE {name} histogram"]
+                for labels, (counts, total, count) in sorted(series.items()):
+                    lines += [f"{name}_bucket{labels_text(labels, le=f'{b:g}')} {c}" for b, c in zip(self.buckets, counts)]
+                    lines += [
+                        f"{name}_bucket{labels_text(labels, le='+Inf')} {count}",
+                        f"{name}_sum{labels_text(labels)} {total:g}",
+                        f"{name}_count{labels_text(labels)} {count}",
+                    ]
+        return "\n".join(lines) + "\n"
+
+
+class NodeStats:
+    """What a single run of a node did, filled in by the callback handler and the SQL / cache hooks."""
+    def __init__(self, node: str):
+        self.node = node
+        self.seconds = 0.0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.tool_calls = 0
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.error: str | None = None
+        self._lock = threading.Lock()
+
+    def add(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {name: value for name, value in vars(self).items() if not name.startswith("_")}
+
+
+# The stats of the node running in the current context (None outside of instrumented nodes)
+_CURRENT_NODE: ContextVar[NodeStats | None] = ContextVar("agentic_current_node", default=None)
+# Picked up by every LangChain run started in the context, the same way `get_openai_callback` works
+_NODE_HANDLER: ContextVar["_NodeCallbackHandler | None"] = ContextVar("agentic_node_handler", default=None)
+register_configure_hook(_NODE_HANDLER, inheritable=True)
+
+
+def record_cache_lookup(hit: bool):
+    """Counts a cache lookup towards the node running it, for the caches used inside the agents."""
+    if (stats := _CURRENT_NODE.get()) is not None:
+        stats.add(cache_hits=int(hit), cache_misses=int(not hit))
+
+
+_SQL_LISTENERS_LOCK = threading.Lock()
+_sql_listeners_installed = False
+
+
+def _install_sql_listeners():
+    """Times every query of every engine (sync and async ones alike), on behalf of the node running it."""
+    global _sql_listeners_installed
+    with _SQL_LISTENERS_LOCK:
+        if _sql_listeners_installed:
+            return
+        _sql_listeners_installed = True
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(connection, cursor, statement, parameters, context, executemany):
+        if _CURRENT_NODE.get() is not None:
+            connection.info.setdefault("agentic_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after(connection, cursor, statement, parameters, context, executemany):
+        if (stats := _CURRENT_NODE.get()) is not None and connection.info.get("agentic_query_start"):
+            stats.add(sql_queries=1, sql_seconds=time.perf_counter() - connection.info["agentic_query_start"].pop())
+
+
+class _NodeCallbackHandler(BaseCallbackHandler):
+    # Called in the same context as the run, so the counts can't land on another node
+    run_inline = True
+
+    def __init__(self, stats: NodeStats, prices: dict[str, tuple[float, float]]):
+        self.stats = stats
+        self.prices = prices
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+        if not prompt_tokens and not completion_tokens:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens, completion_tokens = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+        self.stats.add(
+            llm_calls=1,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=self._cost((response.llm_output or {}).get("model_name") or "", prompt_tokens, completion_tokens),
+        )
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs):
+        self.stats.add(tool_calls=1)
+
+    def _cost(self, model_name: str, prompt_tokens: int, completion_tokens: int) -> float:
+        # The longest matching prefix, so that "gpt-4o-mini-2024-07-18" is not priced as "gpt-4o"
+        matches = [prefix for prefix in self.prices if model_name.startswith(prefix)]
+        if not matches:
+            return 0.0
+        prompt_price, completion_price = self.prices[max(matches, key=len)]
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class Instrumentation:
+    """
+    Wraps the graph's nodes (see `build_workflow(instrumentation=...)`) and records what each run of them did:
+    into `registry`, as a JSON line on the `agentic.instrumentation` logger, and to `on_node` if given.
+    """
+    def __init__(
+            self,
+            registry: MetricsRegistry | None = None,
+            prices: dict[str, tuple[float, float]] | None = None,
+            on_node: Callable[[NodeStats], None] | None = None,
+    ):
+        self.registry = registry or MetricsRegistry()
+        self.prices = DEFAULT_PRICES if prices is None else prices
+        self.on_node = on_node
+        _install_sql_listeners()
+
+    def wrap(self, node: str, func: Callable) -> Callable:
+        def wrapper(state):
+            stats, tokens = self._start(node)
+            start = time.perf_counter()
+            try:
+                return func(state)
+            except Exception as e:
+                stats.error = type(e).__name__
+                raise
+            finally:
+                self._finish(stats, tokens, time.perf_counter() - start)
+        return wrapper
+
+    def awrap(self, node: str, afunc: Callable) -> Callable:
+        async def wrapper(state):
+            stats, tokens = self._start(node)
+            start = time.perf_counter()
+            try:
+                return await afunc(state)
+            except Exception as e:
+                stats.error = type(e).__name__
+                raise
+            finally:
+                self._finish(stats, tokens, time.perf_counter() - start)
+        return wrapper
+
+    def _start(self, node: str):
+        stats = NodeStats(node)
+        tokens = (_CURRENT_NODE.set(stats), _NODE_HANDLER.set(_NodeCallbackHandler(stats, self.prices)))
+        return stats, tokens
+
+    def _finish(self, stats: NodeStats, tokens, seconds: float):
+        _CURRENT_NODE.reset(tokens[0])
+        _NODE_HANDLER.reset(tokens[1])
+        stats.seconds = seconds
+
+        node, registry = stats.node, self.registry
+        registry.observe("agentic_node_seconds", seconds, "Wall time of the node runs.", node=node)
+        registry.inc("agentic_node_runs_total", 1, "Runs of the node.", node=node, status="error" if stats.error else "ok")
+        registry.inc("agentic_llm_calls_total", stats.llm_calls, "LLM calls made by the node.", node=node)
+        registry.inc("agentic_llm_tokens_total", stats.prompt_tokens, "LLM tokens used by the node.", node=node, type="prompt")
+        registry.inc("agentic_llm_tokens_total", stats.completion_tokens, "LLM tokens used by the node.", node=node,
+                     type="completion")
+        registry.inc("agentic_llm_cost_usd_total", stats.cost_usd, "Estimated LLM cost of the node, in USD.", node=node)
+        registry.inc("agentic_tool_calls_total", stats.tool_calls, "Tool calls made by the node.", node=node)
+        registry.inc("agentic_sql_queries_total", stats.sql_queries, "SQL queries run by the node.", node=node)
+        registry.inc("agentic_sql_seconds_total", stats.sql_seconds, "Time spent in SQL queries by the node.", node=node)
+        registry.inc("agentic_cache_lookups_total", stats.cache_hits, "Cache lookups made by the node.", node=node,
+                     result="hit")
+        registry.inc("agentic_cache_lookups_total", stats.cache_misses, "Cache lookups made by the node.", node=node,
+                     result="miss")
+
+        logger.info(json.dumps({"event": "node_run", **stats.as_dict()}))
+        if self.on_node is not None:
+            self.on_node(stats)
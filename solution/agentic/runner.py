@@ -0,0 +1,313 @@
+"""
+Pushes a backlog of tickets through the compiled graph, from a JSONL file or from the `udahub.tickets` table,
+with bounded concurrency and per-account rate limits. Results are appended to a JSONL file as they complete,
+and that file doubles as the checkpoint: running the same command again skips the tickets already in it.
+
+    PYTHONPATH=. python -m agentic.runner --input tickets.jsonl --output results.jsonl --concurrency 16
+    PYTHONPATH=. python -m agentic.runner --from-db --account cultpass --status open --output results.jsonl --rate-limit 2
+
+Each input line holds a ticket: {"ticket_id", "ticket_text", "ticket_metadata", "account_id", "user_id"}
+(without a ticket_id, the line number is used).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Iterator
+
+from langgraph.graph.state import CompiledStateGraph
+from sqlalchemy import Engine, RowMapping, Select, select
+
+import data.models.udahub as udahub
+
+
+# The fields of the final state written for each ticket
+RESULT_FIELDS = ("tags", "resolution_text", "is_resolved_score", "escalation_reason", "urgency_level")
+
+# Tickets read from udahub per query (and per read transaction)
+PAGE_SIZE = 500
+# Tickets pulled from the input at once, in a worker thread so that reading never blocks the event loop
+READ_CHUNK_SIZE = 100
+
+
+def read_jsonl(path: Path) -> Iterator[dict]:
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                ticket = json.loads(line)
+                ticket.setdefault("ticket_id", f"line-{line_number}")
+                yield ticket
+
+
+def read_udahub_tickets(
+        engine: Engine,
+        account_id: str | None = None,
+        status: str | None = None,
+        page_size: int = PAGE_SIZE,
+) -> Iterator[dict]:
+    """
+    Streams the tickets stored in udahub, the text of a ticket being its user messages.
+
+    The tickets are read `page_size` at a time (in ticket_id order), each page on a connection of its own that is
+    released before the page is handed out, so a long batch never keeps a read transaction (and its WAL snapshot) open.
+    """
+    after = None
+    while True:
+        with engine.connect() as connection:
+            ticket_ids = connection.scalars(_ticket_ids_query(account_id, status, after, page_size)).all()
+            if not ticket_ids:
+                return
+            rows = connection.execute(_ticket_messages_query(ticket_ids)).mappings().all()
+        yield from _group_tickets(rows)
+        after = ticket_ids[-1]
+
+
+def _ticket_ids_query(account_id: str | None, status: str | None, after: str | None, limit: int) -> Select:
+    query = select(udahub.Ticket.ticket_id).order_by(udahub.Ticket.ticket_id).limit(limit)
+    if status:
+        query = (
+            query.join(udahub.TicketMetadata, udahub.TicketMetadata.ticket_id == udahub.Ticket.ticket_id)
+            .filter(udahub.TicketMetadata.status == status)
+        )
+    if account_id:
+        query = query.filter(udahub.Ticket.account_id == account_id)
+    if after is not None:
+        query = query.filter(udahub.Ticket.ticket_id > after)
+    return query
+
+
+def _ticket_messages_query(ticket_ids: list[str]) -> Select:
+    return (
+        select(
+            udahub.Ticket.ticket_id,
+            udahub.Ticket.account_id,
+            udahub.Ticket.user_id,
+            udahub.Ticket.channel,
+            udahub.Ticket.created_at,
+            udahub.TicketMetadata.status,
+            udahub.TicketMetadata.main_issue_type,
+            udahub.TicketMessage.content,
+        )
+        .outerjoin(udahub.TicketMetadata, udahub.TicketMetadata.ticket_id == udahub.Ticket.ticket_id)
+        .join(udahub.TicketMessage, udahub.TicketMessage.ticket_id == udahub.Ticket.ticket_id)
+        .filter(udahub.TicketMessage.role == udahub.RoleEnum.user)
+        .filter(udahub.Ticket.ticket_id.in_(ticket_ids))
+        .order_by(udahub.Ticket.ticket_id, udahub.TicketMessage.created_at)
+    )
+
+
+def _group_tickets(rows: list[RowMapping]) -> Iterator[dict]:
+    for ticket_id, messages in itertools.groupby(rows, key=lambda row: row["ticket_id"]):
+        messages = list(messages)
+        first = messages[0]
+        yield {
+            "ticket_id": ticket_id,
+            "ticket_text": "\n".join(message["content"] or "" for message in messages),
+            "ticket_metadata": {
+                "submission_date": first["created_at"].isoformat() if first["created_at"] else None,
+                "channel": first["channel"],
+                "status": first["status"],
+                "issue_type": first["main_issue_type"],
+            },
+            "account_id": first["account_id"],
+            "user_id": first["user_id"],
+        }
+
+
+class RateLimiter:
+    """A token bucket: `rate` acquisitions per second on average, and up to `burst` at once."""
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters queue up on the lock, so they are served in order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BatchRunner:
+    """
+    Runs tickets through a compiled graph (each on its own thread_id, the ticket_id), `concurrency` at a time
+    and at most `rate_limit` tickets per second per account (or, with a dict, per listed account only).
+
+    Tickets are read lazily (in a worker thread, off the event loop), at most `max_pending` ahead of the workers, so a
+    huge backlog is never held in memory.
+    A rate-limited ticket waits in its account's queue rather than in a worker, so a throttled account never holds
+    up the others. Every result is appended to `output` (and flushed) as soon as it is ready. Tickets already in
+    `output` are skipped, except for the failed ones when `retry_failed=True`.
+    """
+    def __init__(
+            self,
+            graph: CompiledStateGraph,
+            output: Path,
+            concurrency: int = 8,
+            rate_limit: float | dict[str, float] | None = None,
+            burst: int | None = None,
+            retry_failed: bool = False,
+            max_pending: int = 1000,
+    ):
+        self.graph = graph
+        self.output = Path(output)
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.retry_failed = retry_failed
+        self.max_pending = max_pending
+
+    def _rate(self, account_id: str) -> float | None:
+        if isinstance(self.rate_limit, dict):
+            return self.rate_limit.get(account_id)
+        return self.rate_limit
+
+    def _completed(self) -> set[str]:
+        if not self.output.exists():
+            return set()
+        with open(self.output, "rb+") as f:
+            content = f.read()
+            # A crash may have left a partially written last line, drop it (that ticket is simply processed again)
+            if content and not content.endswith(b"\n"):
+                f.truncate(content.rfind(b"\n") + 1)
+                content = content[:content.rfind(b"\n") + 1]
+        completed = set()
+        for line in content.decode().splitlines():
+            record = json.loads(line)
+            if record["status"] == "ok" or not self.retry_failed:
+                completed.add(record["ticket_id"])
+        return completed
+
+    async def _process(self, ticket: dict) -> dict:
+        start = time.perf_counter()
+        record = {"ticket_id": ticket["ticket_id"], "account_id": ticket["account_id"]}
+        try:
+            inputs = {key: value for key, value in ticket.items() if key != "ticket_id"}
+            config = {"run_id": uuid.uuid4(), "configurable": {"thread_id": ticket["ticket_id"]}}
+            state = await self.graph.ainvoke(inputs, config)
+            record.update(status="ok", **{field: state.get(field) for field in RESULT_FIELDS})
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        return record
+
+    async def arun(self, tickets: Iterable[dict]) -> dict[str, float]:
+        """
+        Processes the tickets, returning how many were processed, failed and skipped, and how long it took.
+        """
+        start = time.perf_counter()
+        completed = self._completed()
+        summary = {"processed": 0, "failed": 0, "skipped": 0}
+        # The tickets cleared to run, taken by the workers
+        queue: asyncio.Queue[dict | None] = asyncio.Queue(maxsize=self.concurrency)
+        # Backpressure: the producer waits whenever this many tickets are read but not started yet
+        pending = asyncio.Semaphore(self.max_pending)
+        # The rate-limited tickets of each account, released into `queue` by the account's pacer
+        throttled: dict[str, asyncio.Queue[dict | None]] = {}
+        pacers = []
+
+        async def pace(account_queue: asyncio.Queue, limiter: RateLimiter):
+            while (ticket := await account_queue.get()) is not None:
+                await limiter.acquire()
+                await queue.put(ticket)
+
+        async def read(iterator: Iterator[dict]) -> AsyncIterator[dict]:
+            while chunk := await asyncio.to_thread(lambda: list(itertools.islice(iterator, READ_CHUNK_SIZE))):
+                for ticket in chunk:
+                    yield ticket
+
+        async def produce():
+            async for ticket in read(iter(tickets)):
+                if ticket["ticket_id"] in completed:
+                    summary["skipped"] += 1
+                    continue
+                await pending.acquire()
+                account_id = ticket["account_id"]
+                if (rate := self._rate(account_id)) is None:
+                    await queue.put(ticket)
+                    continue
+                if account_id not in throttled:
+                    throttled[account_id] = asyncio.Queue()
+                    pacers.append(asyncio.create_task(pace(throttled[account_id], RateLimiter(rate, self.burst))))
+                throttled[account_id].put_nowait(ticket)
+
+            for account_queue in throttled.values():
+                account_queue.put_nowait(None)
+            await asyncio.gather(*pacers)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.output, "a") as f:
+            async def work():
+                while (ticket := await queue.get()) is not None:
+                    pending.release()
+                    record = await self._process(ticket)
+                    f.write(json.dumps(record, default=str) + "\n")
+                    f.flush()
+                    summary["processed"] += 1
+                    summary["failed"] += record["status"] != "ok"
+
+            await asyncio.gather(produce(), *(work() for _ in range(self.concurrency)))
+
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        return summary
+
+    def run(self, tickets: Iterable[dict]) -> dict[str, float]:
+        return asyncio.run(self.arun(tickets))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", type=Path, help="A JSONL file of tickets.")
+    source.add_argument("--from-db", action="store_true", help="Read the tickets from the udahub.tickets table.")
+    parser.add_argument("--account", help="With --from-db, only the tickets of this account.")
+    parser.add_argument("--status", help="With --from-db, only the tickets with this status (e.g. open).")
+    parser.add_argument("--output", type=Path, required=True, help="The JSONL file the results are appended to.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Tickets in flight at once.")
+    parser.add_argument("--rate-limit", type=float, help="Maximum tickets per second, per account.")
+    parser.add_argument("--burst", type=int, help="Tickets an account may start at once (default: the rate limit).")
+    parser.add_argument("--retry-failed", action="store_true", help="Process again the tickets that failed before.")
+    parser.add_argument("--direct", action="store_true", help="Run the fetchers without their ReAct loops.")
+    parser.add_argument("--defer-memory", action="store_true",
+                        help="Update user preferences in batches once all the tickets are processed.")
+    parser.add_argument("--model", default="gpt-4o-mini", help="The OpenAI model shared by the agents.")
+    parser.add_argument("--cache-directory", type=Path, default=Path("cache"), help="Where user preferences are kept.")
+    args = parser.parse_args()
+
+    from langchain_openai import ChatOpenAI
+
+    from agentic.agents import OrchestratorAgent
+    from agentic.agents.memory_queue import MemoryBatchWorker, MemoryQueue
+    from agentic.graph import build_workflow
+    from agentic.tools.tools import UDAHUB_ENGINE
+
+    llm = ChatOpenAI(model_name=args.model, temperature=0.0)
+    memory_queue = MemoryQueue(args.cache_directory / "memory_queue") if args.defer_memory else None
+    orchestrator_agent = OrchestratorAgent(cache_directory=args.cache_directory, memory_queue=memory_queue)
+    workflow = build_workflow(llm, orchestrator_agent, direct_fetchers=args.direct)
+    # No checkpointer: the results file is what survives a crash, and each ticket's state can go once it is written
+    runner = BatchRunner(
+        workflow.compile(),
+        args.output,
+        concurrency=args.concurrency,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        retry_failed=args.retry_failed,
+    )
+    tickets = read_jsonl(args.input) if args.input else read_udahub_tickets(UDAHUB_ENGINE, args.account, args.status)
+    print(runner.run(tickets))
+    if args.defer_memory:
+        print(f"Memory updated for {MemoryBatchWorker(llm, memory_queue, orchestrator_agent.remember).drain()} tickets")
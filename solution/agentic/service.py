@@ -0,0 +1,225 @@
+"""
+A long-running HTTP entry point: the graph is compiled once at start-up, and the LLM client, the DB engines
+and the checkpointer stay open between requests, so the latency of a request is only the ticket's own work.
+
+    PYTHONPATH=. python -m agentic.service --port 8000 --direct
+
+    POST /tickets          {"ticket_text", "ticket_metadata"?, "account_id", "user_id", "thread_id"?}
+                           -> the final result of the ticket, with its thread_id
+    POST /tickets/stream   same body -> server-sent events: a `node` event each time an agent finishes, `token` events
+                           while the resolution is written (with --stream-resolution), then `result`
+    GET  /health
+    GET  /metrics          the per-node metrics, in the Prometheus text format
+
+Every request gets a thread of its own unless it names one, so concurrent tickets of a user never share a checkpoint.
+Checkpoints are only kept with --checkpoints (a SQLite file) or --in-memory-checkpoints.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.graph import StateGraph
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from agentic.agents.agent_names import RESOLUTION_AGENT_NAME
+from agentic.agents.memory_queue import MemoryBatchWorker
+from agentic.instrumentation import Instrumentation, MetricsRegistry
+from agentic.runner import RESULT_FIELDS
+from agentic.tools.tools import CULTPASS_ASYNC_ENGINE, UDAHUB_ASYNC_ENGINE
+from data.database import adispose_engines
+
+
+REQUIRED_FIELDS = ("ticket_text", "account_id", "user_id")
+# The only fields a client may set, the rest of the AgentState (routing plan, fetched records...) is the graph's own
+INPUT_FIELDS = (*REQUIRED_FIELDS, "ticket_metadata")
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _result(state: dict, config: dict) -> dict:
+    return {"thread_id": config["configurable"]["thread_id"], **{field: state.get(field) for field in RESULT_FIELDS}}
+
+
+async def _ticket(request: Request) -> tuple[dict, dict]:
+    """Reads the graph input and config from the request body, raising ValueError when it is not a valid ticket."""
+    try:
+        body = await request.json()
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(body, dict):
+        raise ValueError("The body must be a JSON object")
+    unknown = sorted(set(body) - {*INPUT_FIELDS, "thread_id"})
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    missing = [field for field in REQUIRED_FIELDS if not body.get(field)]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    if not isinstance(body.get("ticket_metadata", {}), dict):
+        raise ValueError("ticket_metadata must be a JSON object")
+
+    inputs = {field: body[field] for field in REQUIRED_FIELDS}
+    inputs["ticket_metadata"] = body.get("ticket_metadata", {})
+    # A run id of its own, so that a ticket retried on its thread starts over (see `orchestrator.ticket_key`)
+    return inputs, {"run_id": uuid.uuid4(), "configurable": {"thread_id": str(body.get("thread_id") or uuid.uuid4())}}
+
+
+async def _stream(graph, inputs: dict, config: dict) -> AsyncIterator[str]:
+    start = last = time.perf_counter()
+    state = {}
+    try:
+        async for mode, chunk in graph.astream(inputs, config, stream_mode=["updates", "values", "messages"]):
+            if mode == "values":
+                state = chunk
+            elif mode == "messages":
+                # Only the resolver's text is forwarded (it streams when built with `stream_resolution=True`)
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == RESOLUTION_AGENT_NAME and isinstance(message.content, str) \
+                        and message.content:
+                    yield _event("token", {"text": message.content})
+            else:
+                now = time.perf_counter()
+                for node, update in chunk.items():
+                    yield _event("node", {
+                        "node": node,
+                        "updated": sorted(update or {}),
+                        "seconds": round(now - last, 3),
+                    })
+                last = now
+    except Exception as e:
+        yield _event("error", {"error": f"{type(e).__name__}: {e}"})
+        return
+    yield _event("result", {**_result(state, config), "seconds": round(time.perf_counter() - start, 3)})
+
+
+def create_app(
+        workflow: StateGraph,
+        checkpointer: BaseCheckpointSaver | None = None,
+        checkpoint_path: Path | None = None,
+        memory_worker: MemoryBatchWorker | None = None,
+        metrics: MetricsRegistry | None = None,
+) -> Starlette:
+    """
+    Creates the ASGI app serving `workflow`, compiled once when it starts. No checkpoint is kept unless a
+    `checkpointer` is given, or a `checkpoint_path` for a SQLite file that the app opens and closes with itself.
+    A `memory_worker` drains the orchestrator's memory queue in the background for as long as the app runs,
+    and `metrics` (the registry of the workflow's Instrumentation) is served on /metrics.
+    """
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        async with contextlib.AsyncExitStack() as stack:
+            saver = checkpointer
+            if checkpoint_path is not None:
+                saver = await stack.enter_async_context(AsyncSqliteSaver.from_conn_string(str(checkpoint_path)))
+            app.state.graph = workflow.compile(checkpointer=saver)
+            # Open a pooled connection to each database now rather than on the first request
+            for engine in (UDAHUB_ASYNC_ENGINE, CULTPASS_ASYNC_ENGINE):
+                async with engine.connect():
+                    pass
+            worker = asyncio.create_task(memory_worker.serve()) if memory_worker is not None else None
+            yield
+            if worker is not None:
+                worker.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await worker
+            await adispose_engines()
+
+    async def health(request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok"})
+
+    async def export_metrics(request: Request) -> Response:
+        text = metrics.to_prometheus() if metrics is not None else ""
+        return Response(text, media_type="text/plain; version=0.0.4")
+
+    async def resolve(request: Request) -> Response:
+        try:
+            inputs, config = await _ticket(request)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        start = time.perf_counter()
+        state = await request.app.state.graph.ainvoke(inputs, config)
+        result = {**_result(state, config), "seconds": round(time.perf_counter() - start, 3)}
+        return Response(json.dumps(result, default=str), media_type="application/json")
+
+    async def resolve_stream(request: Request):
+        try:
+            inputs, config = await _ticket(request)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return StreamingResponse(
+            _stream(request.app.state.graph, inputs, config),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    return Starlette(
+        routes=[
+            Route("/health", health, methods=["GET"]),
+            Route("/metrics", export_metrics, methods=["GET"]),
+            Route("/tickets", resolve, methods=["POST"]),
+            Route("/tickets/stream", resolve_stream, methods=["POST"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--direct", action="store_true", help="Run the fetchers without their ReAct loops.")
+    parser.add_argument("--stream-resolution", action="store_true",
+                        help="Stream the tokens of the resolution, at the cost of a second call to score it.")
+    parser.add_argument("--defer-memory", action="store_true",
+                        help="Update user preferences in background batches, after the response is sent.")
+    parser.add_argument("--model", default="gpt-4o-mini", help="The OpenAI model shared by the agents.")
+    parser.add_argument("--cache-directory", type=Path, default=Path(__file__).parent.parent / "cache",
+                        help="Where user preferences are kept, it is reused across restarts.")
+    checkpoints = parser.add_mutually_exclusive_group()
+    checkpoints.add_argument("--checkpoints", type=Path,
+                             help="Keep the checkpoints of every thread in this SQLite file.")
+    checkpoints.add_argument("--in-memory-checkpoints", action="store_true",
+                             help="Keep the checkpoints in memory (never freed, for short-lived servers only).")
+    args = parser.parse_args()
+
+    import uvicorn
+    from langchain_openai import ChatOpenAI
+
+    from agentic.agents import OrchestratorAgent
+    from agentic.agents.memory_queue import MemoryQueue
+    from agentic.graph import build_workflow
+
+    args.cache_directory.mkdir(parents=True, exist_ok=True)
+    llm = ChatOpenAI(model_name=args.model, temperature=0.0)
+    memory_queue = MemoryQueue(args.cache_directory / "memory_queue") if args.defer_memory else None
+    orchestrator_agent = OrchestratorAgent(cache_directory=args.cache_directory, memory_queue=memory_queue)
+    instrumentation = Instrumentation()
+    workflow = build_workflow(
+        llm,
+        orchestrator_agent,
+        direct_fetchers=args.direct,
+        stream_resolution=args.stream_resolution,
+        instrumentation=instrumentation,
+    )
+    memory_worker = MemoryBatchWorker(llm, memory_queue, orchestrator_agent.remember) if args.defer_memory else None
+    app = create_app(
+        workflow,
+        checkpointer=MemorySaver() if args.in_memory_checkpoints else None,
+        checkpoint_path=args.checkpoints,
+        memory_worker=memory_worker,
+        metrics=instrumentation.registry,
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
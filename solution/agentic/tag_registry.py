@@ -0,0 +1,102 @@
+"""
+The tags each account's articles use, which the classifier can pick from. Kept apart from the tools, so that the
+state schemas and the classifier depend on the registry alone.
+"""
+import threading
+import time
+import weakref
+
+from sqlalchemy import Engine, event, select
+from sqlalchemy.orm import Session
+
+import data.models.udahub as udahub
+from data.database import get_engine
+
+
+class TagRegistry:
+    """
+    The tags available to each account, read with a single query over the `knowledge_tags` index
+    and cached per account for `ttl_seconds`.
+
+    Articles changed through the ORM invalidate their account's entry as soon as the session commits,
+    the TTL covers the changes made by other processes (or with raw SQL).
+    """
+    _instances: "weakref.WeakSet[TagRegistry]" = weakref.WeakSet()
+
+    def __init__(self, engine: Engine, ttl_seconds: float = 60.0):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # account_id -> (tags, loaded_at)
+        self._entries: dict[str, tuple[tuple[str, ...], float]] = {}
+        # One lock per account, so that a slow query only holds up the lookups of its own account
+        self._account_locks: dict[str, threading.Lock] = {}
+        # Bumped by every invalidation, so that a query started before one does not cache what it read
+        self._generation = 0
+        TagRegistry._instances.add(self)
+
+    def _query(self, account_id: str) -> tuple[str, ...]:
+        with self.engine.connect() as connection:
+            return tuple(connection.scalars(
+                select(udahub.KnowledgeTag.tag)
+                .where(udahub.KnowledgeTag.account_id == account_id)
+                .distinct()
+                .order_by(udahub.KnowledgeTag.tag)
+            ))
+
+    def _fresh(self, account_id: str) -> tuple[str, ...] | None:
+        entry = self._entries.get(account_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+            return entry[0]
+        return None
+
+    def tags(self, account_id: str) -> tuple[str, ...]:
+        """Returns the sorted tags of the account's articles."""
+        if (tags := self._fresh(account_id)) is not None:
+            return tags
+        with self._lock:
+            account_lock = self._account_locks.setdefault(account_id, threading.Lock())
+        with account_lock:
+            # Another thread may have loaded them while this one was waiting
+            if (tags := self._fresh(account_id)) is not None:
+                return tags
+            generation = self._generation
+            tags = self._query(account_id)
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[account_id] = (tags, time.monotonic())
+            return tags
+
+    def invalidate(self, account_id: str | None = None):
+        """Forces the next lookup for the account (or for every account) to re-read the tags."""
+        with self._lock:
+            self._generation += 1
+            if account_id is None:
+                self._entries = {}
+            else:
+                self._entries.pop(account_id, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tag_accounts(session, flush_context):
+    changed = session.info.setdefault("changed_tag_accounts", set())
+    for instance in [*session.new, *session.dirty, *session.deleted]:
+        # Deleting an article cascades to its tags without them showing up in the session
+        if isinstance(instance, (udahub.Knowledge, udahub.KnowledgeTag)):
+            changed.add(instance.account_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_tag_accounts(session):
+    for account_id in session.info.pop("changed_tag_accounts", ()):
+        for registry in list(TagRegistry._instances):
+            registry.invalidate(account_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_tag_accounts(session):
+    session.info.pop("changed_tag_accounts", None)
+
+
+# The registry shared by the classifier, its output schemas and the notebooks' helpers
+TAG_REGISTRY = TagRegistry(get_engine(udahub.UDAHUB_DB, read_only=True))
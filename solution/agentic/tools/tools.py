@@ -1,19 +1,81 @@
-from sqlalchemy import create_engine, or_
-from sqlalchemy.orm import joinedload, selectinload
+import asyncio
+import re
+import threading
+import time
+from pathlib import Path
 
-from langchain_core.tools import tool
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy import Connection, RowMapping, Select, and_, func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from langchain_core.tools import StructuredTool
 
 import data.models.udahub as udahub
+from data.database import get_async_engine, get_engine
 import data.models.cultpass as cultpass
-from utils import get_session
+from agentic.tools.vector_index import ArticleVectorIndex
+
+
+# The tools only ever read, so they share the read-only pools
+UDAHUB_ENGINE = get_engine(udahub.UDAHUB_DB, read_only=True)
+CULTPASS_ENGINE = get_engine(cultpass.CULTPASS_DB, read_only=True)
+
+# The same databases, accessed through aiosqlite for the async (ainvoke) path
+UDAHUB_ASYNC_ENGINE = get_async_engine(udahub.UDAHUB_DB, read_only=True)
+CULTPASS_ASYNC_ENGINE = get_async_engine(cultpass.CULTPASS_DB, read_only=True)
+
+# The tools select plain columns and stream the rows in batches of this size, straight into the dicts they return
+# (no ORM objects, no identity map, no second copy of the whole result)
+STREAM_BATCH_SIZE = 500
+
+
+def _stream(connection: Connection, query: Select) -> Iterator[RowMapping]:
+    return connection.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE)).mappings()
 
 
-UDAHUB_ENGINE =  create_engine(f"sqlite:///{udahub.UDAHUB_DB}", echo=False)
-CULTPASS_ENGINE = create_engine(f"sqlite:///{cultpass.CULTPASS_DB}", echo=False)
+async def _astream(connection: AsyncConnection, query: Select) -> AsyncIterator[RowMapping]:
+    result = await connection.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+    async for row in result.mappings():
+        yield row
+
+
+_ARTICLE_COLUMNS = (
+    udahub.Knowledge.article_id,
+    udahub.Knowledge.title,
+    udahub.Knowledge.content,
+    udahub.Knowledge.tags,
+)
+
+
+def _articles_query(account_id: str, tags: list[str] | None):
+    # Start with the base query filtering by account_id
+    query = select(*_ARTICLE_COLUMNS).filter(udahub.Knowledge.account_id == account_id)
+    if tags:
+        # Exact tag matches through the knowledge_tags index, articles sharing the most tags first
+        query = (
+            query
+            .join(udahub.KnowledgeTag, udahub.KnowledgeTag.article_id == udahub.Knowledge.article_id)
+            .filter(
+                udahub.KnowledgeTag.account_id == account_id,
+                udahub.KnowledgeTag.tag.in_(udahub.normalize_tags(tags)),
+            )
+            .group_by(udahub.Knowledge.article_id)
+            .order_by(func.count().desc())
+        )
+    return query
 
 
-@tool
-def fetch_articles(account_id: str, tags: list[str] | None = None) -> list[dict[str, str]]:
+def _article_to_dict(article: RowMapping) -> dict[str, str]:
+    return {
+        "article_id": article["article_id"],
+        "title": article["title"],
+        "content": article["content"],
+        "tags": article["tags"],
+    }
+
+
+def _fetch_articles(account_id: str, tags: list[str] | None = None) -> list[dict[str, str]]:
     """
     Fetch relevant knowledge articles based on tags.
 
@@ -22,33 +84,183 @@ def fetch_articles(account_id: str, tags: list[str] | None = None) -> list[dict[
         tags (list[str] | None): List of tags to filter articles. If None, fetch all articles.
     
     Returns:
-        list[dict[str, str]]: List of articles with title, content, and tags.
+        list[dict[str, str]]: List of articles with their id, title, content, and tags.
+    """
+    with UDAHUB_ENGINE.connect() as connection:
+        return [_article_to_dict(article) for article in _stream(connection, _articles_query(account_id, tags))]
+
+
+async def _afetch_articles(account_id: str, tags: list[str] | None = None) -> list[dict[str, str]]:
+    async with UDAHUB_ASYNC_ENGINE.connect() as connection:
+        return [_article_to_dict(article) async for article in _astream(connection, _articles_query(account_id, tags))]
+
+
+fetch_articles = StructuredTool.from_function(
+    func=_fetch_articles,
+    coroutine=_afetch_articles,
+    name="fetch_articles",
+)
+
+
+_SEARCH_ARTICLES_SQL = text("""
+    SELECT knowledge.article_id, knowledge.title, knowledge.content, knowledge.tags
+    FROM knowledge_fts
+    JOIN knowledge ON knowledge.rowid = knowledge_fts.rowid
+    WHERE knowledge_fts MATCH :match AND knowledge.account_id = :account_id
+    ORDER BY bm25(knowledge_fts, 2.0, 1.0, 1.5)
+    LIMIT :k
+""")
+
+
+def _fts_match(query: str) -> str:
+    # Quote every word, so that the user's text can never be interpreted as FTS5 query syntax
+    words = dict.fromkeys(re.findall(r"\w+", query.lower()))
+    return " OR ".join(f'"{word}"' for word in words)
+
+
+def _search_articles(account_id: str, query: str, k: int = 5) -> list[dict[str, str]]:
     """
-    with get_session(UDAHUB_ENGINE) as session:
-        # Start with the base query filtering by account_id
-        query = session.query(udahub.Knowledge).filter_by(
-            account_id=account_id
+    Full-text search over the knowledge articles, returning the best matches first (BM25 ranking).
+    Use it when the tags did not find any articles, e.g. with the text of the ticket as the query.
+
+    Args:
+        account_id (str): The account identifier.
+        query (str): Free text to search for in the articles' titles, content and tags.
+        k (int): The maximum number of articles to return.
+
+    Returns:
+        list[dict[str, str]]: List of articles with their id, title, content, and tags.
+    """
+    if not (match := _fts_match(query)):
+        return []
+    with UDAHUB_ENGINE.connect() as connection:
+        rows = connection.execute(_SEARCH_ARTICLES_SQL, {"match": match, "account_id": account_id, "k": k})
+        return [dict(row) for row in rows.mappings()]
+
+
+async def _asearch_articles(account_id: str, query: str, k: int = 5) -> list[dict[str, str]]:
+    if not (match := _fts_match(query)):
+        return []
+    async with UDAHUB_ASYNC_ENGINE.connect() as connection:
+        rows = await connection.execute(_SEARCH_ARTICLES_SQL, {"match": match, "account_id": account_id, "k": k})
+        return [dict(row) for row in rows.mappings()]
+
+
+search_articles = StructuredTool.from_function(
+    func=_search_articles,
+    coroutine=_asearch_articles,
+    name="search_articles",
+)
+
+
+# The semantic index lives next to udahub.db, and is brought up to date with it at most once a minute
+VECTOR_INDEX_DIRECTORY = Path(udahub.UDAHUB_DB).parent / "vector_index"
+VECTOR_INDEX_SYNC_SECONDS = 60.0
+
+_vector_index: ArticleVectorIndex | None = None
+_vector_index_synced_at = 0.0
+_vector_index_lock = threading.Lock()
+
+
+def get_article_index() -> ArticleVectorIndex:
+    """
+    Returns the process-wide vector index of the knowledge articles, re-embedding the changed articles if due.
+    """
+    global _vector_index, _vector_index_synced_at
+    with _vector_index_lock:
+        if _vector_index is None:
+            _vector_index = ArticleVectorIndex(VECTOR_INDEX_DIRECTORY)
+        if time.monotonic() - _vector_index_synced_at > VECTOR_INDEX_SYNC_SECONDS:
+            _vector_index.sync(UDAHUB_ENGINE)
+            _vector_index_synced_at = time.monotonic()
+        return _vector_index
+
+
+def _articles_by_id_query(article_ids: list[str]):
+    return select(*_ARTICLE_COLUMNS).where(udahub.Knowledge.article_id.in_(article_ids))
+
+
+def _in_order(articles: list[dict[str, str]], article_ids: list[str]) -> list[dict[str, str]]:
+    by_id = {article["article_id"]: article for article in articles}
+    return [by_id[article_id] for article_id in article_ids if article_id in by_id]
+
+
+def _semantic_search_articles(account_id: str, query: str, k: int = 5) -> list[dict[str, str]]:
+    """
+    Semantic search over the knowledge articles, returning the `k` articles closest in meaning to the query, best first.
+    Use it when the tags did not find any articles, e.g. with the text of the ticket as the query.
+
+    Args:
+        account_id (str): The account identifier.
+        query (str): Free text describing what the articles should be about.
+        k (int): The maximum number of articles to return.
+
+    Returns:
+        list[dict[str, str]]: List of articles with their id, title, content, and tags.
+    """
+    article_ids = [article_id for article_id, _ in get_article_index().search(account_id, query, k)]
+    with UDAHUB_ENGINE.connect() as connection:
+        articles = [_article_to_dict(article) for article in _stream(connection, _articles_by_id_query(article_ids))]
+        return _in_order(articles, article_ids)
+
+
+async def _asemantic_search_articles(account_id: str, query: str, k: int = 5) -> list[dict[str, str]]:
+    index = await asyncio.to_thread(get_article_index)
+    article_ids = [article_id for article_id, _ in index.search(account_id, query, k)]
+    async with UDAHUB_ASYNC_ENGINE.connect() as connection:
+        articles = [
+            _article_to_dict(article) async for article in _astream(connection, _articles_by_id_query(article_ids))
+        ]
+        return _in_order(articles, article_ids)
+
+
+semantic_search_articles = StructuredTool.from_function(
+    func=_semantic_search_articles,
+    coroutine=_asemantic_search_articles,
+    name="semantic_search_articles",
+)
+
+
+def _reservations_query(user_id: str):
+    # The Experience columns come from the same SQL JOIN, rather than from another query per reservation
+    return (
+        select(
+            cultpass.Reservation.reservation_id,
+            cultpass.Reservation.status,
+            cultpass.Reservation.created_at,
+            cultpass.Experience.experience_id,
+            cultpass.Experience.title.label("experience_title"),
+            cultpass.Experience.description.label("experience_description"),
+            cultpass.Experience.location.label("experience_location"),
+            cultpass.Experience.when.label("experience_when"),
+            cultpass.Experience.is_premium.label("experience_is_premium"),
+            cultpass.Experience.slots_available.label("experience_slots_available"),
         )
-        if tags:
-            # Now, filter by each tag
-            query = query.filter(
-                or_(
-                    udahub.Knowledge.tags.like(f"%{tag}%") for tag in tags
-                )
-            )
-        
-    return [
-        {
-            "title": article.title,
-            "content": article.content,
-            "tags": article.tags,
-        }
-        for article in query.all()
-    ]
+        .outerjoin(cultpass.Experience, cultpass.Experience.experience_id == cultpass.Reservation.experience_id)
+        .filter(cultpass.Reservation.user_id == user_id)
+    )
 
 
-@tool
-def fetch_reservations(user_id: str) -> list[dict[str, str]]:
+def _reservation_to_dict(res: RowMapping) -> dict[str, str]:
+    res_dict = {
+        "reservation_id": res["reservation_id"],
+        "status": res["status"],
+        "created_at": res["created_at"].isoformat() if res["created_at"] else None,
+    }
+
+    if res["experience_id"] is not None:
+        res_dict.update({
+            "experience_title": res["experience_title"],
+            "experience_description": res["experience_description"],
+            "experience_location": res["experience_location"],
+            "experience_when": res["experience_when"].isoformat() if res["experience_when"] else None,
+            "experience_is_premium": res["experience_is_premium"],
+            "experience_slots_available": res["experience_slots_available"],
+        })
+    return res_dict
+
+
+def _fetch_reservations(user_id: str) -> list[dict[str, str]]:
     """
     Fetch reservations for this user.
 
@@ -58,82 +270,157 @@ def fetch_reservations(user_id: str) -> list[dict[str, str]]:
     Returns:
         list[dict[str, str]]: List of articles with title, content, and tags.
     """
-    with get_session(CULTPASS_ENGINE) as session:
-        # We use joinedload to fetch the Experience data in a single SQL JOIN
-        # rather than querying the database again for every single reservation row.
-        query = (
-            session.query(cultpass.Reservation)
-            .options(joinedload(cultpass.Reservation.experience))
-            .filter(cultpass.Reservation.user_id == user_id)
+    with CULTPASS_ENGINE.connect() as connection:
+        return [_reservation_to_dict(res) for res in _stream(connection, _reservations_query(user_id))]
+
+
+async def _afetch_reservations(user_id: str) -> list[dict[str, str]]:
+    async with CULTPASS_ASYNC_ENGINE.connect() as connection:
+        return [_reservation_to_dict(res) async for res in _astream(connection, _reservations_query(user_id))]
+
+
+fetch_reservations = StructuredTool.from_function(
+    func=_fetch_reservations,
+    coroutine=_afetch_reservations,
+    name="fetch_reservations",
+)
+
+
+def _tickets_query(user_id: str, limit: int | None = None, before: str | None = None):
+    # Keyset pagination: newest first, with the ticket_id breaking ties between tickets created at the same time
+    query = (
+        select(
+            udahub.Ticket.ticket_id,
+            udahub.Ticket.channel,
+            udahub.Ticket.created_at,
+            udahub.TicketMetadata.ticket_id.label("metadata_ticket_id"),
+            udahub.TicketMetadata.status,
+            udahub.TicketMetadata.main_issue_type,
+            udahub.TicketMetadata.tags,
+        )
+        .outerjoin(udahub.TicketMetadata, udahub.TicketMetadata.ticket_id == udahub.Ticket.ticket_id)
+        .filter(udahub.Ticket.user_id == user_id)
+        .order_by(udahub.Ticket.created_at.desc(), udahub.Ticket.ticket_id.desc())
+        .limit(limit)
+    )
+    if before:
+        # The cursor is the id of the last ticket seen, its created_at is read back as stored (so that the
+        # comparison is exact, whatever the format the timestamp was written in)
+        created_at = select(udahub.Ticket.created_at).filter(udahub.Ticket.ticket_id == before).scalar_subquery()
+        query = query.filter(or_(
+            udahub.Ticket.created_at < created_at,
+            and_(udahub.Ticket.created_at == created_at, udahub.Ticket.ticket_id < before),
+        ))
+    return query
+
+
+_MESSAGE_COLUMNS = (
+    udahub.TicketMessage.ticket_id,
+    udahub.TicketMessage.role,
+    udahub.TicketMessage.content,
+    udahub.TicketMessage.created_at,
+    udahub.TicketMessage.message_id,
+)
+
+
+def _messages_query(ticket_ids: list[str], max_messages_per_ticket: int | None):
+    if max_messages_per_ticket is None:
+        return (
+            select(*_MESSAGE_COLUMNS)
+            .filter(udahub.TicketMessage.ticket_id.in_(ticket_ids))
+            .order_by(udahub.TicketMessage.created_at, udahub.TicketMessage.message_id)
+        )
+
+    # Only the last N messages of each ticket, picked in SQL with a window function
+    ranked = (
+        select(
+            *_MESSAGE_COLUMNS,
+            func.row_number().over(
+                partition_by=udahub.TicketMessage.ticket_id,
+                order_by=(udahub.TicketMessage.created_at.desc(), udahub.TicketMessage.message_id.desc()),
+            ).label("position"),
         )
-        
-        results = query.all()
-        
-        reservation_list = []
-        for res in results:
-            exp = res.experience
-            
-            res_dict = {
-                "reservation_id": res.reservation_id,
-                "status": res.status,
-                "created_at": res.created_at.isoformat() if res.created_at else None,
-            }
-
-            if exp is not None:
-                res_dict.update({
-                    "experience_title": exp.title,
-                    "experience_description": exp.description,
-                    "experience_location": exp.location,
-                    "experience_when": exp.when.isoformat() if exp.when else None,
-                    "experience_is_premium": exp.is_premium,
-                    "experience_slots_available": exp.slots_available
-                })
-            reservation_list.append(res_dict)
-            
-    return reservation_list
-
-
-@tool
-def fetch_tickets(user_id: str) -> list[dict[str, str]]:
+        .filter(udahub.TicketMessage.ticket_id.in_(ticket_ids))
+        .subquery()
+    )
+    return (
+        select(ranked.c.ticket_id, ranked.c.role, ranked.c.content, ranked.c.created_at)
+        .filter(ranked.c.position <= max_messages_per_ticket)
+        .order_by(ranked.c.created_at, ranked.c.message_id)
+    )
+
+
+def _ticket_to_dict(ticket: RowMapping) -> dict:
+    return {
+        "cursor": ticket["ticket_id"],
+        "channel": ticket["channel"],
+        "created_at": ticket["created_at"].isoformat(),
+        "metadata": {
+            "status": ticket["status"],
+            "issue_type": ticket["main_issue_type"],
+            "tags": ticket["tags"],
+        } if ticket["metadata_ticket_id"] is not None else None,
+        "messages": [],
+    }
+
+
+def _message_to_dict(msg: RowMapping) -> dict:
+    return {
+        "role": msg["role"].value,  # Accessing the string value of the Enum
+        "content": msg["content"],
+        "sent_at": msg["created_at"].isoformat()
+    }
+
+
+def _fetch_tickets(
+        user_id: str,
+        limit: int = 10,
+        before: str | None = None,
+        max_messages_per_ticket: int | None = 10,
+) -> list[dict[str, str]]:
     """
-    Fetch support tickets for this user.
+    Fetch support tickets for this user, newest first, one page at a time.
 
     Args:
         user_id (str): The user identifier.
+        limit (int): The maximum number of tickets to return.
+        before (str | None): To get the next page, the `cursor` of the last ticket of the previous one.
+        max_messages_per_ticket (int | None): Only return the last N messages of each ticket
+            (0 for the metadata only, None for every message).
     """
-    with get_session(UDAHUB_ENGINE) as session:
-        query = (
-            session.query(udahub.Ticket)
-            .options(
-                joinedload(udahub.Ticket.ticket_metadata),
-                selectinload(udahub.Ticket.messages)
-            )
-            .filter(udahub.Ticket.user_id == user_id)
-        .order_by(udahub.Ticket.created_at.desc())
-    )
+    with UDAHUB_ENGINE.connect() as connection:
+        tickets = {
+            ticket["ticket_id"]: _ticket_to_dict(ticket)
+            for ticket in _stream(connection, _tickets_query(user_id, limit, before))
+        }
+        if tickets and max_messages_per_ticket != 0:
+            for msg in _stream(connection, _messages_query(list(tickets), max_messages_per_ticket)):
+                tickets[msg["ticket_id"]]["messages"].append(_message_to_dict(msg))
+        return list(tickets.values())
 
-    tickets = query.all()
-    
-    results = []
-    for ticket in tickets:
-        results.append({
-            "channel": ticket.channel,
-            "created_at": ticket.created_at.isoformat(),
-            "metadata": {
-                "status": ticket.ticket_metadata.status,
-                "issue_type": ticket.ticket_metadata.main_issue_type,
-                "tags": ticket.ticket_metadata.tags,
-            } if ticket.ticket_metadata else None,
-            "messages": [
-                {
-                    "role": msg.role.value,  # Accessing the string value of the Enum
-                    "content": msg.content,
-                    "sent_at": msg.created_at.isoformat()
-                } for msg in ticket.messages
-            ]
-        })
-    
-    return results
+
+async def _afetch_tickets(
+        user_id: str,
+        limit: int = 10,
+        before: str | None = None,
+        max_messages_per_ticket: int | None = 10,
+) -> list[dict[str, str]]:
+    async with UDAHUB_ASYNC_ENGINE.connect() as connection:
+        tickets = {
+            ticket["ticket_id"]: _ticket_to_dict(ticket)
+            async for ticket in _astream(connection, _tickets_query(user_id, limit, before))
+        }
+        if tickets and max_messages_per_ticket != 0:
+            async for msg in _astream(connection, _messages_query(list(tickets), max_messages_per_ticket)):
+                tickets[msg["ticket_id"]]["messages"].append(_message_to_dict(msg))
+        return list(tickets.values())
+
+
+fetch_tickets = StructuredTool.from_function(
+    func=_fetch_tickets,
+    coroutine=_afetch_tickets,
+    name="fetch_tickets",
+)
 
 
 if __name__ == "__main__":
@@ -146,6 +433,20 @@ if __name__ == "__main__":
     for article in articles:
         print(article)
 
+    articles = search_articles.func(
+        account_id="cultpass",
+        query="How do I change the city of my subscription?",
+    )
+    for article in articles:
+        print(article["title"])
+
+    articles = semantic_search_articles.func(
+        account_id="cultpass",
+        query="How do I change the city of my subscription?",
+    )
+    for article in articles:
+        print(article["title"])
+
 
     reservations = fetch_reservations.func(
         user_id="888fb2",
@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from sqlalchemy import Engine, select
+
+import data.models.udahub as udahub
+
+
+# Any callable turning a list of texts into an (n_texts, dim) matrix of L2-normalized embeddings will do
+Embedder = Callable[[list[str]], np.ndarray]
+
+
+class HashingEmbedder:
+    """
+    A deterministic embedder that works offline: the words (and pairs of consecutive words) of a text
+    are hashed into `dim` signed buckets, and the resulting vector is L2-normalized.
+    """
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                hashed = zlib.crc32(feature.encode())
+                embeddings[row, hashed % self.dim] += 1.0 if hashed & 0x80000000 else -1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+
+def _article_text(title: str, content: str, tags: str | None) -> str:
+    return f"{title}\n{tags or ''}\n{content}"
+
+
+class ArticleVectorIndex:
+    """
+    Embeddings of the `udahub.Knowledge` articles, kept in a memory-mapped `embeddings.npy` (one row per article)
+    with a `manifest.json` describing the rows. Top-k search is a vectorized dot product over the account's rows.
+
+    `sync` brings the index up to date with the database, re-embedding only the articles whose `updated_at` changed.
+    """
+    def __init__(self, directory: Path, embedder: Embedder | None = None):
+        self.directory = Path(directory)
+        self.embedder = embedder or HashingEmbedder()
+        self.embedder_name = getattr(self.embedder, "name", type(self.embedder).__name__)
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def _matrix_path(self) -> Path:
+        return self.directory / "embeddings.npy"
+
+    @property
+    def _manifest_path(self) -> Path:
+        return self.directory / "manifest.json"
+
+    def _load(self):
+        rows, matrix = [], None
+        if self._manifest_path.exists() and self._matrix_path.exists():
+            manifest = json.loads(self._manifest_path.read_text())
+            matrix = np.load(self._matrix_path, mmap_mode="r")
+            # Embeddings from a different embedder are not comparable (and a mismatch means an interrupted write),
+            # in both cases everything gets re-embedded on the next sync
+            if manifest["embedder"] == self.embedder_name and len(manifest["rows"]) == matrix.shape[0]:
+                rows = manifest["rows"]
+            else:
+                matrix = None
+
+        # The rows are stored grouped by account, so an account's embeddings are a slice (a view into the memmap)
+        rows_by_account: dict[str, slice] = {}
+        for idx, row in enumerate(rows):
+            start = rows_by_account[row["account_id"]].start if row["account_id"] in rows_by_account else idx
+            rows_by_account[row["account_id"]] = slice(start, idx + 1)
+
+        # Swapped in one go, so that concurrent searches always see a consistent snapshot
+        self._snapshot = (rows, matrix, rows_by_account)
+
+    def sync(self, engine: Engine) -> int:
+        """
+        Re-embeds the new and changed articles, and drops the deleted ones. Returns the number of articles embedded.
+        """
+        with self._lock:
+            rows, matrix, _ = self._snapshot
+            with engine.connect() as connection:
+                articles = connection.execute(select(
+                    udahub.Knowledge.article_id,
+                    udahub.Knowledge.account_id,
+                    udahub.Knowledge.updated_at,
+                )).all()
+
+                current = {row["article_id"]: idx for idx, row in enumerate(rows)}
+                kept_rows, kept_indices, stale = [], [], []
+                for article_id, account_id, updated_at in articles:
+                    row = {"article_id": article_id, "account_id": account_id, "updated_at": str(updated_at)}
+                    idx = current.get(article_id)
+                    if idx is not None and rows[idx] == row:
+                        kept_rows.append(row)
+                        kept_indices.append(idx)
+                    else:
+                        stale.append(row)
+
+                if not stale and len(kept_rows) == len(rows):
+                    return 0
+
+                stale_ids = [row["article_id"] for row in stale]
+                texts = {
+                    article_id: _article_text(title, content, tags)
+                    for article_id, title, content, tags in connection.execute(
+                        select(
+                            udahub.Knowledge.article_id,
+                            udahub.Knowledge.title,
+                            udahub.Knowledge.content,
+                            udahub.Knowledge.tags,
+                        ).where(udahub.Knowledge.article_id.in_(stale_ids))
+                    )
+                }
+
+            parts = [np.asarray(matrix[kept_indices])] if kept_indices else []
+            if stale:
+                parts.append(self.embedder([texts[article_id] for article_id in stale_ids]).astype(np.float32))
+            if not parts:
+                # Every article was deleted
+                parts.append(np.zeros((0, matrix.shape[1]), dtype=np.float32))
+            new_matrix = np.concatenate(parts)
+
+            new_rows = kept_rows + stale
+            order = sorted(range(len(new_rows)), key=lambda idx: new_rows[idx]["account_id"])
+            self._write([new_rows[idx] for idx in order], new_matrix[order])
+            return len(stale)
+
+    def _write(self, rows: list[dict], matrix: np.ndarray):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write next to the live files and swap them in, so a crash never leaves a half-written file behind
+        tmp_matrix = self.directory / "embeddings.tmp.npy"
+        tmp_manifest = self.directory / "manifest.tmp.json"
+        np.save(tmp_matrix, matrix)
+        tmp_manifest.write_text(json.dumps({"embedder": self.embedder_name, "rows": rows}))
+
+        os.replace(tmp_matrix, self._matrix_path)
+        os.replace(tmp_manifest, self._manifest_path)
+        self._load()
+
+    def search(self, account_id: str, query: str, k: int = 5) -> list[tuple[str, float]]:
+        """
+        Returns up to `k` (article_id, cosine similarity) pairs for the account's articles, best first.
+        """
+        rows, matrix, rows_by_account = self._snapshot
+        account_rows = rows_by_account.get(account_id)
+        if account_rows is None:
+            return []
+
+        query_embedding = self.embedder([query])[0]
+        scores = matrix[account_rows] @ query_embedding
+
+        k = min(k, len(scores))
+        if k < 1:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(rows[account_rows.start + idx]["article_id"], float(scores[idx])) for idx in top]
@@ -0,0 +1,97 @@
+"""
+Compares the throughput of the sync (`graph.batch`, one worker thread per in-flight ticket) and the async
+(`graph.abatch`, one event loop) execution paths, with a stubbed LLM so that only the orchestration,
+the SQL tools and the simulated model latency are measured.
+
+Run it from the `solution` folder (after setting up the databases with the first two notebooks):
+
+    PYTHONPATH=. python benchmarks/bench_async.py --tickets 200 --latency 0.05 --concurrency 8 64
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from langgraph.checkpoint.memory import MemorySaver
+from sqlalchemy import select
+
+import data.models.udahub as udahub
+import data.models.cultpass as cultpass
+from agentic.agents import OrchestratorAgent
+from agentic.graph import build_workflow
+from agentic.tools.tools import UDAHUB_ENGINE, CULTPASS_ENGINE
+from benchmarks.fake_llm import FakeChatModel
+from utils import get_session
+
+
+def _pick_ids() -> tuple[str, str]:
+    """A user with reservations (CultPass id) and a user with tickets (UDA-Hub id) to point the tools at."""
+    with get_session(CULTPASS_ENGINE) as session:
+        cultpass_user_id = session.scalar(select(cultpass.Reservation.user_id).limit(1))
+    with get_session(UDAHUB_ENGINE) as session:
+        udahub_user_id = session.scalar(select(udahub.Ticket.user_id).limit(1))
+    return cultpass_user_id, udahub_user_id
+
+
+def _make_graph(latency: float, cache_directory: Path, direct_fetchers: bool = False):
+    cultpass_user_id, udahub_user_id = _pick_ids()
+    llm = FakeChatModel(
+        latency=latency,
+        tool_args={
+            "fetch_articles": {"account_id": "cultpass", "tags": ["reservation"]},
+            "fetch_reservations": {"user_id": cultpass_user_id},
+            "fetch_tickets": {"user_id": udahub_user_id},
+        },
+    )
+    workflow = build_workflow(llm, OrchestratorAgent(cache_directory=cache_directory), direct_fetchers=direct_fetchers)
+    return workflow.compile(checkpointer=MemorySaver())
+
+
+def _tickets(n: int, run: str) -> tuple[list[dict], list[dict]]:
+    inputs = [
+        {
+            "ticket_text": "Can you remind me what my last reservation details were?",
+            "ticket_metadata": {"channel": "email"},
+            "account_id": "cultpass",
+            "user_id": f"bench-user-{idx}",
+        }
+        for idx in range(n)
+    ]
+    configs = [{"configurable": {"thread_id": f"{run}-{idx}"}} for idx in range(n)]
+    return inputs, configs
+
+
+def run_sync(graph, n: int, concurrency: int) -> float:
+    inputs, configs = _tickets(n, f"sync-{concurrency}")
+    start = time.perf_counter()
+    graph.batch(inputs, [{**config, "max_concurrency": concurrency} for config in configs])
+    return n / (time.perf_counter() - start)
+
+
+def run_async(graph, n: int, concurrency: int) -> float:
+    inputs, configs = _tickets(n, f"async-{concurrency}")
+
+    async def main():
+        start = time.perf_counter()
+        await graph.abatch(inputs, [{**config, "max_concurrency": concurrency} for config in configs])
+        return n / (time.perf_counter() - start)
+
+    return asyncio.run(main())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=100, help="Number of tickets per run.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per LLM call.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 64], help="In-flight tickets per run.")
+    parser.add_argument("--direct", action="store_true", help="Run the fetchers without their ReAct loops.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_directory:
+        graph = _make_graph(args.latency, Path(cache_directory), direct_fetchers=args.direct)
+
+        print(f"{'mode':<8}{'concurrency':>12}{'tickets/s':>12}")
+        for concurrency in args.concurrency:
+            print(f"{'sync':<8}{concurrency:>12}{run_sync(graph, args.tickets, concurrency):>12.1f}")
+            print(f"{'async':<8}{concurrency:>12}{run_async(graph, args.tickets, concurrency):>12.1f}")
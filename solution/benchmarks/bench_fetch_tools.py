@@ -0,0 +1,135 @@
+"""
+Compares the fetch tools (Core column projections, rows streamed straight into dicts) with the ORM implementation they
+replaced (entities loaded with `.all()`, then copied into dicts): rows per second and peak Python memory per call.
+Synthetic rows are written to throwaway databases, so the real udahub.db / cultpass.db files are not needed.
+
+Run it from the `solution` folder:
+
+    PYTHONPATH=. python benchmarks/bench_fetch_tools.py --rows 100000 --calls 200
+"""
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import joinedload, selectinload
+
+import data.models.udahub as udahub
+import data.models.cultpass as cultpass
+import agentic.tools.tools as tools
+from benchmarks.bench_indexes import _create_tables, _fill_cultpass, _fill_udahub
+from data.migrations import create_indexes
+from utils import get_session
+
+
+def orm_fetch_articles(account_id: str) -> list[dict]:
+    with get_session(tools.UDAHUB_ENGINE) as session:
+        articles = session.scalars(select(udahub.Knowledge).filter_by(account_id=account_id)).all()
+        return [
+            {"article_id": a.article_id, "title": a.title, "content": a.content, "tags": a.tags} for a in articles
+        ]
+
+
+def orm_fetch_reservations(user_id: str) -> list[dict]:
+    with get_session(tools.CULTPASS_ENGINE) as session:
+        reservations = session.scalars(
+            select(cultpass.Reservation)
+            .options(joinedload(cultpass.Reservation.experience))
+            .filter(cultpass.Reservation.user_id == user_id)
+        ).all()
+        return [
+            {
+                "reservation_id": r.reservation_id,
+                "status": r.status,
+                "created_at": r.created_at.isoformat() if r.created_at else None,
+                "experience_title": r.experience.title,
+                "experience_description": r.experience.description,
+                "experience_location": r.experience.location,
+                "experience_when": r.experience.when.isoformat() if r.experience.when else None,
+                "experience_is_premium": r.experience.is_premium,
+                "experience_slots_available": r.experience.slots_available,
+            }
+            for r in reservations
+        ]
+
+
+def orm_fetch_tickets(user_id: str) -> list[dict]:
+    with get_session(tools.UDAHUB_ENGINE) as session:
+        tickets = session.scalars(
+            select(udahub.Ticket)
+            .options(joinedload(udahub.Ticket.ticket_metadata), selectinload(udahub.Ticket.messages))
+            .filter(udahub.Ticket.user_id == user_id)
+            .order_by(udahub.Ticket.created_at.desc())
+        ).all()
+        return [
+            {
+                "channel": t.channel,
+                "created_at": t.created_at.isoformat(),
+                "metadata": None,
+                "messages": [
+                    {"role": m.role.value, "content": m.content, "sent_at": m.created_at.isoformat()}
+                    for m in t.messages
+                ],
+            }
+            for t in tickets
+        ]
+
+
+def _count_rows(records: list[dict]) -> int:
+    return sum(1 + len(record.get("messages", [])) for record in records)
+
+
+def measure(fetch: Callable[[str], list[dict]], keys: list[str]) -> tuple[float, float]:
+    """Returns the rows per second and the highest peak memory (KiB) of a single call."""
+    start = time.perf_counter()
+    rows = sum(_count_rows(fetch(key)) for key in keys)
+    rows_per_second = rows / (time.perf_counter() - start)
+
+    # Traced in a second pass, as tracemalloc slows the calls down
+    peak = 0
+    tracemalloc.start()
+    for key in keys:
+        tracemalloc.reset_peak()
+        fetch(key)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return rows_per_second, peak / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000,
+                        help="Tickets (and reservations) in the synthetic databases, articles are scaled from it.")
+    parser.add_argument("--calls", type=int, default=200, help="Calls per tool.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        tools.UDAHUB_ENGINE = create_engine(f"sqlite:///{Path(directory) / 'udahub.db'}")
+        tools.CULTPASS_ENGINE = create_engine(f"sqlite:///{Path(directory) / 'cultpass.db'}")
+        _create_tables(tools.UDAHUB_ENGINE, udahub.Base.metadata)
+        _create_tables(tools.CULTPASS_ENGINE, cultpass.Base.metadata)
+        udahub_users, accounts = _fill_udahub(tools.UDAHUB_ENGINE, args.rows)
+        cultpass_users = _fill_cultpass(tools.CULTPASS_ENGINE, args.rows)
+        create_indexes(tools.UDAHUB_ENGINE, udahub.Base.metadata)
+        create_indexes(tools.CULTPASS_ENGINE, cultpass.Base.metadata)
+
+        rng = random.Random(0)
+        workloads = [
+            ("fetch_articles", orm_fetch_articles, lambda account_id: tools.fetch_articles.func(account_id),
+             rng.choices(accounts, k=args.calls)),
+            ("fetch_reservations", orm_fetch_reservations, tools.fetch_reservations.func,
+             rng.choices(cultpass_users, k=args.calls)),
+            ("fetch_tickets", orm_fetch_tickets,
+             lambda user_id: tools.fetch_tickets.func(user_id, limit=None, max_messages_per_ticket=None),
+             rng.choices(udahub_users, k=args.calls)),
+        ]
+
+        print(f"{'tool':<20}{'impl':<6}{'rows/s':>12}{'peak KiB':>12}")
+        for name, orm_fetch, fetch, keys in workloads:
+            for impl, function in (("orm", orm_fetch), ("core", fetch)):
+                rows_per_second, peak_kib = measure(function, keys)
+                print(f"{name:<20}{impl:<6}{rows_per_second:>12.0f}{peak_kib:>12.1f}")
@@ -0,0 +1,137 @@
+"""
+End-to-end throughput of the whole graph at several data sizes, without calling OpenAI: for each size, synthetic
+udahub.db / cultpass.db files are generated (see `synthetic_data.py`) and a batch of their open tickets is run through
+the graph, with `FakeChatModel` in place of the LLM. Reported per size: tickets/s, the latency percentiles of every
+node (from the graph's instrumentation) and the peak RSS of the process running the graph.
+
+Each size runs in its own process, pointed at its databases, so that the peak RSS is that of the size alone.
+Run it from the `solution` folder:
+
+    PYTHONPATH=. python benchmarks/bench_graph.py --users-per-account 100 1000 10000 --tickets 200 --direct
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+import data.models.udahub as udahub
+import data.models.cultpass as cultpass
+
+
+PERCENTILES = (50, 95, 99)
+
+
+def _percentile(sorted_samples: list[float], percentile: int) -> float:
+    # Nearest rank, so that small samples still give one of the measured values
+    rank = max(1, -(-percentile * len(sorted_samples) // 100))
+    return sorted_samples[rank - 1]
+
+
+def _peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, in KiB elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def run_graph(directory: Path, tickets: int, concurrency: int, latency: float, direct_fetchers: bool) -> dict:
+    """
+    Runs `tickets` open tickets of the databases in `directory` through the graph, in the current process.
+    """
+    # The tools bind their engines to these paths when first imported, so they are set before anything else
+    udahub.UDAHUB_DB = (directory / "udahub.db").as_posix()
+    cultpass.CULTPASS_DB = (directory / "cultpass.db").as_posix()
+
+    import itertools
+
+    from agentic.agents import OrchestratorAgent
+    from agentic.graph import build_workflow
+    from agentic.instrumentation import Instrumentation
+    from agentic.runner import BatchRunner, read_udahub_tickets
+    from agentic.tools.tools import UDAHUB_ENGINE
+    from benchmarks.fake_llm import FakeChatModel
+
+    batch = list(itertools.islice(read_udahub_tickets(UDAHUB_ENGINE, status="open"), tickets))
+    llm = FakeChatModel(
+        latency=latency,
+        tool_args={
+            "fetch_articles": {"account_id": batch[0]["account_id"], "tags": ["reservation"]},
+            "fetch_reservations": {"user_id": batch[0]["user_id"]},
+            "fetch_tickets": {"user_id": batch[0]["user_id"]},
+        },
+        # One ticket in four is escalated, so that both ends of the graph are measured
+        structured_responses={"ResolutionResult": [{"is_resolved_score": 90.0}] * 3 + [{"is_resolved_score": 10.0}]},
+    )
+    node_seconds = defaultdict(list)
+    instrumentation = Instrumentation(on_node=lambda stats: node_seconds[stats.node].append(stats.seconds))
+    workflow = build_workflow(
+        llm,
+        OrchestratorAgent(cache_directory=directory / "cache"),
+        direct_fetchers=direct_fetchers,
+        instrumentation=instrumentation,
+    )
+    runner = BatchRunner(workflow.compile(), directory / "results.jsonl", concurrency=concurrency)
+    summary = runner.run(batch)
+
+    return {
+        "tickets": summary["processed"],
+        "failed": summary["failed"],
+        "tickets_per_second": summary["processed"] / summary["seconds"],
+        "nodes": {
+            node: {f"p{p}": _percentile(sorted(samples), p) for p in PERCENTILES} | {"runs": len(samples)}
+            for node, samples in sorted(node_seconds.items())
+        },
+        "peak_rss_mib": _peak_rss_mib(),
+    }
+
+
+def run_size(args: argparse.Namespace, users_per_account: int) -> dict:
+    from benchmarks.synthetic_data import generate
+
+    with tempfile.TemporaryDirectory() as directory:
+        dataset = generate(Path(directory), accounts=args.accounts, users_per_account=users_per_account)
+        command = [
+            sys.executable, __file__, "--worker", directory,
+            "--tickets", str(args.tickets),
+            "--concurrency", str(args.concurrency),
+            "--latency", str(args.latency),
+        ]
+        if args.direct:
+            command.append("--direct")
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        return {"users": len(dataset.user_ids), "db_tickets": dataset.tickets, **json.loads(output.splitlines()[-1])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users-per-account", type=int, nargs="+", default=[100, 1000],
+                        help="The data sizes to measure (tickets, messages and reservations are scaled from it).")
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--tickets", type=int, default=200, help="Tickets run through the graph per size.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Tickets in flight at once.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per LLM call.")
+    parser.add_argument("--direct", action="store_true", help="Run the fetchers without their ReAct loops.")
+    parser.add_argument("--output", type=Path, help="Also write the results to this JSON file, e.g. to diff runs.")
+    parser.add_argument("--worker", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_graph(args.worker, args.tickets, args.concurrency, args.latency, args.direct)))
+        sys.exit()
+
+    results = []
+    for users_per_account in args.users_per_account:
+        result = run_size(args, users_per_account)
+        results.append(result)
+        print(f"\n{result['users']} users, {result['db_tickets']} tickets in the database: "
+              f"{result['tickets_per_second']:.1f} tickets/s ({result['failed']} failed), "
+              f"peak RSS {result['peak_rss_mib']:.0f} MiB")
+        print(f"  {'node':<36}{'runs':>6}" + "".join(f"{f'p{p} (ms)':>12}" for p in PERCENTILES))
+        for node, stats in result["nodes"].items():
+            print(f"  {node:<36}{stats['runs']:>6}" + "".join(f"{stats[f'p{p}'] * 1000:>12.1f}" for p in PERCENTILES))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
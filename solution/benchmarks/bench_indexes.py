@@ -0,0 +1,137 @@
+"""
+Measures the latency of the fetch tools' queries as the tables grow, before and after creating the indexes declared
+on the models (the same step `data/migrations.py` runs on existing databases). Synthetic rows are written to
+throwaway databases, so the real udahub.db / cultpass.db files are not needed.
+
+Run it from the `solution` folder:
+
+    PYTHONPATH=. python benchmarks/bench_indexes.py --rows 10000 100000 1000000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+from sqlalchemy import Engine, MetaData, create_engine
+
+import data.models.udahub as udahub
+import data.models.cultpass as cultpass
+from agentic.tools.tools import _articles_query, _reservations_query, _tickets_query
+from benchmarks.bulk_insert import insert_rows
+from data.migrations import create_indexes
+from utils import get_session
+
+
+ACCOUNTS = 100
+TICKETS_PER_USER = 20
+MESSAGES_PER_TICKET = 2
+
+
+def _create_tables(engine: Engine, metadata: MetaData):
+    """Creates the tables without their secondary indexes, like in a database set up before they were declared."""
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(connection)
+
+
+def _fill_udahub(engine: Engine, n_tickets: int) -> tuple[list[str], list[str]]:
+    n_users = max(n_tickets // TICKETS_PER_USER, 1)
+    start = datetime(2024, 1, 1)
+    insert_rows(engine, udahub.Account.__table__, (
+        {"account_id": f"account-{a}", "account_name": f"Account {a}"} for a in range(ACCOUNTS)
+    ))
+    insert_rows(engine, udahub.User.__table__, (
+        {"user_id": f"user-{u}", "account_id": f"account-{u % ACCOUNTS}", "external_user_id": f"ext-{u}",
+         "user_name": f"User {u}"}
+        for u in range(n_users)
+    ))
+    insert_rows(engine, udahub.Ticket.__table__, (
+        {"ticket_id": f"ticket-{t}", "account_id": f"account-{t % n_users % ACCOUNTS}", "user_id": f"user-{t % n_users}",
+         "channel": "email", "created_at": start + timedelta(minutes=t)}
+        for t in range(n_tickets)
+    ))
+    insert_rows(engine, udahub.TicketMessage.__table__, (
+        {"message_id": f"message-{m}", "ticket_id": f"ticket-{m // MESSAGES_PER_TICKET}", "role": "user",
+         "content": "Hello, I need help with my reservation.", "created_at": start + timedelta(minutes=m)}
+        for m in range(n_tickets * MESSAGES_PER_TICKET)
+    ))
+    insert_rows(engine, udahub.Knowledge.__table__, (
+        {"article_id": f"article-{k}", "account_id": f"account-{k % ACCOUNTS}", "title": f"Article {k}",
+         "content": "How to reserve a spot for an event.", "tags": "events, reservation"}
+        for k in range(max(n_tickets // 10, ACCOUNTS))
+    ))
+    return [f"user-{u}" for u in range(n_users)], [f"account-{a}" for a in range(ACCOUNTS)]
+
+
+def _fill_cultpass(engine: Engine, n_reservations: int) -> list[str]:
+    n_users = max(n_reservations // TICKETS_PER_USER, 1)
+    n_experiences = max(n_reservations // 100, 1)
+    start = datetime(2024, 1, 1)
+    insert_rows(engine, cultpass.User.__table__, (
+        {"user_id": f"user-{u}", "full_name": f"User {u}", "email": f"user-{u}@example.com"} for u in range(n_users)
+    ))
+    insert_rows(engine, cultpass.Experience.__table__, (
+        {"experience_id": f"experience-{e}", "title": f"Experience {e}", "description": "...", "location": "Rio",
+         "when": start + timedelta(days=e % 365), "slots_available": 10, "is_premium": False}
+        for e in range(n_experiences)
+    ))
+    insert_rows(engine, cultpass.Reservation.__table__, (
+        {"reservation_id": f"reservation-{r}", "user_id": f"user-{r % n_users}",
+         "experience_id": f"experience-{r % n_experiences}", "status": "reserved",
+         "created_at": start + timedelta(minutes=r)}
+        for r in range(n_reservations)
+    ))
+    return [f"user-{u}" for u in range(n_users)]
+
+
+def _latency_ms(engine: Engine, make_query: Callable[[str], object], keys: list[str], repeats: int) -> float:
+    samples = []
+    with get_session(engine) as session:
+        for key in random.Random(0).choices(keys, k=repeats):
+            start = time.perf_counter()
+            session.execute(make_query(key)).all()
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(rows: int, repeats: int, directory: Path) -> list[tuple[str, float, float]]:
+    udahub_engine = create_engine(f"sqlite:///{directory / f'udahub-{rows}.db'}")
+    cultpass_engine = create_engine(f"sqlite:///{directory / f'cultpass-{rows}.db'}")
+    _create_tables(udahub_engine, udahub.Base.metadata)
+    _create_tables(cultpass_engine, cultpass.Base.metadata)
+    udahub_users, accounts = _fill_udahub(udahub_engine, rows)
+    cultpass_users = _fill_cultpass(cultpass_engine, rows)
+
+    queries = [
+        ("fetch_tickets", udahub_engine, _tickets_query, udahub_users),
+        ("fetch_articles", udahub_engine, lambda account_id: _articles_query(account_id, None), accounts),
+        ("fetch_reservations", cultpass_engine, _reservations_query, cultpass_users),
+    ]
+    before = [_latency_ms(engine, make_query, keys, repeats) for _, engine, make_query, keys in queries]
+    create_indexes(udahub_engine, udahub.Base.metadata)
+    create_indexes(cultpass_engine, cultpass.Base.metadata)
+    after = [_latency_ms(engine, make_query, keys, repeats) for _, engine, make_query, keys in queries]
+
+    udahub_engine.dispose()
+    cultpass_engine.dispose()
+    return [(name, b, a) for (name, *_), b, a in zip(queries, before, after)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Tickets (and reservations) per run, messages and articles are scaled from it.")
+    parser.add_argument("--repeats", type=int, default=50, help="Queries per measurement (the median is reported).")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'query':<20}{'no index (ms)':>15}{'indexed (ms)':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            for name, before, after in run(rows, args.repeats, Path(directory)):
+                print(f"{rows:>10}  {name:<20}{before:>15.2f}{after:>15.2f}")
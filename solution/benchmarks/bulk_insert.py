@@ -0,0 +1,22 @@
+"""
+Bulk insertion of synthetic rows, shared by the benchmarks that write their own databases.
+"""
+from typing import Iterator
+
+from sqlalchemy import Engine, insert
+
+
+CHUNK_SIZE = 50_000
+
+
+def insert_rows(engine: Engine, table, rows: Iterator[dict], chunk_size: int = CHUNK_SIZE):
+    """Inserts the rows in one transaction, `chunk_size` rows per statement so that they are never all in memory."""
+    with engine.begin() as connection:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                connection.execute(insert(table), chunk)
+                chunk = []
+        if chunk:
+            connection.execute(insert(table), chunk)
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import itertools
+import re
+import threading
+import time
+import types
+import uuid
+from typing import Any, AsyncIterator, Iterator, Literal, Union, get_args, get_origin
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, PrivateAttr
+
+
+def fake_value(annotation: Any) -> Any:
+    """
+    Produces a plausible value for a type annotation, so that any of the agents' output schemas can be filled in.
+    """
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return get_args(annotation)[0]
+    if origin in (Union, types.UnionType):
+        non_optional = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return fake_value(non_optional[0]) if non_optional else None
+    if origin is list:
+        return [fake_value(get_args(annotation)[0])]
+    if origin is dict:
+        return {}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return fake_instance(annotation)
+    if annotation is bool:
+        return False
+    if annotation in (int, float):
+        return annotation(80)
+    return "stub"
+
+
+def fake_instance(schema: type[BaseModel], overrides: dict[str, Any] | None = None) -> BaseModel:
+    values = {
+        name: fake_value(field.annotation)
+        for name, field in schema.model_fields.items()
+    }
+    values.update(overrides or {})
+    return schema(**values)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    A chat model that never leaves the process, for measuring the graph without paying for OpenAI.
+
+    Every call sleeps for `latency` seconds (`asyncio.sleep` on the async path, so it behaves like a network
+    round-trip). When tools are bound, it calls the first tool listed in `tool_args` with the given arguments,
+    and answers with `text_response` once the tool result is in. When streamed, the text comes one word at a time,
+    `token_latency` seconds apart. Structured outputs are filled in by `fake_instance`,
+    with per-schema overrides taken from `structured_responses` (keyed by the schema's class name).
+    A list of overrides is a script: its entries are used in turn, starting over once exhausted.
+    """
+    latency: float = 0.05
+    token_latency: float = 0.0
+    text_response: str = "Done."
+    tool_args: dict[str, dict[str, Any]] = {}
+    structured_responses: dict[str, dict[str, Any] | list[dict[str, Any]]] = {}
+    _scripts: dict[str, Iterator[dict[str, Any]]] = PrivateAttr(default_factory=dict)
+    _scripts_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _overrides(self, schema_name: str) -> dict[str, Any] | None:
+        overrides = self.structured_responses.get(schema_name)
+        if not isinstance(overrides, list):
+            return overrides
+        with self._scripts_lock:
+            script = self._scripts.setdefault(schema_name, itertools.cycle(overrides))
+            return next(script)
+
+    def with_structured_output(self, schema, **kwargs):
+        def respond(_input):
+            time.sleep(self.latency)
+            return fake_instance(schema, self._overrides(schema.__name__))
+
+        async def arespond(_input):
+            await asyncio.sleep(self.latency)
+            return fake_instance(schema, self._overrides(schema.__name__))
+
+        return RunnableLambda(respond, afunc=arespond, name=f"fake_structured_{schema.__name__}")
+
+    def _respond(self, messages: list[BaseMessage], tools: list[dict] | None) -> ChatResult:
+        bound_tools = {tool["function"]["name"] for tool in tools or []}
+        already_called = any(isinstance(message, ToolMessage) for message in messages)
+
+        for name, args in self.tool_args.items():
+            if name in bound_tools and not already_called:
+                message = AIMessage(
+                    content="",
+                    tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:8]}"}],
+                )
+                break
+        else:
+            message = AIMessage(content=self.text_response)
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools"))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools"))
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(message.tool_calls)
+            ]))
+            return
+        for token in re.findall(r"\s*\S+", message.content):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for index, chunk in enumerate(self._chunks(self._respond(messages, kwargs.get("tools")).generations[0].message)):
+            if index:
+                time.sleep(self.token_latency)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for index, chunk in enumerate(self._chunks(self._respond(messages, kwargs.get("tools")).generations[0].message)):
+            if index:
+                await asyncio.sleep(self.token_latency)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
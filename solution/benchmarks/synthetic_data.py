@@ -0,0 +1,194 @@
+"""
+Generates a udahub.db / cultpass.db pair of any size, with the same schema, indexes and full-text index as the
+files set up by the notebooks, so that the graph can be benchmarked at data sizes the sample data doesn't reach.
+The same user ids are used in both databases, and everything is derived from `seed`.
+
+Run it from the `solution` folder:
+
+    PYTHONPATH=. python benchmarks/synthetic_data.py --directory /tmp/bench-data --accounts 10 --users-per-account 1000
+"""
+import argparse
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import Engine, MetaData, create_engine, text
+
+import data.models.udahub as udahub
+import data.models.cultpass as cultpass
+from benchmarks.bulk_insert import insert_rows
+
+
+USERS_PER_CHUNK = 10_000
+
+# The topics of the generated tickets, each with the tags of the articles answering it
+TOPICS: dict[str, tuple[list[str], list[str]]] = {
+    "login": (["login", "account"], [
+        "I can't log in to the app, it says my password is wrong.",
+        "The login code never arrives by email.",
+    ]),
+    "reservation": (["reservation", "events"], [
+        "Can you remind me what my last reservation details were?",
+        "I want to cancel my reservation for this weekend.",
+    ]),
+    "billing": (["billing", "subscription"], [
+        "I was charged twice this month.",
+        "How do I get a refund for my subscription?",
+    ]),
+    "subscription": (["subscription", "premium"], [
+        "How do I upgrade my plan to premium?",
+        "I'd like to pause my subscription while I travel.",
+    ]),
+}
+
+
+@dataclass
+class SyntheticData:
+    udahub_db: Path
+    cultpass_db: Path
+    account_ids: list[str]
+    user_ids: list[str]
+    tickets: int
+
+
+def _create(db_path: Path, metadata: MetaData) -> Engine:
+    engine = create_engine(f"sqlite:///{db_path}")
+    # create_all also creates the declared indexes and (for udahub) the full-text index and its triggers
+    metadata.create_all(engine)
+    return engine
+
+
+def generate(
+        directory: Path,
+        accounts: int = 10,
+        users_per_account: int = 100,
+        tickets_per_user: int = 3,
+        messages_per_ticket: int = 2,
+        articles_per_account: int = 50,
+        reservations_per_user: int = 3,
+        experiences: int = 500,
+        seed: int = 0,
+) -> SyntheticData:
+    """
+    Writes `udahub.db` and `cultpass.db` into `directory`, which must not hold them already.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    udahub_db, cultpass_db = directory / "udahub.db", directory / "cultpass.db"
+    for db_path in (udahub_db, cultpass_db):
+        if db_path.exists():
+            raise FileExistsError(f"{db_path} already exists")
+
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    account_ids = [f"account-{a}" for a in range(accounts)]
+    # (user_id, account_id) pairs, the users of an account being contiguous
+    users = [
+        (f"user-{a}-{u}", account_id) for a, account_id in enumerate(account_ids) for u in range(users_per_account)
+    ]
+    topics = list(TOPICS)
+
+    engine = _create(udahub_db, udahub.Base.metadata)
+    insert_rows(engine, udahub.Account.__table__, (
+        {"account_id": account_id, "account_name": f"Account {a}"} for a, account_id in enumerate(account_ids)
+    ))
+    insert_rows(engine, udahub.User.__table__, (
+        {"user_id": user_id, "account_id": account_id, "external_user_id": user_id, "user_name": user_id}
+        for user_id, account_id in users
+    ))
+
+    # Core inserts skip the ORM event filling knowledge_tags, so its rows are written alongside the articles
+    articles, article_tags = [], []
+    for account_id in account_ids:
+        for k in range(articles_per_account):
+            topic = topics[k % len(topics)]
+            tags, questions = TOPICS[topic]
+            article_id = f"{account_id}-article-{k}"
+            articles.append({
+                "article_id": article_id,
+                "account_id": account_id,
+                "title": f"{topic.capitalize()} help #{k}",
+                "content": f"{rng.choice(questions)} Here is how to sort it out, step by step.",
+                "tags": ", ".join(tags),
+            })
+            article_tags += [{"article_id": article_id, "tag": tag, "account_id": account_id} for tag in tags]
+    insert_rows(engine, udahub.Knowledge.__table__, iter(articles))
+    insert_rows(engine, udahub.KnowledgeTag.__table__, iter(article_tags))
+
+    # Written a chunk of users at a time, so that big databases are never held in memory
+    n_tickets = 0
+    for first in range(0, len(users), USERS_PER_CHUNK):
+        tickets, metadata, messages = [], [], []
+        for user_id, account_id in users[first:first + USERS_PER_CHUNK]:
+            for _ in range(tickets_per_user):
+                topic = rng.choice(topics)
+                ticket_id = f"ticket-{n_tickets}"
+                created_at = start + timedelta(minutes=n_tickets)
+                n_tickets += 1
+                tickets.append({"ticket_id": ticket_id, "account_id": account_id, "user_id": user_id,
+                                "channel": "email", "created_at": created_at})
+                metadata.append({"ticket_id": ticket_id, "status": rng.choice(["open", "resolved"]),
+                                 "main_issue_type": topic, "tags": ", ".join(TOPICS[topic][0])})
+                messages += [
+                    {
+                        "message_id": f"{ticket_id}-message-{m}",
+                        "ticket_id": ticket_id,
+                        "role": "user" if m % 2 == 0 else "agent",
+                        "content": rng.choice(TOPICS[topic][1]) if m % 2 == 0 else "Thanks, we are looking into it.",
+                        "created_at": created_at + timedelta(minutes=m),
+                    }
+                    for m in range(messages_per_ticket)
+                ]
+        insert_rows(engine, udahub.Ticket.__table__, iter(tickets))
+        insert_rows(engine, udahub.TicketMetadata.__table__, iter(metadata))
+        insert_rows(engine, udahub.TicketMessage.__table__, iter(messages))
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    engine.dispose()
+
+    engine = _create(cultpass_db, cultpass.Base.metadata)
+    insert_rows(engine, cultpass.User.__table__, (
+        {"user_id": user_id, "full_name": user_id, "email": f"{user_id}@example.com", "is_blocked": False}
+        for user_id, _ in users
+    ))
+    insert_rows(engine, cultpass.Subscription.__table__, (
+        {"subscription_id": f"subscription-{user_id}", "user_id": user_id, "status": "active",
+         "tier": rng.choice(["basic", "premium"]), "monthly_quota": 4, "started_at": start}
+        for user_id, _ in users
+    ))
+    insert_rows(engine, cultpass.Experience.__table__, (
+        {"experience_id": f"experience-{e}", "title": f"Experience {e}", "description": "A guided visit.",
+         "location": rng.choice(["Rio", "São Paulo", "Recife"]), "when": start + timedelta(days=e % 365),
+         "slots_available": 10, "is_premium": e % 5 == 0}
+        for e in range(experiences)
+    ))
+    insert_rows(engine, cultpass.Reservation.__table__, (
+        {"reservation_id": f"reservation-{user_id}-{r}", "user_id": user_id,
+         "experience_id": f"experience-{rng.randrange(experiences)}", "status": "reserved",
+         "created_at": start + timedelta(days=r)}
+        for user_id, _ in users for r in range(reservations_per_user)
+    ))
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    engine.dispose()
+
+    return SyntheticData(udahub_db, cultpass_db, account_ids, [user_id for user_id, _ in users], n_tickets)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", type=Path, required=True, help="Where udahub.db and cultpass.db are written.")
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--users-per-account", type=int, default=100)
+    parser.add_argument("--tickets-per-user", type=int, default=3)
+    parser.add_argument("--messages-per-ticket", type=int, default=2)
+    parser.add_argument("--articles-per-account", type=int, default=50)
+    parser.add_argument("--reservations-per-user", type=int, default=3)
+    parser.add_argument("--experiences", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    dataset = generate(**{name: value for name, value in vars(args).items()})
+    print(f"✅ Wrote {dataset.tickets} tickets of {len(dataset.user_ids)} users to {dataset.udahub_db} "
+          f"and {dataset.cultpass_db}")
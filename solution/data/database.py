@@ -0,0 +1,104 @@
+"""
+The one place where the SQLite engines (and their session factories) are created, so that every tool,
+worker thread and coroutine shares the same connection pools instead of opening new ones per call.
+
+    from data.database import get_engine, get_async_engine
+
+    engine = get_engine(udahub.UDAHUB_DB, read_only=True)
+"""
+import os
+import threading
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+
+# Connections kept open per engine (and how many more can be opened under load)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds a connection waits for another one's write lock before giving up
+BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "30"))
+
+# (driver, db_path, read_only) -> engine
+_ENGINES: dict[tuple[str, str, bool], Engine | AsyncEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def _set_pragmas(engine: Engine, read_only: bool):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets the readers run alongside a writer, and NORMAL only syncs at checkpoints (safe with WAL)
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def get_engine(db_path: str, read_only: bool = False) -> Engine:
+    """
+    Returns the process-wide engine of the SQLite file. `read_only` engines refuse any write, use them for the fetch tools.
+    """
+    with _ENGINES_LOCK:
+        key = ("sqlite", str(db_path), read_only)
+        if key not in _ENGINES:
+            _ENGINES[key] = _create_engine(str(db_path), read_only)
+        return _ENGINES[key]
+
+
+def _create_engine(db_path: str, read_only: bool) -> Engine:
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        echo=False,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        connect_args={"check_same_thread": False, "timeout": BUSY_TIMEOUT},
+    )
+    _set_pragmas(engine, read_only)
+    return engine
+
+
+def get_async_engine(db_path: str, read_only: bool = False) -> AsyncEngine:
+    """
+    The aiosqlite counterpart of `get_engine`, for the async (ainvoke) path.
+    """
+    with _ENGINES_LOCK:
+        key = ("aiosqlite", str(db_path), read_only)
+        if key not in _ENGINES:
+            _ENGINES[key] = _create_async_engine(str(db_path), read_only)
+        return _ENGINES[key]
+
+
+def _create_async_engine(db_path: str, read_only: bool) -> AsyncEngine:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        echo=False,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        connect_args={"timeout": BUSY_TIMEOUT},
+    )
+    _set_pragmas(engine.sync_engine, read_only)
+    return engine
+
+
+def session_factory(engine: Engine) -> sessionmaker:
+    """
+    The session factory of the engine, created once and kept on the engine itself so that it goes away with it
+    (a module-level cache would keep every engine ever passed in alive, e.g. the throwaway ones of the tests).
+    """
+    factory = engine.__dict__.get("_session_factory")
+    if factory is None:
+        factory = engine.__dict__.setdefault("_session_factory", sessionmaker(bind=engine))
+    return factory
+
+
+async def adispose_engines():
+    """
+    Closes the pooled connections of the aiosqlite engines (which can only be done on a loop), e.g. at shutdown.
+    """
+    with _ENGINES_LOCK:
+        engines = [engine for engine in _ENGINES.values() if isinstance(engine, AsyncEngine)]
+    for engine in engines:
+        await engine.dispose()
@@ -0,0 +1,81 @@
+"""
+Brings existing udahub.db / cultpass.db files (created by the setup notebooks) up to date with the models,
+without dropping any data. Safe to run repeatedly:
+
+    PYTHONPATH=. python data/migrations.py
+"""
+from sqlalchemy import Engine, MetaData, delete, select, text
+
+from data.database import get_engine
+import data.models.udahub as udahub
+import data.models.cultpass as cultpass
+from utils import get_session
+
+
+def rebuild_knowledge_tags(engine: Engine) -> int:
+    """
+    (Re)populates the `knowledge_tags` inverted index from `Knowledge.tags`, e.g. for articles
+    written before the index existed or changed with raw SQL. Returns the number of rows written.
+    """
+    with get_session(engine) as session:
+        session.execute(delete(udahub.KnowledgeTag))
+        rows = [
+            {"article_id": article_id, "account_id": account_id, "tag": tag}
+            for article_id, account_id, tags in session.execute(
+                select(udahub.Knowledge.article_id, udahub.Knowledge.account_id, udahub.Knowledge.tags)
+            )
+            for tag in udahub.normalize_tags(tags)
+        ]
+        if rows:
+            session.execute(udahub.KnowledgeTag.__table__.insert(), rows)
+    return len(rows)
+
+
+def rebuild_knowledge_fts(engine: Engine):
+    """
+    Creates the `knowledge_fts` full-text index (and the triggers keeping it up to date) if missing,
+    and rebuilds its content from the `knowledge` table.
+    """
+    with engine.begin() as connection:
+        for statement in udahub.KNOWLEDGE_FTS_DDL:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO knowledge_fts(knowledge_fts) VALUES ('rebuild')"))
+
+
+def create_indexes(engine: Engine, metadata: MetaData) -> list[str]:
+    """
+    Creates the indexes declared on the models that are missing from the database (`create_all` only adds the indexes
+    of the tables it creates), then refreshes the query planner's statistics. Returns the names of the created indexes.
+    """
+    with engine.begin() as connection:
+        existing = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+        created = []
+        for table in metadata.sorted_tables:
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    index.create(connection)
+                    created.append(index.name)
+        connection.execute(text("ANALYZE"))
+    return created
+
+
+def upgrade_udahub(engine: Engine):
+    # Creates the tables missing from older files (e.g. knowledge_tags), existing ones are left as they are
+    udahub.Base.metadata.create_all(engine)
+    print(f"✅ Created the indexes {create_indexes(engine, udahub.Base.metadata)}")
+    print(f"✅ Indexed {rebuild_knowledge_tags(engine)} article tags")
+    rebuild_knowledge_fts(engine)
+    print("✅ Rebuilt the full-text index of the articles")
+
+
+def upgrade_cultpass(engine: Engine):
+    cultpass.Base.metadata.create_all(engine)
+    print(f"✅ Created the indexes {create_indexes(engine, cultpass.Base.metadata)}")
+
+
+if __name__ == "__main__":
+    upgrade_udahub(get_engine(udahub.UDAHUB_DB))
+    print(f"✅ Upgraded {udahub.UDAHUB_DB}")
+
+    upgrade_cultpass(get_engine(cultpass.CULTPASS_DB))
+    print(f"✅ Upgraded {cultpass.CULTPASS_DB}")
@@ -7,6 +7,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.orm.decl_api import DeclarativeBase
@@ -90,6 +91,11 @@ class Reservation(Base):
     user = relationship("User", back_populates="reservations")
     experience = relationship("Experience", back_populates="reservations")
 
+    __table_args__ = (
+        Index('ix_reservations_user_created', 'user_id', 'created_at'),
+        Index('ix_reservations_experience', 'experience_id'),
+    )
+
     def __repr__(self):
         return f"<Reservation(reservation_id='{self.reservation_id}', user_id='{self.user_id}', experience_id='{self.experience_id}', status='{self.status}')>"
 
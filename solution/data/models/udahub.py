@@ -1,16 +1,20 @@
 import enum
 from pathlib import Path
+from typing import Iterable
 
 from sqlalchemy import (
+    DDL,
     Column,
     String,
     Text,
     DateTime,
     Enum,
     ForeignKey,
-    UniqueConstraint
+    Index,
+    UniqueConstraint,
+    event,
 )
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.orm import Session, attributes, declarative_base, relationship
 from sqlalchemy.orm.decl_api import DeclarativeBase
 from sqlalchemy.sql import func
 
@@ -75,6 +79,12 @@ class Ticket(Base):
     ticket_metadata = relationship("TicketMetadata", uselist=False, back_populates="ticket")
     messages = relationship("TicketMessage", back_populates="ticket")
 
+    __table_args__ = (
+        # A user's ticket history, newest first (fetch_tickets)
+        Index('ix_tickets_user_created', user_id, created_at.desc()),
+        Index('ix_tickets_account_created', account_id, created_at.desc()),
+    )
+
     def __repr__(self):
         return f"<Ticket(ticket_id='{self.ticket_id}', channel='{self.channel}', created_at='{self.created_at}')>"
 
@@ -112,6 +122,11 @@ class TicketMessage(Base):
 
     ticket = relationship("Ticket", back_populates="messages")
 
+    __table_args__ = (
+        # The (last) messages of a page of tickets, in the order they were sent (fetch_tickets)
+        Index('ix_ticket_messages_ticket_created', 'ticket_id', 'created_at'),
+    )
+
     def __repr__(self):
         short_content = (self.content[:30] + "...") if self.content and len(self.content) > 30 else self.content
         return f"<TicketMessage(message_id='{self.message_id}', role='{self.role.name}', content='{short_content}')>"
@@ -128,6 +143,100 @@ class Knowledge(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
     account = relationship("Account", back_populates="knowledge_articles")
+    tag_entries = relationship("KnowledgeTag", back_populates="article", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index('ix_knowledge_account', 'account_id'),
+    )
 
     def __repr__(self):
         return f"<Knowledge(article_id='{self.article_id}', title='{self.title}')>"
+
+
+class KnowledgeTag(Base):
+    """
+    Inverted index over `Knowledge.tags`: one row per (article, tag), so that looking up articles by tag
+    is an exact-match index seek instead of a `LIKE '%tag%'` scan over the whole knowledge table.
+    Kept in sync with `Knowledge.tags` by `_sync_knowledge_tags` below.
+    """
+    __tablename__ = 'knowledge_tags'
+    article_id = Column(String, ForeignKey('knowledge.article_id', ondelete='CASCADE'), primary_key=True)
+    tag = Column(String, primary_key=True)
+    account_id = Column(String, ForeignKey('accounts.account_id'), nullable=False)
+
+    article = relationship("Knowledge", back_populates="tag_entries")
+
+    __table_args__ = (
+        Index('ix_knowledge_tags_account_tag', 'account_id', 'tag', 'article_id'),
+    )
+
+    def __repr__(self):
+        return f"<KnowledgeTag(article_id='{self.article_id}', tag='{self.tag}')>"
+
+
+def normalize_tags(tags: str | Iterable[str] | None) -> list[str]:
+    """
+    Turns a comma-separated tags string (or a list of tags) into unique, stripped, lower-cased tags, keeping their order.
+    """
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    return list(dict.fromkeys(tag.strip().lower() for tag in tags if tag.strip()))
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_knowledge_tags(session, flush_context, instances):
+    """
+    Keeps the `knowledge_tags` rows in line with `Knowledge.tags` whenever articles are added or changed
+    through the ORM (deletes are handled by the cascade on `Knowledge.tag_entries`).
+    """
+    for article in [*session.new, *session.dirty]:
+        if not isinstance(article, Knowledge):
+            continue
+        if article not in session.new and not (
+            attributes.get_history(article, 'tags').has_changes()
+            or attributes.get_history(article, 'account_id').has_changes()
+        ):
+            continue
+
+        existing = {entry.tag: entry for entry in article.tag_entries}
+        entries = []
+        for tag in normalize_tags(article.tags):
+            entry = existing.get(tag) or KnowledgeTag(tag=tag)
+            entry.account_id = article.account_id
+            entries.append(entry)
+        article.tag_entries = entries
+
+
+# Full-text search over the knowledge articles: an external-content FTS5 table (the text is stored once, in
+# `knowledge`), kept up to date by triggers, so BM25-ranked retrieval is a single indexed query.
+# It is keyed on the implicit rowid of `knowledge`, so run `rebuild_knowledge_fts` after a VACUUM.
+KNOWLEDGE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+        title, content, tags, content='knowledge', content_rowid='rowid'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS knowledge_fts_insert AFTER INSERT ON knowledge BEGIN
+        INSERT INTO knowledge_fts(rowid, title, content, tags) VALUES (new.rowid, new.title, new.content, new.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS knowledge_fts_delete AFTER DELETE ON knowledge BEGIN
+        INSERT INTO knowledge_fts(knowledge_fts, rowid, title, content, tags)
+        VALUES ('delete', old.rowid, old.title, old.content, old.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS knowledge_fts_update AFTER UPDATE OF title, content, tags ON knowledge BEGIN
+        INSERT INTO knowledge_fts(knowledge_fts, rowid, title, content, tags)
+        VALUES ('delete', old.rowid, old.title, old.content, old.tags);
+        INSERT INTO knowledge_fts(rowid, title, content, tags) VALUES (new.rowid, new.title, new.content, new.tags);
+    END
+    """,
+]
+
+for statement in KNOWLEDGE_FTS_DDL:
+    event.listen(Knowledge.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+import agentic.tools.tools as tools
+from agentic.tag_registry import TAG_REGISTRY
+from benchmarks.synthetic_data import SyntheticData, generate
+
+
+@pytest.fixture
+def synthetic_databases(tmp_path, monkeypatch) -> SyntheticData:
+    """
+    Small generated udahub / cultpass databases, with the tools (and the tag registry) pointed at them.
+    """
+    dataset = generate(
+        tmp_path / "data",
+        accounts=2,
+        users_per_account=3,
+        tickets_per_user=2,
+        articles_per_account=8,
+        reservations_per_user=2,
+        experiences=10,
+    )
+    engines = {
+        "UDAHUB_ENGINE": create_engine(f"sqlite:///{dataset.udahub_db}"),
+        "CULTPASS_ENGINE": create_engine(f"sqlite:///{dataset.cultpass_db}"),
+        # Without pooling, so that the connections never outlive the event loop of a test
+        "UDAHUB_ASYNC_ENGINE": create_async_engine(f"sqlite+aiosqlite:///{dataset.udahub_db}", poolclass=NullPool),
+        "CULTPASS_ASYNC_ENGINE": create_async_engine(f"sqlite+aiosqlite:///{dataset.cultpass_db}", poolclass=NullPool),
+    }
+    for name, engine in engines.items():
+        monkeypatch.setattr(tools, name, engine)
+    monkeypatch.setattr(TAG_REGISTRY, "engine", engines["UDAHUB_ENGINE"])
+    monkeypatch.setattr(TAG_REGISTRY, "_entries", {})
+
+    yield dataset
+
+    engines["UDAHUB_ENGINE"].dispose()
+    engines["CULTPASS_ENGINE"].dispose()
+    asyncio.run(engines["UDAHUB_ASYNC_ENGINE"].dispose())
+    asyncio.run(engines["CULTPASS_ASYNC_ENGINE"].dispose())
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+import agentic.tools.tools as tools
+from agentic.agents import OrchestratorAgent
+from agentic.graph import build_workflow
+from benchmarks.fake_llm import FakeChatModel
+
+
+def test_async_tools_return_the_same_rows_as_the_sync_ones(synthetic_databases):
+    account_id, user_id = synthetic_databases.account_ids[0], synthetic_databases.user_ids[0]
+    calls = [
+        (tools.fetch_articles, (account_id, ["reservation"])),
+        (tools.fetch_articles, (account_id, None)),
+        (tools.search_articles, (account_id, "cancel my reservation", 3)),
+        (tools.fetch_reservations, (user_id,)),
+        (tools.fetch_tickets, (user_id,)),
+    ]
+    for tool, args in calls:
+        rows = tool.func(*args)
+        assert rows, tool.name
+        assert asyncio.run(tool.coroutine(*args)) == rows, tool.name
+
+
+@pytest.mark.parametrize("direct_fetchers", [True, False])
+def test_graph_ainvoke_matches_invoke(synthetic_databases, tmp_path, monkeypatch, direct_fetchers):
+    account_id, user_id = synthetic_databases.account_ids[0], synthetic_databases.user_ids[0]
+    awaited = []
+    for tool in (tools.fetch_articles, tools.fetch_reservations, tools.fetch_tickets):
+        async def spy(*args, _tool=tool, _coroutine=tool.coroutine, **kwargs):
+            awaited.append(_tool.name)
+            return await _coroutine(*args, **kwargs)
+        monkeypatch.setattr(tool, "coroutine", spy)
+
+    llm = FakeChatModel(
+        latency=0,
+        tool_args={
+            "fetch_articles": {"account_id": account_id, "tags": ["reservation"]},
+            "fetch_reservations": {"user_id": user_id},
+            "fetch_tickets": {"user_id": user_id},
+        },
+        structured_responses={
+            "DynamicClassifierState": {
+                "is_ticket_classified_score": 90.0,
+                "needs_info_about_previous_user_tickets_score": 90.0,
+                "needs_info_about_reservations_score": 90.0,
+                "tags": ["reservation"],
+            },
+            "ResolutionResult": {"resolution_text": "Here you go", "is_resolved_score": 90.0},
+        },
+    )
+    workflow = build_workflow(
+        llm,
+        OrchestratorAgent(cache_directory=tmp_path / "cache", parallel_fetchers=True),
+        direct_fetchers=direct_fetchers,
+    )
+    graph = workflow.compile(checkpointer=MemorySaver())
+    ticket = {
+        "ticket_text": "I want to cancel my reservation for this weekend.",
+        "ticket_metadata": {"channel": "email"},
+        "account_id": account_id,
+        "user_id": user_id,
+    }
+
+    expected = graph.invoke(ticket, {"configurable": {"thread_id": "sync"}})
+    result = asyncio.run(graph.ainvoke(ticket, {"configurable": {"thread_id": "async"}}))
+
+    assert result["resolution_text"] == expected["resolution_text"] == "Here you go"
+    for field in ("tags", "relevant_articles", "reservations", "previous_tickets"):
+        assert result[field] == expected[field], field
+    # Only the async run awaits the tools' coroutines, the sync one calls their functions
+    assert sorted(awaited) == ["fetch_articles", "fetch_reservations", "fetch_tickets"]
+    if direct_fetchers:
+        # (The ReAct fetchers hand their results over through the fake LLM's stubbed summaries instead)
+        assert expected["reservations"] and expected["previous_tickets"] and expected["relevant_articles"]
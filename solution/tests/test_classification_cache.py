@@ -0,0 +1,56 @@
+from agentic.agents.classification_cache import ClassificationCache
+
+TAGS = ("location", "subscription")
+METADATA = {"channel": "email"}
+RESULT = {"tags": ["location"], "is_ticket_classified_score": 90.0}
+
+
+def test_exact_tier_normalizes_the_ticket_text(tmp_path):
+    cache = ClassificationCache(tmp_path)
+    cache.store("cultpass", TAGS, "How do I change my subscription location?", METADATA, RESULT, llm_seconds=2.0)
+
+    assert cache.lookup("cultpass", TAGS, "  how do I change my Subscription location ", METADATA) == RESULT
+    # Anything else that went into the classification is part of the key
+    assert cache.lookup("cultpass", TAGS + ("travel",), "How do I change my subscription location?", METADATA) is None
+    assert cache.lookup("cultpass", TAGS, "How do I change my subscription location?", {"channel": "chat"}) is None
+    assert cache.lookup("other", TAGS, "How do I change my subscription location?", METADATA) is None
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["misses"], stats["saved_seconds"]) == (1, 3, 1 * 2.0 / 3)
+
+
+def test_similarity_tier_reuses_near_duplicates(tmp_path):
+    ClassificationCache(tmp_path, similarity_threshold=0.6).store(
+        "cultpass", TAGS, "How do I change my subscription location", METADATA, RESULT,
+    )
+
+    # A new instance finds the stored embeddings on disk
+    cache = ClassificationCache(tmp_path, similarity_threshold=0.6)
+    assert cache.lookup("cultpass", TAGS, "how do i change my subscription location please", METADATA) == RESULT
+    assert cache.lookup("cultpass", TAGS, "My card was charged twice", METADATA) is None
+    assert cache.stats()["similar_hits"] == 1
+
+
+def test_key_ignores_volatile_metadata(tmp_path):
+    cache = ClassificationCache(tmp_path)
+    cache.store("cultpass", TAGS, "Where is my pass?", {**METADATA, "submission_date": "2025-01-01"}, RESULT)
+    assert cache.lookup("cultpass", TAGS, "Where is my pass?", {**METADATA, "submission_date": "2025-02-03"}) == RESULT
+
+
+def test_similarity_tier_skips_evicted_entries(tmp_path):
+    cache = ClassificationCache(tmp_path, similarity_threshold=0.5)
+    other = {**RESULT, "tags": ["subscription"]}
+    cache.store("cultpass", TAGS, "How do I change my subscription location", METADATA, RESULT)
+    cache.store("cultpass", TAGS, "How can I change my subscription location now", METADATA, other)
+    cache.lookup("cultpass", TAGS, "something else entirely", METADATA)  # loads the group's embeddings
+
+    # The best match is evicted from disk, the lookup falls back to the next one and forgets the evicted entry
+    group = cache._group("cultpass", TAGS, METADATA)
+    cache.cache.delete(("classification", group, "how do i change my subscription location"))
+    assert cache.lookup("cultpass", TAGS, "how do i change my subscription location please", METADATA) == other
+    assert cache._groups[group][0] == ["how can i change my subscription location now"]
+
+    # Evictions nobody looked up are pruned once the in-memory embeddings outnumber the disk entries
+    cache.cache.clear()
+    cache.store("cultpass", TAGS, "My card was charged twice", METADATA, RESULT)
+    assert cache._groups[group][0] == ["my card was charged twice"]
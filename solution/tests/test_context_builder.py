@@ -0,0 +1,27 @@
+from agentic.agents.context_builder import ContextBuilder, estimate_tokens
+
+
+def _ticket(created_at: str, content: str) -> dict:
+    return {"content": content, "tags": "", "other": f"channel=email, created_at={created_at}, status=closed"}
+
+
+def test_context_fits_the_budget_and_keeps_the_best_items():
+    state = {
+        "ticket_text": "My refund for the concert never arrived",
+        "relevant_articles": [
+            {"article_id": "a1", "title": "Refunds", "content": "Refunds take 5 days.", "tags": "refund"},
+            {"article_id": "a1", "title": "Refunds", "content": "Refunds take 5 days.", "tags": "refund"},
+        ],
+        "previous_tickets": [_ticket(f"2024-01-{day:02d}", "user: where is my parking spot?\nagent: " + "x" * 4000)
+                             for day in range(1, 29)] + [_ticket("2023-06-01", "user: refund for the concert")],
+        "reservations": [],
+    }
+    context = ContextBuilder(max_tokens=300, max_item_tokens=100)(state)
+
+    assert context["relevant_articles"] == "- Refunds [refund]: Refunds take 5 days."
+    assert context["reservations"] == "No reservations found."
+    # The old but relevant ticket comes first, long ones are cut, and the section takes what the others left
+    tickets = context["previous_tickets"].splitlines()
+    assert "refund for the concert" in tickets[0]
+    assert all(estimate_tokens(line) <= 100 for line in tickets)
+    assert sum(estimate_tokens(section) for section in context.values()) <= 300 + 10
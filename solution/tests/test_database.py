@@ -0,0 +1,39 @@
+import gc
+import weakref
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from data.database import get_engine, session_factory
+from utils import get_session
+
+
+def test_engines_are_shared_and_read_only_engines_refuse_writes(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    engine = get_engine(db_path)
+    assert get_engine(db_path) is engine
+    assert get_engine(db_path, read_only=True) is not engine
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (name TEXT)"))
+        connection.execute(text("INSERT INTO items VALUES ('a')"))
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+    with get_engine(db_path, read_only=True).connect() as connection:
+        assert connection.execute(text("SELECT name FROM items")).scalars().all() == ["a"]
+        with pytest.raises(OperationalError):
+            connection.execute(text("INSERT INTO items VALUES ('b')"))
+
+
+def test_session_factories_do_not_outlive_their_engines(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    assert session_factory(engine) is session_factory(engine)
+    with get_session(engine) as session:
+        assert session.execute(text("SELECT 1")).scalar() == 1
+
+    engine.dispose()
+    collected = weakref.ref(engine)
+    del engine, session
+    gc.collect()
+    assert collected() is None
@@ -0,0 +1,91 @@
+import asyncio
+
+from agentic.agents.articles_fetcher import ArticlesFetcherAgent
+from agentic.agents.reranker import Reranker
+from agentic.agents.reservation_fetcher import ReservationFetcherAgent, _to_result
+from agentic.agents.states import RerankResult, _Article
+from agentic.agents.ticket_fetcher import TicketFetcherAgent
+from benchmarks.fake_llm import FakeChatModel
+
+
+def _state(dataset, **values):
+    return {
+        "ticket_text": "I want to cancel my reservation for this weekend.",
+        "account_id": dataset.account_ids[0],
+        "user_id": dataset.user_ids[0],
+        **values,
+    }
+
+
+def _rerank_llm(*indices):
+    return FakeChatModel(latency=0, structured_responses={"RerankResult": {"relevant_indices": list(indices)}})
+
+
+def test_direct_ticket_fetcher_maps_the_tickets(synthetic_databases):
+    agent = TicketFetcherAgent(FakeChatModel(latency=0), direct=True)
+    tickets = agent(_state(synthetic_databases)).update["previous_tickets"]
+
+    assert len(tickets) == 2
+    for ticket in tickets:
+        user, reply = ticket["content"].split("\n")
+        assert user.startswith("user: ") and reply == "agent: Thanks, we are looking into it."
+        assert ticket["tags"]
+        assert ticket["other"].startswith("channel=email, created_at=")
+        assert "status=" in ticket["other"] and "issue_type=" in ticket["other"]
+
+
+def test_direct_reservation_fetcher_maps_and_reranks(synthetic_databases):
+    state = _state(synthetic_databases)
+    reservations = ReservationFetcherAgent(FakeChatModel(latency=0), direct=True)(state).update["reservations"]
+
+    assert len(reservations) == 2
+    for reservation in reservations:
+        assert reservation["content"].startswith("Experience ")
+        assert ": A guided visit." in reservation["content"]
+        assert reservation["status"] == "reserved"
+        assert f"reservation_id=reservation-{state['user_id']}-" in reservation["other"]
+        assert "is_premium=" in reservation["other"] and "slots_available=10" in reservation["other"]
+
+    # The re-ranking pass keeps the picked records, in the picked order
+    agent = ReservationFetcherAgent(_rerank_llm(1, 0), direct=True, rerank=True)
+    assert agent(state).update["reservations"] == reservations[::-1]
+    agent = ReservationFetcherAgent(_rerank_llm(1), direct=True, rerank=True)
+    assert asyncio.run(agent.acall(state)).update["reservations"] == reservations[1:]
+
+
+def test_reservations_without_an_experience_are_not_rendered_as_none():
+    reservation = {"reservation_id": "r1", "status": "cancelled", "created_at": "2024-01-01T00:00:00"}
+    result = _to_result([reservation]).reservations[0]
+
+    assert result.reservation_details == "Unknown experience"
+    assert result.reservation_other == "reservation_id=r1, created_at=2024-01-01T00:00:00"
+    assert "None" not in result.model_dump_json()
+
+
+def test_direct_articles_fetcher_uses_the_tags_then_the_search(synthetic_databases):
+    agent = ArticlesFetcherAgent(FakeChatModel(latency=0), direct=True, search_k=3)
+    articles = agent(_state(synthetic_databases, tags=["reservation"])).update["relevant_articles"]
+
+    assert len(articles) == 2
+    for article in articles:
+        assert article["article_id"].startswith(f"{synthetic_databases.account_ids[0]}-article-")
+        assert article["title"].startswith("Reservation help #")
+        assert article["tags"] == "reservation, events"
+
+    # Without a matching tag, the full-text search fills in (up to search_k), and the re-ranker keeps the best one
+    articles = agent(_state(synthetic_databases, tags=["unknown"])).update["relevant_articles"]
+    assert len(articles) == 3
+    agent = ArticlesFetcherAgent(_rerank_llm(2, 1), direct=True, rerank=True, search_k=3)
+    reranked = agent(_state(synthetic_databases, tags=["unknown"])).update["relevant_articles"]
+    assert reranked == [articles[2]]
+
+
+def test_reranker_drops_unknown_and_repeated_indices():
+    items = [_Article(article_id=f"a{idx}", title=f"Article {idx}", content="...", tags="") for idx in range(4)]
+    reranker = Reranker(FakeChatModel(latency=0))
+
+    selected = reranker._select(items, RerankResult(relevant_indices=[2, 7, 0, 2, -1, 3]), None)
+    assert selected == [items[2], items[0], items[3]]
+    assert reranker._select(items, RerankResult(relevant_indices=[2, 7, 0, 2, 3]), 2) == [items[2], items[0]]
+    assert reranker._select(items, RerankResult(relevant_indices=[]), 2) == []
+    assert Reranker(_rerank_llm(3, 1))("ticket", items, top_k=1) == [items[3]]
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+import data.models.udahub as udahub
+import agentic.tools.tools as tools
+from utils import get_session
+
+
+def test_fetch_tickets_pages_through_the_history(monkeypatch):
+    engine = create_engine("sqlite://")
+    udahub.Base.metadata.create_all(engine)
+    monkeypatch.setattr(tools, "UDAHUB_ENGINE", engine)
+
+    start = datetime(2024, 1, 1)
+    with get_session(engine) as session:
+        session.add(udahub.Account(account_id="cultpass", account_name="CultPass Card"))
+        session.add(udahub.User(user_id="u1", account_id="cultpass", external_user_id="e1", user_name="Ana"))
+        for t in range(5):
+            # Tickets 3 and 4 share their creation time, the ticket_id breaks the tie
+            session.add(udahub.Ticket(ticket_id=f"t{t}", account_id="cultpass", user_id="u1", channel="email",
+                                      created_at=start + timedelta(days=min(t, 3))))
+            session.add_all([
+                udahub.TicketMessage(message_id=f"t{t}-m{m}", ticket_id=f"t{t}", role=udahub.RoleEnum.user,
+                                     content=f"message {m}", created_at=start + timedelta(days=t, minutes=m))
+                for m in range(4)
+            ])
+
+    def fetch(**kwargs):
+        return tools.fetch_tickets.func("u1", **kwargs)
+
+    pages, before = [], None
+    while page := fetch(limit=2, before=before, max_messages_per_ticket=2):
+        pages.append([ticket["cursor"] for ticket in page])
+        before = page[-1]["cursor"]
+    assert pages == [["t4", "t3"], ["t2", "t1"], ["t0"]]
+
+    first = fetch(limit=1, max_messages_per_ticket=2)[0]
+    assert [message["content"] for message in first["messages"]] == ["message 2", "message 3"]
+    assert fetch(limit=1, max_messages_per_ticket=0)[0]["messages"] == []
+    assert len(fetch(limit=1, max_messages_per_ticket=None)[0]["messages"]) == 4
@@ -0,0 +1,105 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END, StateGraph
+from sqlalchemy import create_engine, text
+from typing_extensions import TypedDict
+
+from agentic.instrumentation import Instrumentation, NodeStats, _NodeCallbackHandler, record_cache_lookup
+
+
+class _State(TypedDict, total=False):
+    ticket_text: str
+    answer: str
+    count: int
+
+
+def _workflow(instrumentation: Instrumentation) -> StateGraph:
+    engine = create_engine("sqlite://")
+    llm = GenericFakeChatModel(messages=iter(
+        AIMessage(content="Try again", usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15})
+        for _ in range(10)
+    ))
+
+    def count(state):
+        record_cache_lookup(False)
+        with engine.connect() as connection:
+            first, second = (connection.execute(text("SELECT 1")).scalar() for _ in range(2))
+            return {"count": first + second}
+
+    def answer(state):
+        record_cache_lookup(True)
+        return {"answer": llm.invoke(state["ticket_text"]).content}
+
+    async def aanswer(state):
+        record_cache_lookup(True)
+        return {"answer": (await llm.ainvoke(state["ticket_text"])).content}
+
+    workflow = StateGraph(_State)
+    workflow.add_node("count", instrumentation.wrap("count", count))
+    workflow.add_node(
+        "answer",
+        RunnableLambda(instrumentation.wrap("answer", answer), afunc=instrumentation.awrap("answer", aanswer)),
+    )
+    workflow.set_entry_point("count")
+    workflow.add_edge("count", "answer")
+    workflow.add_edge("answer", END)
+    return workflow
+
+
+def test_instrumentation_attributes_llm_sql_and_cache_to_nodes():
+    runs = []
+    instrumentation = Instrumentation(on_node=runs.append)
+    graph = _workflow(instrumentation).compile()
+    graph.invoke({"ticket_text": "I can't log in"})
+    asyncio.run(graph.ainvoke({"ticket_text": "I can't log in"}))
+
+    registry = instrumentation.registry
+    assert registry.value("agentic_node_runs_total", node="answer", status="ok") == 2
+    assert registry.value("agentic_node_seconds", node="count") == 2
+    assert registry.value("agentic_llm_calls_total", node="answer") == 2
+    assert registry.value("agentic_llm_tokens_total", node="answer", type="prompt") == 24
+    assert registry.value("agentic_llm_calls_total", node="count") == 0
+    assert registry.value("agentic_sql_queries_total", node="count") == 4
+    assert registry.value("agentic_sql_queries_total", node="answer") == 0
+    assert registry.value("agentic_cache_lookups_total", node="answer", result="hit") == 2
+    assert registry.value("agentic_cache_lookups_total", node="count", result="miss") == 2
+    assert [stats.node for stats in runs] == ["count", "answer", "count", "answer"]
+
+    text_format = registry.to_prometheus()
+    assert "# TYPE agentic_node_seconds histogram" in text_format
+    assert 'agentic_node_seconds_bucket{node="answer",le="+Inf"} 2' in text_format
+    assert 'agentic_sql_queries_total{node="count"} 4' in text_format
+
+
+def test_failed_node_runs_are_counted_and_outside_runs_ignored():
+    instrumentation = Instrumentation()
+
+    def fail(state):
+        raise RuntimeError("boom")
+
+    try:
+        instrumentation.wrap("fail", fail)({})
+    except RuntimeError:
+        pass
+    record_cache_lookup(True)
+    assert instrumentation.registry.value("agentic_node_runs_total", node="fail", status="error") == 1
+    assert instrumentation.registry.value("agentic_cache_lookups_total", node="fail", result="hit") == 0
+
+
+def test_cost_uses_the_longest_matching_model_prefix():
+    stats = NodeStats("resolution_agent")
+    handler = _NodeCallbackHandler(stats, {"gpt-4o": (2.5, 10.0), "gpt-4o-mini": (0.15, 0.6)})
+    handler.on_llm_end(
+        LLMResult(
+            generations=[[ChatGeneration(message=AIMessage(content="ok"))]],
+            llm_output={"model_name": "gpt-4o-mini-2024-07-18",
+                        "token_usage": {"prompt_tokens": 1_000_000, "completion_tokens": 1_000_000}},
+        ),
+        run_id=None,
+    )
+    assert stats.prompt_tokens == 1_000_000
+    assert round(stats.cost_usd, 2) == 0.75
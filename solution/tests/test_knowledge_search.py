@@ -0,0 +1,40 @@
+from sqlalchemy import create_engine
+
+import data.models.udahub as udahub
+import agentic.tools.tools as tools
+from utils import get_session
+
+
+def test_search_articles_follows_the_knowledge_table(monkeypatch):
+    engine = create_engine("sqlite://")
+    udahub.Base.metadata.create_all(engine)
+    monkeypatch.setattr(tools, "UDAHUB_ENGINE", engine)
+
+    with get_session(engine) as session:
+        session.add_all([
+            udahub.Account(account_id="cultpass", account_name="CultPass Card"),
+            udahub.Account(account_id="other", account_name="Other"),
+        ])
+        session.add_all([
+            udahub.Knowledge(article_id="a1", account_id="cultpass", title="Password reset",
+                             content="Tap 'Forgot Password' on the login screen.", tags="login, password"),
+            udahub.Knowledge(article_id="a2", account_id="cultpass", title="Reserving events",
+                             content="Open the app and tap 'Reserve'.", tags="events, reservation"),
+            udahub.Knowledge(article_id="a3", account_id="other", title="Password policy",
+                             content="Passwords expire every 90 days.", tags="password"),
+        ])
+
+    def titles(query):
+        return [article["title"] for article in tools.search_articles.func("cultpass", query)]
+
+    # Ranked matches for the account only, and free text is never parsed as FTS5 syntax
+    assert titles("I forgot my password, can't login!") == ["Password reset"]
+    assert titles('"unbalanced NEAR( quotes*') == []
+    assert titles("?!") == []
+
+    # The triggers keep the index in sync with updates and deletes
+    with get_session(engine) as session:
+        session.get(udahub.Knowledge, "a2").content = "Lost your password? Ask support."
+        session.delete(session.get(udahub.Knowledge, "a1"))
+
+    assert titles("password") == ["Reserving events"]
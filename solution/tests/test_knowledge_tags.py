@@ -0,0 +1,38 @@
+from sqlalchemy import create_engine, select
+
+import data.models.udahub as udahub
+from agentic.tools.tools import _articles_query
+from utils import get_session
+
+
+def _tags(session):
+    return sorted(session.execute(select(udahub.KnowledgeTag.article_id, udahub.KnowledgeTag.tag)).all())
+
+
+def test_knowledge_tags_follow_the_articles():
+    engine = create_engine("sqlite://")
+    udahub.Base.metadata.create_all(engine)
+
+    with get_session(engine) as session:
+        session.add(udahub.Account(account_id="cultpass", account_name="CultPass Card"))
+        session.add_all([
+            udahub.Knowledge(article_id="a1", account_id="cultpass", title="Events", content="...", tags="Events, reservation"),
+            udahub.Knowledge(article_id="a2", account_id="cultpass", title="Event tips", content="...", tags="event,tips, tips"),
+        ])
+
+    with get_session(engine) as session:
+        assert _tags(session) == [("a1", "events"), ("a1", "reservation"), ("a2", "event"), ("a2", "tips")]
+
+        # Exact matches only: "event" no longer matches the "events" article
+        assert [article.article_id for article in session.execute(_articles_query("cultpass", ["event"]))] == ["a2"]
+        # Articles sharing more tags come first
+        assert [
+            article.article_id for article in session.execute(_articles_query("cultpass", ["tips", "Event", "reservation"]))
+        ] == ["a2", "a1"]
+
+        session.get(udahub.Knowledge, "a1").tags = "reservation, booking"
+        session.delete(session.get(udahub.Knowledge, "a2"))
+
+    with get_session(engine) as session:
+        assert _tags(session) == [("a1", "booking"), ("a1", "reservation")]
+        assert session.execute(_articles_query("cultpass", ["events"])).all() == []
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from agentic.agents import OrchestratorAgent
+from agentic.agents.memory_queue import MemoryBatchWorker, MemoryQueue
+from benchmarks.fake_llm import FakeChatModel
+
+
+def _ticket(user_id, text):
+    return {"user_id": user_id, "ticket_text": text, "resolution_text": "Done", "escalation_reason": None}
+
+
+class _FailingLLM:
+    def with_structured_output(self, schema):
+        def fail(_input):
+            raise RuntimeError("rate limited")
+        return RunnableLambda(fail)
+
+
+def test_worker_drains_the_queue_in_batches(tmp_path):
+    queue = MemoryQueue(tmp_path / "queue")
+    for idx in range(5):
+        queue.put(_ticket(f"user-{idx % 2}", f"Ticket {idx}, please keep answers short"))
+
+    llm = FakeChatModel(latency=0.0, structured_responses={"MemoryUpdateBatch": {"updates": [
+        {"ticket_index": 1, "should_update_preference": True, "new_preference": "second", "resolution_summary": None,
+         "recurring_issue": None},
+        {"ticket_index": 0, "should_update_preference": True, "new_preference": "first", "resolution_summary": None,
+         "recurring_issue": None},
+        {"ticket_index": 7, "should_update_preference": True, "new_preference": "unknown", "resolution_summary": None,
+         "recurring_issue": None},
+    ]}})
+    prompts = []
+    llm_calls = RunnableLambda(lambda prompt: prompts.append(prompt) or prompt)
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path / "cache")
+    worker = MemoryBatchWorker(llm, queue, orchestrator.remember, batch_size=2)
+    worker.prompt = worker.prompt | llm_calls
+
+    assert worker.drain() == 5
+    assert len(prompts) == 3
+    assert len(queue) == 0
+    # Tickets 4 (user-0) and 3 (user-1) came last, both answered by the fake's fixed updates
+    assert orchestrator.cache.get("user-0") == "first"
+    assert orchestrator.cache.get("user-1") == "second"
+
+
+def test_failed_batches_go_back_to_the_front_of_the_queue(tmp_path):
+    queue = MemoryQueue(tmp_path / "queue")
+    for idx in range(3):
+        queue.put(_ticket("user-1", f"Ticket {idx}"))
+
+    worker = MemoryBatchWorker(_FailingLLM(), queue, lambda user_id, update: None, batch_size=2)
+    with pytest.raises(RuntimeError):
+        asyncio.run(worker.arun_batch())
+    assert [item["ticket_text"] for item in queue.take(3)] == ["Ticket 0", "Ticket 1", "Ticket 2"]
+
+
+
+class _ScriptedLLM:
+    """Runs `call(count)` on each (async) structured call, `count` being the number of calls so far."""
+    def __init__(self, call):
+        self.call = call
+        self.calls = 0
+
+    def with_structured_output(self, schema):
+        async def invoke(_input):
+            self.calls += 1
+            return await self.call(self.calls)
+        return RunnableLambda(lambda _input: None, afunc=invoke)
+
+
+def test_serve_logs_failed_batches_and_keeps_going(tmp_path, caplog):
+    queue = MemoryQueue(tmp_path / "queue")
+    queue.put(_ticket("user-1", "Ticket 0"))
+
+    async def serve_until_the_second_failure():
+        retried = asyncio.Event()
+
+        async def fail(count):
+            if count == 2:
+                retried.set()
+            raise RuntimeError("rate limited")
+
+        worker = MemoryBatchWorker(_ScriptedLLM(fail), queue, lambda user_id, update: None)
+        task = asyncio.create_task(worker.serve(interval=0))
+        await retried.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with caplog.at_level("ERROR", logger="agentic.agents.memory_queue"):
+        asyncio.run(serve_until_the_second_failure())
+    failures = [record for record in caplog.records if record.getMessage() == "Memory batch failed"]
+    assert len(failures) >= 1
+    assert failures[0].exc_info[0] is RuntimeError
+    assert len(queue) == 1
+
+
+def test_cancelled_batches_go_back_to_the_queue(tmp_path):
+    queue = MemoryQueue(tmp_path / "queue")
+    queue.put(_ticket("user-1", "Ticket 0"))
+
+    async def cancel_mid_call():
+        started = asyncio.Event()
+
+        async def hang(count):
+            started.set()
+            await asyncio.Event().wait()
+
+        worker = MemoryBatchWorker(_ScriptedLLM(hang), queue, lambda user_id, update: None)
+        task = asyncio.create_task(worker.serve())
+        await started.wait()
+        assert len(queue) == 0
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_mid_call())
+    assert [item["ticket_text"] for item in queue.take(10)] == ["Ticket 0"]
@@ -0,0 +1,57 @@
+from sqlalchemy import create_engine, text
+
+import data.models.udahub as udahub
+import data.models.cultpass as cultpass
+from agentic.tools.tools import _tickets_query
+from data.migrations import upgrade_cultpass, upgrade_udahub
+
+
+def _index_names(engine) -> set[str]:
+    with engine.connect() as connection:
+        return set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+
+
+def _declared_indexes(metadata) -> set[str]:
+    return {index.name for table in metadata.sorted_tables for index in table.indexes}
+
+
+def test_upgrade_adds_the_indexes_and_is_idempotent(tmp_path):
+    udahub_engine = create_engine(f"sqlite:///{tmp_path / 'udahub.db'}")
+    cultpass_engine = create_engine(f"sqlite:///{tmp_path / 'cultpass.db'}")
+
+    # Files as the notebooks created them before the indexes, the tag index and the full-text index were declared
+    udahub.Base.metadata.create_all(udahub_engine)
+    cultpass.Base.metadata.create_all(cultpass_engine)
+    for engine, metadata in ((udahub_engine, udahub.Base.metadata), (cultpass_engine, cultpass.Base.metadata)):
+        with engine.begin() as connection:
+            for name in _declared_indexes(metadata):
+                connection.execute(text(f"DROP INDEX {name}"))
+    with udahub_engine.begin() as connection:
+        connection.execute(text("DROP TABLE knowledge_tags"))
+        for trigger in ("knowledge_fts_insert", "knowledge_fts_delete", "knowledge_fts_update"):
+            connection.execute(text(f"DROP TRIGGER {trigger}"))
+        connection.execute(text("DROP TABLE knowledge_fts"))
+        connection.execute(text("INSERT INTO accounts (account_id, account_name) VALUES ('cultpass', 'CultPass')"))
+        connection.execute(text(
+            "INSERT INTO knowledge (article_id, account_id, title, content, tags) "
+            "VALUES ('a1', 'cultpass', 'Refunds', 'How to get a refund', 'billing, Refund')"
+        ))
+    assert not _index_names(udahub_engine) & _declared_indexes(udahub.Base.metadata)
+
+    for _ in range(2):
+        upgrade_udahub(udahub_engine)
+        upgrade_cultpass(cultpass_engine)
+
+        assert _declared_indexes(udahub.Base.metadata) <= _index_names(udahub_engine)
+        assert _declared_indexes(cultpass.Base.metadata) <= _index_names(cultpass_engine)
+        with udahub_engine.connect() as connection:
+            tags = connection.execute(text("SELECT tag FROM knowledge_tags ORDER BY tag")).scalars().all()
+            assert tags == ["billing", "refund"]
+            matches = connection.execute(text("SELECT rowid FROM knowledge_fts WHERE knowledge_fts MATCH 'refund'"))
+            assert len(matches.all()) == 1
+
+    # The ticket history is read through the (user_id, created_at) index rather than a scan of the tickets
+    query = _tickets_query("u1", limit=10).compile(udahub_engine, compile_kwargs={"literal_binds": True})
+    with udahub_engine.connect() as connection:
+        plan = " ".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {query}")))
+    assert "ix_tickets_user_created" in plan
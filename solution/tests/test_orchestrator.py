@@ -0,0 +1,300 @@
+import uuid
+
+import pytest
+from langgraph.graph import StateGraph, END
+from langgraph.types import Command
+from langgraph.checkpoint.memory import MemorySaver
+
+from agentic.agents import OrchestratorAgent
+from agentic.agents.memory_queue import MemoryQueue
+from agentic.agents.states import AgentState
+from agentic.agents.agent_names import (
+    ORCHESTRATOR_AGENT_NAME,
+    TICKET_CLASSIFIER_AGENT_NAME,
+    TICKET_FETCHER_AGENT_NAME,
+    RESERVATION_FETCHER_AGENT_NAME,
+    ARTICLE_FETCHER_AGENT_NAME,
+    SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME,
+    RESOLUTION_AGENT_NAME,
+    ESCALATION_AGENT_NAME,
+    MEMORY_UPDATER_AGENT_NAME,
+    FAST_RESOLUTION_AGENT_NAME,
+)
+
+
+def _fake_agent(name, **update):
+    """A stand-in for an LLM-backed agent: records its visit and returns a fixed update."""
+    def agent(state: AgentState):
+        return Command(
+            goto=ORCHESTRATOR_AGENT_NAME,
+            update={**update, "messages": [("ai", name)]},
+        )
+    return agent
+
+
+def _build_graph(orchestrator, nodes=None, **overrides):
+    updates = {
+        TICKET_CLASSIFIER_AGENT_NAME: dict(
+            is_ticket_classified_score=90.0,
+            needs_info_about_previous_user_tickets_score=10.0,
+            needs_info_about_reservations_score=90.0,
+            tags=["reservation"],
+        ),
+        TICKET_FETCHER_AGENT_NAME: dict(previous_tickets=[{"content": "old ticket"}]),
+        RESERVATION_FETCHER_AGENT_NAME: dict(reservations=[{"content": "concert"}]),
+        ARTICLE_FETCHER_AGENT_NAME: dict(relevant_articles=[{"title": "How to reserve"}]),
+        SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME: dict(speculative_articles=[{"title": "How to reserve"}]),
+        RESOLUTION_AGENT_NAME: dict(resolution_text="Here you go", is_resolved_score=95.0),
+        ESCALATION_AGENT_NAME: dict(escalation_reason="Unclear", urgency_level="low"),
+        MEMORY_UPDATER_AGENT_NAME: dict(should_update_preference=True, new_preference="Prefers short emails"),
+        FAST_RESOLUTION_AGENT_NAME: dict(
+            is_ticket_classified_score=95.0,
+            needs_info_about_previous_user_tickets_score=10.0,
+            needs_info_about_reservations_score=10.0,
+            tags=["reservation"],
+            relevant_articles=[{"title": "How to reserve"}],
+            resolution_text="Fast answer",
+            is_resolved_score=95.0,
+            should_update_preference=True,
+            new_preference="Prefers fast answers",
+        ),
+    }
+    workflow = StateGraph(AgentState)
+    workflow.add_node(ORCHESTRATOR_AGENT_NAME, orchestrator)
+    workflow.set_entry_point(ORCHESTRATOR_AGENT_NAME)
+    for name, update in updates.items():
+        workflow.add_node(name, (nodes or {}).get(name) or _fake_agent(name, **{**update, **overrides.get(name, {})}))
+    return workflow.compile(checkpointer=MemorySaver())
+
+
+def _visited(result):
+    return [message.content for message in result["messages"]]
+
+
+def _ticket(user_id):
+    return {
+        "ticket_text": "What was my last reservation?",
+        "ticket_metadata": {"channel": "email"},
+        "account_id": "cultpass",
+        "user_id": user_id,
+    }
+
+
+def test_orchestrator_routes_through_the_plan(tmp_path):
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path)
+    graph = _build_graph(orchestrator)
+
+    result = graph.invoke(_ticket("user-1"), {"configurable": {"thread_id": "user-1"}})
+
+    assert _visited(result) == [
+        TICKET_CLASSIFIER_AGENT_NAME,
+        RESERVATION_FETCHER_AGENT_NAME,
+        ARTICLE_FETCHER_AGENT_NAME,
+        RESOLUTION_AGENT_NAME,
+        MEMORY_UPDATER_AGENT_NAME,
+    ]
+    assert result["agent_list"] == []
+    assert result["most_recent_agent"] == END
+    assert orchestrator.cache.get("user-1") == "Prefers short emails"
+
+
+def test_orchestrator_escalates_low_scored_resolutions(tmp_path):
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path)
+    graph = _build_graph(orchestrator, **{RESOLUTION_AGENT_NAME: dict(is_resolved_score=10.0)})
+
+    result = graph.invoke(_ticket("user-1"), {"configurable": {"thread_id": "user-1"}})
+
+    visited = _visited(result)
+    assert visited.index(RESOLUTION_AGENT_NAME) < visited.index(ESCALATION_AGENT_NAME) < visited.index(MEMORY_UPDATER_AGENT_NAME)
+
+
+def test_orchestrator_keeps_no_state_between_invocations(tmp_path):
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path)
+    graph = _build_graph(orchestrator)
+
+    # A second ticket on the same thread starts from a fresh plan, and picks up the stored preference
+    config = {"configurable": {"thread_id": "user-1"}}
+    graph.invoke(_ticket("user-1"), config)
+    result = graph.invoke(_ticket("user-1"), config)
+    assert result["user_preference"] == "Prefers short emails"
+    assert _visited(result).count(TICKET_CLASSIFIER_AGENT_NAME) == 2
+
+    # Many tickets can share one compiled graph concurrently
+    user_ids = [f"user-{idx}" for idx in range(20)]
+    results = graph.batch(
+        [_ticket(user_id) for user_id in user_ids],
+        [{"configurable": {"thread_id": user_id}} for user_id in user_ids],
+        max_concurrency=8,
+    )
+    for user_id, result in zip(user_ids, results):
+        assert result["user_id"] == user_id
+        assert result["most_recent_agent"] == END
+        assert RESOLUTION_AGENT_NAME in _visited(result)
+
+
+def test_orchestrator_fans_out_fetchers_in_one_superstep(tmp_path):
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path, parallel_fetchers=True)
+    graph = _build_graph(orchestrator, **{
+        TICKET_CLASSIFIER_AGENT_NAME: dict(needs_info_about_previous_user_tickets_score=90.0),
+    })
+
+    steps = {}
+    for event in graph.stream(_ticket("user-1"), {"configurable": {"thread_id": "user-1"}}, stream_mode="debug"):
+        if event["type"] == "task":
+            steps.setdefault(event["step"], []).append(event["payload"]["name"])
+
+    fetchers = {TICKET_FETCHER_AGENT_NAME, RESERVATION_FETCHER_AGENT_NAME, ARTICLE_FETCHER_AGENT_NAME}
+    assert fetchers in [set(names) for names in steps.values()]
+
+    # Every fetcher's result ends up in the state, and a rerun on the thread starts from empty lists again
+    state = graph.get_state({"configurable": {"thread_id": "user-1"}}).values
+    assert state["previous_tickets"] == [{"content": "old ticket"}]
+    assert state["reservations"] == [{"content": "concert"}]
+    assert state["relevant_articles"] == [{"title": "How to reserve"}]
+
+    state = graph.invoke(_ticket("user-1"), {"configurable": {"thread_id": "user-1"}})
+    assert state["relevant_articles"] == [{"title": "How to reserve"}]
+
+
+def test_orchestrator_speculates_articles_alongside_the_classifier(tmp_path):
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path, speculative_articles=True)
+    graph = _build_graph(orchestrator)
+
+    steps = {}
+    for event in graph.stream(_ticket("user-1"), {"configurable": {"thread_id": "user-1"}}, stream_mode="debug"):
+        if event["type"] == "task":
+            steps.setdefault(event["step"], []).append(event["payload"]["name"])
+
+    assert {TICKET_CLASSIFIER_AGENT_NAME, SPECULATIVE_ARTICLE_FETCHER_AGENT_NAME} in [set(names) for names in steps.values()]
+    # The articles fetcher still runs once the tags are in, to narrow the candidates down
+    result = graph.get_state({"configurable": {"thread_id": "user-1"}}).values
+    assert _visited(result)[2:] == [
+        RESERVATION_FETCHER_AGENT_NAME,
+        ARTICLE_FETCHER_AGENT_NAME,
+        RESOLUTION_AGENT_NAME,
+        MEMORY_UPDATER_AGENT_NAME,
+    ]
+
+
+def test_orchestrator_short_circuits_off_topic_tickets(tmp_path):
+    off_topic = {TICKET_CLASSIFIER_AGENT_NAME: dict(is_ticket_classified_score=5.0, tags=[])}
+
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path, off_topic_threshold=30.0)
+    result = _build_graph(orchestrator, **off_topic).invoke(_ticket("user-1"), {"configurable": {"thread_id": "user-1"}})
+    assert _visited(result) == [TICKET_CLASSIFIER_AGENT_NAME]
+    assert result["resolution_text"] == orchestrator.off_topic_response
+    assert result["most_recent_agent"] == END
+
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path, off_topic_threshold=30.0, off_topic_action="escalate")
+    result = _build_graph(orchestrator, **off_topic).invoke(_ticket("user-2"), {"configurable": {"thread_id": "user-2"}})
+    assert _visited(result) == [TICKET_CLASSIFIER_AGENT_NAME, ESCALATION_AGENT_NAME]
+    assert result["escalation_reason"] == "Unclear"
+
+    # Tickets classified with confidence follow the usual plan
+    result = _build_graph(orchestrator).invoke(_ticket("user-3"), {"configurable": {"thread_id": "user-3"}})
+    assert RESOLUTION_AGENT_NAME in _visited(result)
+
+
+def test_orchestrator_takes_the_fast_path_when_confident(tmp_path):
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path, fast_path_threshold=80.0)
+    result = _build_graph(orchestrator).invoke(_ticket("user-1"), {"configurable": {"thread_id": "user-1"}})
+    assert _visited(result) == [FAST_RESOLUTION_AGENT_NAME]
+    assert result["resolution_text"] == "Fast answer"
+    assert result["relevant_articles"] == [{"title": "How to reserve"}]
+    assert orchestrator.cache.get("user-1") == "Prefers fast answers"
+
+    # A weak resolution falls back to the full path, reusing the fast path's classification
+    graph = _build_graph(orchestrator, **{
+        FAST_RESOLUTION_AGENT_NAME: dict(
+            is_resolved_score=40.0,
+            needs_info_about_reservations_score=90.0,
+            relevant_articles=[{"title": "bm25 candidate"}],
+        ),
+    })
+    result = graph.invoke(_ticket("user-2"), {"configurable": {"thread_id": "user-2"}})
+    assert _visited(result) == [
+        FAST_RESOLUTION_AGENT_NAME,
+        RESERVATION_FETCHER_AGENT_NAME,
+        ARTICLE_FETCHER_AGENT_NAME,
+        RESOLUTION_AGENT_NAME,
+        MEMORY_UPDATER_AGENT_NAME,
+    ]
+    assert result["resolution_text"] == "Here you go"
+    # Only what the articles fetcher found reaches the resolver, not the fast path's candidates
+    assert result["relevant_articles"] == [{"title": "How to reserve"}]
+
+    # And an unclear classification is redone by the classifier
+    graph = _build_graph(orchestrator, **{FAST_RESOLUTION_AGENT_NAME: dict(is_ticket_classified_score=20.0)})
+    result = graph.invoke(_ticket("user-3"), {"configurable": {"thread_id": "user-3"}})
+    assert _visited(result)[:2] == [FAST_RESOLUTION_AGENT_NAME, TICKET_CLASSIFIER_AGENT_NAME]
+
+
+def test_orchestrator_defers_the_memory_update_to_the_queue(tmp_path):
+    queue = MemoryQueue(tmp_path / "memory_queue")
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path / "cache", memory_queue=queue)
+    graph = _build_graph(orchestrator, **{RESOLUTION_AGENT_NAME: dict(is_resolved_score=10.0)})
+
+    result = graph.invoke(_ticket("user-1"), {"configurable": {"thread_id": "user-1"}})
+    assert _visited(result)[-2:] == [RESOLUTION_AGENT_NAME, ESCALATION_AGENT_NAME]
+    assert result["most_recent_agent"] == END
+    assert queue.take(10) == [{
+        "user_id": "user-1",
+        "ticket_text": "What was my last reservation?",
+        "resolution_text": "Here you go",
+        "escalation_reason": "Unclear",
+    }]
+
+
+def test_orchestrator_starts_over_after_a_failed_run(tmp_path):
+    failures = []
+
+    def flaky_resolver(state: AgentState):
+        if not failures:
+            failures.append(state["ticket_text"])
+            raise RuntimeError("rate limited")
+        return _fake_agent(RESOLUTION_AGENT_NAME, resolution_text="Here you go", is_resolved_score=95.0)(state)
+
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path)
+    graph = _build_graph(orchestrator, nodes={RESOLUTION_AGENT_NAME: flaky_resolver})
+    config = {"configurable": {"thread_id": "user-1"}}
+    with pytest.raises(RuntimeError):
+        graph.invoke(_ticket("user-1"), config)
+    assert graph.get_state(config).values["most_recent_agent"] == RESOLUTION_AGENT_NAME
+
+    # The failed run's plan is left behind in the checkpoint, the next ticket on the thread drops it
+    result = graph.invoke({**_ticket("user-1"), "ticket_text": "And my next one?"}, config)
+    assert _visited(result)[-5:] == [
+        TICKET_CLASSIFIER_AGENT_NAME,
+        RESERVATION_FETCHER_AGENT_NAME,
+        ARTICLE_FETCHER_AGENT_NAME,
+        RESOLUTION_AGENT_NAME,
+        MEMORY_UPDATER_AGENT_NAME,
+    ]
+    assert result["resolution_text"] == "Here you go"
+
+    # A retry of the very same ticket starts over too, when the caller passes a run id of its own
+    failures.clear()
+    with pytest.raises(RuntimeError):
+        graph.invoke(_ticket("user-1"), {"run_id": uuid.uuid4(), **config})
+    result = graph.invoke(_ticket("user-1"), {"run_id": uuid.uuid4(), **config})
+    assert _visited(result)[-5] == TICKET_CLASSIFIER_AGENT_NAME
+    assert result["most_recent_agent"] == END
+
+
+def test_orchestrator_resets_the_ticket_state_between_tickets(tmp_path):
+    def resolver(state: AgentState):
+        score = 10.0 if state["ticket_text"] == "escalate me" else 95.0
+        return _fake_agent(RESOLUTION_AGENT_NAME, resolution_text="Here you go", is_resolved_score=score)(state)
+
+    queue = MemoryQueue(tmp_path / "memory_queue")
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path / "cache", memory_queue=queue)
+    graph = _build_graph(orchestrator, nodes={RESOLUTION_AGENT_NAME: resolver})
+    config = {"configurable": {"thread_id": "user-1"}}
+
+    result = graph.invoke({**_ticket("user-1"), "ticket_text": "escalate me"}, config)
+    assert result["escalation_reason"] == "Unclear"
+    result = graph.invoke(_ticket("user-1"), config)
+
+    assert _visited(result)[-1] == RESOLUTION_AGENT_NAME
+    assert result["escalation_reason"] is None and result["urgency_level"] is None
+    assert [item["escalation_reason"] for item in queue.take(10)] == ["Unclear", None]
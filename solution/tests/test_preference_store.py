@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from agentic.agents import OrchestratorAgent
+from agentic.agents.preference_store import (
+    DiskCachePreferenceStore,
+    MemoryItem,
+    PreferenceStore,
+    SQLitePreferenceStore,
+    render_memory,
+)
+from agentic.agents.states import MemoryUpdate
+
+
+@pytest.fixture(params=["diskcache", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "diskcache":
+            return DiskCachePreferenceStore(tmp_path / "memory", **kwargs)
+        return SQLitePreferenceStore(tmp_path / "memory.db", **kwargs)
+    return make
+
+
+def _item(kind, text, age=0.0):
+    return MemoryItem(kind=kind, text=text, updated_at=time.time() - age)
+
+
+def test_items_are_deduplicated_and_capped_per_kind(make_store):
+    store = make_store(max_items_per_kind=2)
+    store.add("user-1", [_item("preference", "Prefers short emails", age=30)])
+    store.add("user-1", [_item("preference", "prefers short emails!", age=20), _item("recurring_issue", "Login fails")])
+    store.add("user-1", [_item("preference", "Writes in Portuguese", age=10), _item("preference", "Likes jazz")])
+
+    items = store.get("user-1")
+    assert [item.text for item in items if item.kind == "preference"] == ["Likes jazz", "Writes in Portuguese"]
+    assert render_memory(items) == "Preferences: Likes jazz; Writes in Portuguese\nRecurring issues: Login fails"
+
+    # A known item is refreshed rather than duplicated
+    store.add("user-1", [_item("preference", "Writes in portuguese.")])
+    assert [item.text for item in store.get("user-1") if item.kind == "preference"] == ["Writes in portuguese.", "Likes jazz"]
+
+
+def test_items_expire_and_users_are_prefetched_in_bulk(make_store):
+    store = make_store(ttl_seconds=60)
+    store.add("user-1", [_item("preference", "Old news", age=120), _item("resolution_summary", "Refunded a ticket")])
+    store.add("user-2", [_item("preference", "Prefers phone calls")])
+
+    prefetched = store.get_many(["user-1", "user-2", "user-3"])
+    assert [item.text for item in prefetched["user-1"]] == ["Refunded a ticket"]
+    assert [item.text for item in prefetched["user-2"]] == ["Prefers phone calls"]
+    assert prefetched["user-3"] == []
+
+
+def test_stores_must_provide_their_storage():
+    class ReadOnlyStore(PreferenceStore):
+        def _read_many(self, user_ids):
+            return {}
+
+    with pytest.raises(TypeError, match="_write"):
+        ReadOnlyStore()
+
+
+def test_orchestrator_remembers_typed_items(tmp_path, make_store):
+    orchestrator = OrchestratorAgent(cache_directory=tmp_path / "cache", preference_store=make_store())
+    orchestrator.remember("user-1", MemoryUpdate(
+        new_preference="Prefers short emails",
+        resolution_summary="Reset the user's password",
+        recurring_issue=None,
+        should_update_preference=True,
+    ))
+    assert orchestrator.recall("user-1") == (
+        "Preferences: Prefers short emails\nPreviously resolved: Reset the user's password"
+    )
+    assert orchestrator.recall("user-2") is None
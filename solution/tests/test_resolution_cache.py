@@ -0,0 +1,39 @@
+from sqlalchemy import create_engine
+
+import data.models.udahub as udahub
+from agentic.agents.resolution_cache import ResolutionCache
+from utils import get_session
+
+
+def _state(**overrides):
+    return {
+        "account_id": "cultpass",
+        "tags": ["refund", "billing"],
+        "user_preference": None,
+        "relevant_articles": [{"article_id": "a1", "title": "Refunds", "content": "...", "tags": "refund"}],
+        **overrides,
+    }
+
+
+def test_resolution_drafts_follow_the_articles(tmp_path):
+    engine = create_engine("sqlite://")
+    udahub.Base.metadata.create_all(engine)
+    with get_session(engine) as session:
+        session.add(udahub.Account(account_id="cultpass", account_name="CultPass Card"))
+        session.add(udahub.Knowledge(article_id="a1", account_id="cultpass", title="Refunds",
+                                     content="Refunds take 5 days.", tags="refund"))
+
+    cache = ResolutionCache(tmp_path, engine=engine)
+    key = cache.key(_state())
+    cache.set(key, {"resolution_text": "Refunds take 5 days.", "is_resolved_score": 90.0})
+
+    assert cache.key(_state(tags=["billing", "refund"])) == key
+    assert cache.key(_state(user_preference="Prefers short emails")) != key
+    assert cache.key(_state(reservations=[{"reservation_id": "r1"}])) is None
+    assert cache.key(_state(relevant_articles=[{"article_id": None, "title": "Refunds"}])) is None
+
+    # Editing the article invalidates the draft straight away
+    with get_session(engine) as session:
+        session.get(udahub.Knowledge, "a1").content = "Refunds take 10 days."
+    assert cache.get(cache.key(_state())) is None
+    assert cache.stats()["uncacheable"] == 2
@@ -0,0 +1,44 @@
+from langgraph.graph import END, StateGraph
+
+from agentic.agents import ResolutionAgent
+from agentic.agents.agent_names import ORCHESTRATOR_AGENT_NAME, RESOLUTION_AGENT_NAME
+from agentic.agents.states import AgentState
+from agentic.graph import as_node
+from benchmarks.fake_llm import FakeChatModel
+
+
+def _graph(stream: bool):
+    llm = FakeChatModel(
+        latency=0.0,
+        text_response="Reset your password from the login page.",
+        structured_responses={"ResolutionResult": {"is_resolved_score": 75.0}, "ResolutionScore": {"is_resolved_score": 90.0}},
+    )
+    workflow = StateGraph(AgentState)
+    workflow.add_node(RESOLUTION_AGENT_NAME, as_node(ResolutionAgent(llm, stream=stream)))
+    workflow.add_node(ORCHESTRATOR_AGENT_NAME, lambda state: {})
+    workflow.set_entry_point(RESOLUTION_AGENT_NAME)
+    workflow.add_edge(ORCHESTRATOR_AGENT_NAME, END)
+    return workflow.compile()
+
+
+TICKET = {"ticket_text": "I can't log in", "ticket_metadata": {}, "tags": ["login"], "user_preference": None}
+
+
+def test_streamed_resolution_forwards_only_the_resolution_tokens():
+    graph = _graph(stream=True)
+    tokens, state = [], {}
+    for mode, chunk in graph.stream(TICKET, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            tokens.append(chunk[0].content)
+        else:
+            state = chunk
+
+    assert "".join(tokens) == "Reset your password from the login page."
+    assert len(tokens) > 1
+    assert state["resolution_text"] == "Reset your password from the login page."
+    assert state["is_resolved_score"] == 90.0
+
+
+def test_structured_resolution_by_default():
+    state = _graph(stream=False).invoke(TICKET)
+    assert (state["resolution_text"], state["is_resolved_score"]) == ("stub", 75.0)
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import threading
+
+from sqlalchemy import create_engine
+
+from agentic.runner import BatchRunner, read_udahub_tickets
+
+
+class FakeGraph:
+    def __init__(self):
+        self.in_flight = self.max_in_flight = 0
+        self.seen = []
+
+    async def ainvoke(self, inputs, config):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self.seen.append(config["configurable"]["thread_id"])
+        if inputs["ticket_text"] == "boom":
+            raise RuntimeError("boom")
+        return {"tags": ["refund"], "resolution_text": f"Re: {inputs['ticket_text']}", "is_resolved_score": 90.0}
+
+
+def _tickets(n):
+    return [
+        {"ticket_id": f"t{i}", "ticket_text": "boom" if i == 3 else f"ticket {i}", "ticket_metadata": {},
+         "account_id": "cultpass", "user_id": f"u{i}"}
+        for i in range(n)
+    ]
+
+
+def test_batch_runner_writes_incrementally_and_resumes(tmp_path):
+    output = tmp_path / "results.jsonl"
+    graph = FakeGraph()
+    summary = BatchRunner(graph, output, concurrency=3).run(_tickets(10))
+
+    assert (summary["processed"], summary["failed"], summary["skipped"]) == (10, 1, 0)
+    assert graph.max_in_flight == 3
+    records = {record["ticket_id"]: record for record in map(json.loads, output.read_text().splitlines())}
+    assert records["t0"]["resolution_text"] == "Re: ticket 0"
+    assert records["t3"] == {**records["t3"], "status": "error", "error": "RuntimeError: boom"}
+
+    # A crash in the middle of a write leaves half a line behind, the next run drops it and carries on
+    with open(output, "a") as f:
+        f.write('{"ticket_id": "t10", "sta')
+    graph = FakeGraph()
+    summary = BatchRunner(graph, output, concurrency=3, retry_failed=True).run(_tickets(12))
+
+    assert sorted(graph.seen) == ["t10", "t11", "t3"]
+    assert summary["skipped"] == 9
+    assert len(output.read_text().splitlines()) == 13
+
+
+def test_rate_limited_account_does_not_hold_up_the_others(tmp_path):
+    output = tmp_path / "results.jsonl"
+    # The limited account's tickets come first: 1 ticket/s, so its third one can't start before ~2s
+    tickets = [
+        {"ticket_id": f"{account_id}-{i}", "ticket_text": f"ticket {i}", "ticket_metadata": {},
+         "account_id": account_id, "user_id": f"u{i}"}
+        for account_id, n in (("limited", 3), ("free", 6))
+        for i in range(n)
+    ]
+    runner = BatchRunner(FakeGraph(), output, concurrency=2, rate_limit={"limited": 1.0}, burst=1)
+    summary = runner.run(tickets)
+
+    assert summary["processed"] == 9
+    assert summary["seconds"] >= 1.9
+    order = [record["ticket_id"] for record in map(json.loads, output.read_text().splitlines())]
+    # Every free ticket is done while the limited account waits for its tokens, without taking a worker
+    assert order[-2:] == ["limited-1", "limited-2"]
+    assert set(order[:-2]) == {"limited-0", *(f"free-{i}" for i in range(6))}
+
+
+def test_udahub_tickets_are_read_page_by_page_off_the_event_loop(synthetic_databases, tmp_path):
+    engine = create_engine(f"sqlite:///{synthetic_databases.udahub_db}")
+    tickets = read_udahub_tickets(engine, page_size=4)
+    first = next(tickets)
+    # No connection (nor read transaction) is held while the consumer works on a page
+    assert engine.pool.checkedout() == 0
+    rest = list(tickets)
+    assert len(rest) + 1 == synthetic_databases.tickets
+    assert len({ticket["ticket_id"] for ticket in [first, *rest]}) == synthetic_databases.tickets
+    assert all(ticket["ticket_text"] and ticket["ticket_metadata"]["channel"] == "email" for ticket in rest)
+    assert {ticket["ticket_metadata"]["status"] for ticket in read_udahub_tickets(engine, status="open")} == {"open"}
+
+    loop_thread = []
+
+    def tickets_read_by(thread_names):
+        for ticket in read_udahub_tickets(engine, page_size=4):
+            thread_names.append(threading.current_thread().name)
+            yield ticket
+
+    class ThreadCheckingGraph(FakeGraph):
+        async def ainvoke(self, inputs, config):
+            loop_thread.append(threading.current_thread().name)
+            return await super().ainvoke(inputs, config)
+
+    readers = []
+    summary = BatchRunner(ThreadCheckingGraph(), tmp_path / "results.jsonl").run(tickets_read_by(readers))
+    assert summary["processed"] == synthetic_databases.tickets
+    assert loop_thread[0] not in readers
+    engine.dispose()
@@ -0,0 +1,81 @@
+import json
+
+import aiosqlite
+import pytest
+from langgraph.graph import END, StateGraph
+from starlette.testclient import TestClient
+from typing_extensions import TypedDict
+
+from agentic.service import create_app
+
+
+class _State(TypedDict, total=False):
+    ticket_text: str
+    account_id: str
+    user_id: str
+    tags: list[str]
+    resolution_text: str
+
+
+def _workflow(compiled: list) -> StateGraph:
+    workflow = StateGraph(_State)
+    workflow.add_node("classify", lambda state: {"tags": ["login"]})
+    workflow.add_node("resolve", lambda state: {"resolution_text": f"Re: {state['ticket_text']}"})
+    workflow.set_entry_point("classify")
+    workflow.add_edge("classify", "resolve")
+    workflow.add_edge("resolve", END)
+
+    compile_ = workflow.compile
+    workflow.compile = lambda **kwargs: compiled.append(1) or compile_(**kwargs)
+    return workflow
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_service_compiles_once_and_streams_node_events():
+    compiled = []
+    ticket = {"ticket_text": "I can't log in", "account_id": "cultpass", "user_id": "u1"}
+    with TestClient(create_app(_workflow(compiled))) as client:
+        for _ in range(3):
+            response = client.post("/tickets", json=ticket)
+            assert response.status_code == 200
+            assert response.json()["resolution_text"] == "Re: I can't log in"
+
+        events = _events(client.post("/tickets/stream", json=ticket).text)
+        assert [name for name, _ in events] == ["node", "node", "result"]
+        assert [data["node"] for _, data in events[:2]] == ["classify", "resolve"]
+        assert events[-1][1]["tags"] == ["login"]
+
+        assert client.post("/tickets", json={"ticket_text": "hi"}).status_code == 400
+    assert compiled == [1]
+
+
+def test_service_only_accepts_ticket_fields_and_isolates_requests():
+    ticket = {"ticket_text": "I can't log in", "account_id": "cultpass", "user_id": "u1"}
+    with TestClient(create_app(_workflow([]))) as client:
+        response = client.post("/tickets", json={**ticket, "agent_list": ["__end__"]})
+        assert response.status_code == 400
+        assert "agent_list" in response.json()["error"]
+        assert client.post("/tickets", json={**ticket, "ticket_metadata": "email"}).status_code == 400
+
+        # Without a thread_id, each request of the same user gets a thread of its own
+        thread_ids = {client.post("/tickets", json=ticket).json()["thread_id"] for _ in range(2)}
+        assert len(thread_ids) == 2
+        assert client.post("/tickets", json={**ticket, "thread_id": "t1"}).json()["thread_id"] == "t1"
+
+
+# AsyncSqliteSaver 3.0.1 relies on aiosqlite's Connection being a Thread, which it no longer is from 0.22 on
+@pytest.mark.skipif(not hasattr(aiosqlite.Connection, "is_alive"), reason="needs aiosqlite<0.22")
+def test_service_keeps_checkpoints_in_a_sqlite_file(tmp_path):
+    ticket = {"ticket_text": "I can't log in", "account_id": "cultpass", "user_id": "u1", "thread_id": "t1"}
+    with TestClient(create_app(_workflow([]), checkpoint_path=tmp_path / "checkpoints.db")) as client:
+        assert client.post("/tickets", json=ticket).status_code == 200
+        graph = client.app.state.graph
+        assert graph.get_state({"configurable": {"thread_id": "t1"}}).values["tags"] == ["login"]
+    assert (tmp_path / "checkpoints.db").exists()
@@ -0,0 +1,33 @@
+from agentic.agents import ArticlesFetcherAgent
+from benchmarks.fake_llm import FakeChatModel
+
+
+CANDIDATES = [
+    {"article_id": "a1", "title": "Refunds", "content": "...", "tags": "billing, refund"},
+    {"article_id": "a2", "title": "Login issues", "content": "...", "tags": "login, password"},
+    {"article_id": "a3", "title": "Payment methods", "content": "...", "tags": "billing, payment, refund"},
+]
+
+
+def _state(tags, candidates=CANDIDATES):
+    return {"account_id": "cultpass", "ticket_text": "Refund my payment", "tags": tags, "speculative_articles": candidates}
+
+
+def test_speculative_candidates_are_narrowed_down_to_the_tags():
+    fetcher = ArticlesFetcherAgent(FakeChatModel(latency=0.0), direct=True, search_k=2)
+
+    articles, top_k = fetcher._from_speculation(_state(["Refund", "payment"]))
+    assert [article["article_id"] for article in articles] == ["a3", "a1"]
+    assert top_k is None
+
+    # Without tags, the candidates stand in for the text search the fetcher falls back to
+    articles, top_k = fetcher._from_speculation(_state([]))
+    assert [article["article_id"] for article in articles] == ["a1", "a2"]
+    assert top_k == 1
+
+    # Nothing in common with the tags (or nothing speculated): the articles are fetched as usual
+    assert fetcher._from_speculation(_state(["weather"])) is None
+    assert fetcher._from_speculation(_state(["refund"], candidates=None)) is None
+
+    command = fetcher(_state(["login"]))
+    assert [article["article_id"] for article in command.update["relevant_articles"]] == ["a2"]
@@ -0,0 +1,33 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from agentic.agents.states import ResolutionResult
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.synthetic_data import generate
+
+
+def test_generated_databases_are_consistent(tmp_path):
+    dataset = generate(tmp_path, accounts=2, users_per_account=5, tickets_per_user=3, articles_per_account=8)
+    assert dataset.tickets == 30
+    assert len(dataset.user_ids) == 10
+
+    with create_engine(f"sqlite:///{dataset.udahub_db}").connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM ticket_messages")).scalar() == 60
+        assert connection.execute(text("SELECT count(*) FROM knowledge_tags")).scalar() == 32
+        # Filled in by the triggers created alongside the knowledge table
+        matches = connection.execute(text("SELECT count(*) FROM knowledge_fts WHERE knowledge_fts MATCH 'premium'"))
+        assert matches.scalar() > 0
+    with create_engine(f"sqlite:///{dataset.cultpass_db}").connect() as connection:
+        users = set(connection.execute(text("SELECT DISTINCT user_id FROM reservations")).scalars())
+    assert users == set(dataset.user_ids)
+
+    with pytest.raises(FileExistsError):
+        generate(tmp_path)
+
+
+def test_fake_llm_plays_structured_scripts_in_turn():
+    llm = FakeChatModel(latency=0, structured_responses={
+        "ResolutionResult": [{"is_resolved_score": 90.0}, {"is_resolved_score": 10.0}],
+    })
+    resolver = llm.with_structured_output(ResolutionResult)
+    assert [resolver.invoke("ticket").is_resolved_score for _ in range(3)] == [90.0, 10.0, 90.0]
@@ -0,0 +1,58 @@
+import threading
+
+from sqlalchemy import create_engine
+
+import data.models.udahub as udahub
+from agentic.agents.states import _classifier_state_for_tags
+from agentic.tag_registry import TagRegistry
+from utils import get_session
+
+
+def test_tag_registry_follows_the_articles():
+    engine = create_engine("sqlite://")
+    udahub.Base.metadata.create_all(engine)
+    with get_session(engine) as session:
+        session.add(udahub.Account(account_id="cultpass", account_name="CultPass Card"))
+        session.add(udahub.Knowledge(article_id="a1", account_id="cultpass", title="Events", content="...",
+                                     tags="events, reservation"))
+
+    registry = TagRegistry(engine, ttl_seconds=3600)
+    assert registry.tags("cultpass") == ("events", "reservation")
+    assert registry.tags("unknown") == ()
+
+    # Committed ORM changes are picked up right away, despite the long TTL
+    with get_session(engine) as session:
+        session.add(udahub.Knowledge(article_id="a2", account_id="cultpass", title="Refunds", content="...",
+                                     tags="refund"))
+    assert registry.tags("cultpass") == ("events", "refund", "reservation")
+
+    with get_session(engine) as session:
+        session.delete(session.get(udahub.Knowledge, "a2"))
+    assert registry.tags("cultpass") == ("events", "reservation")
+
+    # Re-reading an unchanged tag set keeps the classifier schema as it is
+    registry.invalidate()
+    assert _classifier_state_for_tags(registry.tags("cultpass")) is _classifier_state_for_tags(("events", "reservation"))
+
+
+def test_a_slow_account_does_not_hold_up_the_others():
+    started, release = threading.Event(), threading.Event()
+
+    class SlowRegistry(TagRegistry):
+        def _query(self, account_id):
+            if account_id == "slow":
+                started.set()
+                release.wait(timeout=5)
+            return (account_id,)
+
+    registry = SlowRegistry(create_engine("sqlite://"))
+    slow = threading.Thread(target=registry.tags, args=("slow",))
+    slow.start()
+    started.wait(timeout=5)
+    try:
+        assert registry.tags("fast") == ("fast",)
+        assert slow.is_alive()
+    finally:
+        release.set()
+        slow.join()
+    assert registry.tags("slow") == ("slow",)
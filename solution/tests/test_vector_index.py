@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import create_engine
+
+import data.models.udahub as udahub
+from agentic.tools.vector_index import ArticleVectorIndex, HashingEmbedder
+from utils import get_session
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dim=64)
+        self.embedded = []
+
+    def __call__(self, texts):
+        self.embedded.extend(texts)
+        return super().__call__(texts)
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dim=32)
+    embeddings = embedder(["Reserve a spot for an event", "Reserve a spot for an event", ""])
+    assert np.array_equal(embeddings[0], embeddings[1])
+    assert np.isclose(np.linalg.norm(embeddings[0]), 1.0)
+    assert not embeddings[2].any()
+
+
+def test_vector_index_only_reembeds_changed_articles(tmp_path):
+    engine = create_engine("sqlite://")
+    udahub.Base.metadata.create_all(engine)
+    with get_session(engine) as session:
+        session.add_all([
+            udahub.Account(account_id="cultpass", account_name="CultPass Card"),
+            udahub.Account(account_id="other", account_name="Other"),
+        ])
+        session.add_all([
+            udahub.Knowledge(article_id="a1", account_id="cultpass", title="Password reset",
+                             content="Forgot your password? Tap reset on the login screen.", tags="login"),
+            udahub.Knowledge(article_id="a2", account_id="cultpass", title="Reserving events",
+                             content="Open the app and tap reserve.", tags="events"),
+            udahub.Knowledge(article_id="a3", account_id="other", title="Password policy",
+                             content="Passwords expire.", tags="password"),
+        ])
+
+    embedder = CountingEmbedder()
+    index = ArticleVectorIndex(tmp_path, embedder)
+    assert index.sync(engine) == 3
+    assert index.sync(engine) == 0
+    assert [article_id for article_id, _ in index.search("cultpass", "I forgot my password", k=5)] == ["a1", "a2"]
+    assert index.search("unknown", "password") == []
+
+    with get_session(engine) as session:
+        article = session.get(udahub.Knowledge, "a2")
+        article.content = "Forgot your password? Contact support."
+        article.updated_at = datetime(2030, 1, 1)
+        session.delete(session.get(udahub.Knowledge, "a3"))
+
+    # A fresh instance picks up the memory-mapped files, and only the changed article is embedded again
+    embedder.embedded.clear()
+    index = ArticleVectorIndex(tmp_path, embedder)
+    assert index.sync(engine) == 1
+    assert len(embedder.embedded) == 1
+    assert index.search("other", "password") == []
+    assert [article_id for article_id, _ in index.search("cultpass", "forgot password contact support", k=1)] == ["a2"]
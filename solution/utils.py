@@ -1,7 +1,7 @@
 # reset_udahub.py
 import os
 from sqlalchemy import create_engine, Engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.orm import declarative_base
 from contextlib import contextmanager
 from langchain_core.messages import (
     SystemMessage,
@@ -9,7 +9,8 @@ from langchain_core.messages import (
 )
 from langgraph.graph.state import CompiledStateGraph
 
-from data.models import udahub
+from agentic.tag_registry import TAG_REGISTRY
+from data.database import session_factory
 
 Base = declarative_base()
 
@@ -34,8 +35,7 @@ def get_session(engine: Engine):
     Creates a context menager using a generator function and the contextmanager decorator.
     Noice.
     """
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    session = session_factory(engine)()
     try:
         yield session
         session.commit()
@@ -82,17 +82,6 @@ def chat_interface(agent:CompiledStateGraph, ticket_id:str):
         
 def get_available_tags(account_id: str) -> list[str]:
     """
-    Connects to the Knowledge Base and retrieves available tags for the given account.
+    Retrieves the available tags for the given account from the Knowledge Base (cached, see `TagRegistry`).
     """
-    engine = create_engine(f"sqlite:///{udahub.UDAHUB_DB}", echo=False)
-    all_tags = set()
-    
-    with get_session(engine) as session:
-        account = session.query(udahub.Account).filter_by(
-            account_id=account_id
-        ).first()
-        for article in account.knowledge_articles:
-            tags = article.tags.replace(', ', ',').split(',')
-            all_tags.update(tags)
-
-    return sorted(list(all_tags))
+    return list(TAG_REGISTRY.tags(account_id))